@@ -0,0 +1,52 @@
+"""
+Compares the thread-per-session remote strategy with the event loop based
+async_remote strategy against a local stand-in SSH server.
+
+    python -m benchmarks.bench_async_ssh [sessions] [latency] [threads]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.execution.execution_factory import ExecutionFactory
+from testing.fake_ssh_server import FakeSSHServer
+
+
+def bench_remote(server: FakeSSHServer, sessions: int, threads: int) -> float:
+    strategy = ExecutionFactory.get_execution_strategy("remote")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(
+            lambda i: strategy.execute_command(f"echo {i}", server.host, "root", "password", port=server.port),
+            range(sessions)
+        ))
+    return time.perf_counter() - start
+
+def bench_async_remote(server: FakeSSHServer, sessions: int) -> float:
+    strategy = ExecutionFactory.get_execution_strategy("async_remote")
+    start = time.perf_counter()
+    futures = [
+        strategy.submit_command(f"echo {i}", server.host, "root", "password", port=server.port)
+        for i in range(sessions)
+    ]
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    strategy.ssh_service.close()
+    return elapsed
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    with FakeSSHServer(latency=latency) as server:
+        remote = bench_remote(server, sessions, threads)
+        async_remote = bench_async_remote(server, sessions)
+
+    print(f"{sessions} sessions, {latency}s latency")
+    print(f"remote ({threads} threads): {remote:.2f}s, {sessions / remote:.1f} sessions/s")
+    print(f"async_remote: {async_remote:.2f}s, {sessions / async_remote:.1f} sessions/s")
+
+
+if __name__ == "__main__":
+    main()
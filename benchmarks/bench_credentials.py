@@ -0,0 +1,65 @@
+"""
+Measures what building SSH credentials for N servers costs with and
+without the decrypted credential cache, plus PBKDF2 key derivation cold
+and cached.
+
+    python -m benchmarks.bench_credentials [servers] [rounds]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('SALT', 'benchmark-salt')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from services.crypto import Crypto, clear_derived_keys
+from services.db.models import Base
+from services.db.db_service import DBService
+from benchmarks.bench_db_bulk import make_servers
+
+
+def make_db_service(servers) -> DBService:
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    db_service = DBService(database_path=None, session=sessionmaker(bind=engine)())
+    db_service.add_servers_bulk(servers)
+    return db_service
+
+def timed(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    db_service = make_db_service(make_servers(count))
+
+    def list_servers():
+        for server in db_service.list_servers():
+            server.password
+        db_service.session.expire_all()
+
+    cache = db_service.credential_cache
+    db_service.credential_cache = None
+    results = {
+        "list_servers + password": timed(list_servers, rounds),
+        "get_server_credentials (no cache)": timed(db_service.get_server_credentials, rounds),
+    }
+    db_service.credential_cache = cache
+    db_service.get_server_credentials()
+    results["get_server_credentials (warm cache)"] = timed(db_service.get_server_credentials, rounds)
+
+    clear_derived_keys()
+    results["generate_key (cold)"] = timed(lambda: Crypto.generate_key("password", b"salt"), 1)
+    results["generate_key (cached)"] = timed(lambda: Crypto.generate_key("password", b"salt"), rounds)
+
+    print(f"{count} servers, {rounds} rounds")
+    for name, elapsed in results.items():
+        print(f"{name:<40} {elapsed * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
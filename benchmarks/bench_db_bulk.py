@@ -0,0 +1,80 @@
+"""
+Compares per-row DBService writes with the bulk APIs on a file backed
+SQLite database, where every commit costs an fsync.
+
+    python -m benchmarks.bench_db_bulk [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('SALT', 'benchmark-salt')
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from services.db.models import Base
+from services.db.db_service import DBService
+
+
+def make_db_service(directory: str, name: str) -> DBService:
+    path = os.path.join(directory, f"{name}.db")
+    engine = create_engine(f"sqlite:///{path}", echo=False)
+    Base.metadata.create_all(engine)
+    return DBService(database_path=path, session=sessionmaker(bind=engine)())
+
+def make_servers(rows: int):
+    return [
+        {
+            'name': f"node-{i}",
+            'ip': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            'active': True,
+            'username': "root",
+            'password': "password",
+            'role': "slave",
+            'os_version': "Ubuntu 22.04",
+            'blockchains': "quilibrium",
+        }
+        for i in range(rows)
+    ]
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def per_row_servers(db_service: DBService, servers):
+    for server in servers:
+        db_service.add_server(**server)
+
+def per_row_balances(db_service: DBService, wallet_id: int, rows: int):
+    for i in range(rows):
+        db_service.add_balance(wallet_id, float(i), 0.0, "quilibrium")
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    servers = make_servers(rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        per_row = make_db_service(directory, "per_row")
+        bulk = make_db_service(directory, "bulk")
+
+        results = {
+            "add_server x N": timed(per_row_servers, per_row, servers),
+            "add_servers_bulk": timed(bulk.add_servers_bulk, servers),
+            "upsert_servers (all existing)": timed(bulk.upsert_servers, servers),
+        }
+
+        wallet = per_row.add_wallet("0xbench", "bench", "password", "mnemonic", "quilibrium")
+        bulk_wallet = bulk.add_wallet("0xbench", "bench", "password", "mnemonic", "quilibrium")
+        balances = [{'wallet_id': bulk_wallet.id, 'free': float(i), 'staked': 0.0, 'blockchain': "quilibrium"} for i in range(rows)]
+        results["add_balance x N"] = timed(per_row_balances, per_row, wallet.id, rows)
+        results["add_balances_bulk"] = timed(bulk.add_balances_bulk, balances)
+
+    print(f"{rows} rows")
+    for name, elapsed in results.items():
+        print(f"{name:<32} {elapsed:8.3f}s {rows / elapsed:10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
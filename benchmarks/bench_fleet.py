@@ -0,0 +1,199 @@
+"""
+Runs tasks against a simulated fleet of local stand-in SSH servers through
+the real TaskManager -> TaskScheduler -> TaskExecutor -> remote strategy
+path and reports tasks/s, per-node latency percentiles, the memory high
+water mark and the thread count. Every server listens on its own loopback
+address (127.0.x.y, Linux only) because nodes are keyed by IP.
+
+    python -m benchmarks.bench_fleet [--nodes 50] [--tasks 20] [--latency 0.05] [--jitter 0.02]
+        [--failure-rate 0.0] [--output-size 256] [--save results.json] [--compare baseline.json]
+
+Results are printed and, with --save, written as JSON. --compare prints the
+change of every metric against a previously saved run; a run at the
+defaults is kept in benchmarks/baselines/fleet.json.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault('SALT', 'benchmark-salt')
+os.environ.setdefault('SEEDS_PATH', os.path.join(tempfile.gettempdir(), 'bench_fleet_seeds.json'))
+# The stand-in servers echo commands instead of running a shell, so batched scripts would not parse
+os.environ.setdefault('COMMAND_BATCH_WINDOW', '0')
+
+from munch import Munch
+from registry import Registry
+from services.admission_controller import AdmissionController
+from services.circuit_breaker import CircuitBreakers
+from services.metrics import LatencyHistogram, Metrics
+from services.node_service import NodeService
+from services.notification_queue import NotificationQueue
+from services.ssh_pool import SSHPool
+from services.task.task_manager import TaskManager
+from services.task.task_scheduler import TaskScheduler
+from services.task.task_store import TaskStore
+from services.task_service import TaskService
+from testing.fake_ssh_server import FakeSSHServer
+
+# ~5% wide buckets from 1ms to ~2min, fine enough to compare runs
+LATENCY_BUCKETS = [0.001 * 1.05 ** i for i in range(240)]
+
+
+class NullBot:
+    def send_message(self, chat_id, text):
+        pass
+
+    def send_document(self, chat_id, document, filename):
+        pass
+
+
+class PeakSampler:
+    """Samples the thread count in the background and keeps the highest value."""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+
+def node_address(index: int) -> str:
+    return f"127.0.{index // 250}.{index % 250 + 2}"
+
+def start_fleet(args) -> list:
+    return [
+        FakeSSHServer(
+            latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+            output_size=args.output_size, host=node_address(i)
+        ).start()
+        for i in range(args.nodes)
+    ]
+
+def write_seeds(servers: list):
+    seeds = [
+        {
+            'name': f"node-{i}", 'ip': server.host, 'port': server.port, 'user': "root", 'password': "password",
+            'role': "slave", 'so': "Ubuntu", 'owner': "bench", 'blockchains': ["quilibrium"],
+        }
+        for i, server in enumerate(servers)
+    ]
+    with open(NodeService.SEEDS_PATH, 'w') as file:
+        json.dump(seeds, file)
+
+def build_pipeline() -> TaskManager:
+    """Wires the services the way main.py does, minus the database and the bot."""
+    Registry.register('ssh_pool', SSHPool())
+    Registry.register('admission_controller', AdmissionController())
+    Registry.register('circuit_breakers', CircuitBreakers())
+    Registry.register('node_service', NodeService())
+    Registry.register('task_store', TaskStore())
+    Registry.register('task_service', TaskService())
+    Registry.register('notification_queue', NotificationQueue(bot=NullBot()))
+    task_manager = TaskManager(blockchain='quilibrium')
+    Registry.register('task_manager', task_manager)
+    task_scheduler = TaskScheduler()
+    Registry.register('task_scheduler', task_scheduler)
+    task_scheduler.start()
+    return task_manager
+
+def run(args) -> dict:
+    servers = start_fleet(args)
+    write_seeds(servers)
+    # Registered before the executor looks it up, so the real instrumentation records into finer buckets
+    node_latency = Metrics.shared().register('node_latency_seconds', LatencyHistogram(LATENCY_BUCKETS))
+    baseline_threads = threading.active_count()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        task_manager = build_pipeline()
+        command = Munch(command="uptime", description="fleet benchmark")
+        with PeakSampler() as sampler:
+            started = time.perf_counter()
+            tasks = [
+                task_manager.create_task(command, [TaskManager.NODES_WITH_BLOCKCHAIN], scheduled_time=datetime.now())
+                for _ in range(args.tasks)
+            ]
+            while any(not task.finished_at for task in tasks):
+                time.sleep(0.005)
+            elapsed = time.perf_counter() - started
+
+    results = sum(len(task.results) for task in tasks)
+    stats = node_latency.snapshot()
+    report = {
+        'config': vars(args),
+        'elapsed': elapsed,
+        'tasks_per_second': args.tasks / elapsed,
+        'node_results_per_second': results / elapsed,
+        'node_latency_p50': stats['p50'],
+        'node_latency_p99': stats['p99'],
+        'node_latency_mean': stats['mean'],
+        'failed_tasks': sum(1 for task in tasks if task.status.name != 'COMPLETED'),
+        # ru_maxrss is in KiB on Linux; it includes the in-process fleet
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_threads': sampler.peak,
+        'pipeline_threads': sampler.peak - baseline_threads,
+    }
+    return report
+
+def compare(report: dict, baseline: dict):
+    print(f"\nAgainst baseline ({baseline['config']}):")
+    for key, value in report.items():
+        previous = baseline.get(key)
+        if isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous:
+            print(f"  {key}: {previous:.4g} -> {value:.4g} ({(value - previous) / previous:+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--output-size', type=int, default=256)
+    parser.add_argument('--save', help="write the results as JSON to this path")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+    save, baseline = args.save, args.compare
+    del args.save, args.compare
+    logging.disable(logging.ERROR)
+
+    report = run(args)
+
+    print(f"{args.nodes} nodes, {args.tasks} tasks, {args.latency}s +{args.jitter}s latency, "
+          f"{args.failure_rate:.0%} failures, {args.output_size}B output")
+    for key, value in report.items():
+        if key != 'config':
+            print(f"  {key}: {value:.4g}" if isinstance(value, float) else f"  {key}: {value}")
+    if baseline:
+        with open(baseline) as file:
+            compare(report, json.load(file))
+    if save:
+        with open(save, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nSaved to {save}")
+    # Fleet servers and pool threads are daemons; skip their teardown
+    sys.stdout.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
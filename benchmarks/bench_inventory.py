@@ -0,0 +1,68 @@
+"""
+Measures NodeService start-up for a fleet of N seeded nodes: a cold load
+(JSON parse, password hashing, indexing, snapshot write), a warm load
+from the inventory snapshot, and a warm load after the seeds file was
+touched without changing (one content hash, then the snapshot).
+
+    python -m benchmarks.bench_inventory [nodes] [rounds]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Snapshots are encrypted under a key derived from SALT
+os.environ.setdefault('SALT', 'benchmark-salt')
+
+from services.node_service import NodeService
+
+
+def write_seeds(path: str, count: int):
+    seeds = [
+        {
+            'name': f"node-{i}", 'ip': f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", 'user': "root", 'password': f"password-{i}",
+            'role': "slave", 'so': "Ubuntu 22.04", 'owner': f"owner-{i % 10}", 'blockchains': ["quilibrium"],
+        }
+        for i in range(count)
+    ]
+    with open(path, 'w') as file:
+        json.dump(seeds, file)
+    backdate(path, 3600)
+
+def backdate(path: str, seconds: float):
+    """Freshly written seeds are compared by content until their mtime is old enough to trust."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def load(seeds_path: str) -> float:
+    start = time.perf_counter()
+    NodeService().load_nodes_from_seeds(seeds_path)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        seeds_path = os.path.join(directory, 'seeds.json')
+        write_seeds(seeds_path, count)
+        snapshot_path = f"{seeds_path}{NodeService.SNAPSHOT_SUFFIX}"
+
+        cold = []
+        for _ in range(rounds):
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            cold.append(load(seeds_path))
+        warm = [load(seeds_path) for _ in range(rounds)]
+        touched = []
+        for i in range(rounds):
+            backdate(seeds_path, 1800 - i)
+            touched.append(load(seeds_path))
+
+        print(f"{count} nodes, seeds {os.path.getsize(seeds_path) / 1024:.0f} KiB, snapshot {os.path.getsize(snapshot_path) / 1024:.0f} KiB")
+        for name, timings in (("cold (seeds)", cold), ("warm (snapshot)", warm), ("touched seeds", touched)):
+            print(f"  {name:>16}: {min(timings) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measures cold startup in fresh interpreters: bare interpreter start,
+importing main, importing every service module up front the way main.py
+used to, and the first command path (register services, then build the
+TaskManager and look nodes up, as the bot does on its first command).
+With --profile it prints the slowest imports of `import main` from
+`python -X importtime`.
+
+    python -m benchmarks.bench_startup [--rounds 5] [--seeds 500] [--profile]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_MODULES = [
+    'services.task.task_manager', 'services.task.task_scheduler', 'services.admission_controller',
+    'services.circuit_breaker', 'services.db.balance_series', 'services.db.db_service',
+    'services.db.persistent_task_store', 'services.liveness_prober', 'services.metrics', 'services.node_service',
+    'services.notification_queue', 'services.relay.relay_service', 'services.ssh_pool', 'services.task_service',
+    'services.tracing',
+]
+
+FIRST_COMMAND = """
+import main
+from registry import Registry
+main.register_services()
+task_manager = Registry.get('task_manager')
+task_manager.get_nodes_for_task([task_manager.NODES_WITH_BLOCKCHAIN])
+"""
+
+SCENARIOS = {
+    'interpreter': "pass",
+    'import main': "import main",
+    'eager imports': "\n".join(f"import {module}" for module in EAGER_MODULES),
+    'first command': FIRST_COMMAND,
+}
+
+
+def write_seeds(count: int) -> str:
+    seeds = [
+        {
+            'name': f"node-{i}", 'ip': f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", 'user': "root", 'password': "password",
+            'role': "slave", 'so': "Ubuntu", 'owner': "bench", 'blockchains': ["quilibrium"],
+        }
+        for i in range(count)
+    ]
+    path = os.path.join(tempfile.gettempdir(), 'bench_startup_seeds.json')
+    with open(path, 'w') as file:
+        json.dump(seeds, file)
+    return path
+
+def environment(seeds_path: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT, SEEDS_PATH=seeds_path, DB_PATH=os.path.join(tempfile.gettempdir(), 'bench_startup.db'))
+    env.setdefault('SALT', 'benchmark-salt')
+    return env
+
+def run_once(code: str, env: dict, *flags) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+def measure(code: str, env: dict, rounds: int) -> float:
+    """Median wall time of a fresh interpreter running the snippet, interpreter start included."""
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run_once(code, env)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def profile(env: dict, top: int = 15):
+    stderr = run_once("import main", env, '-X', 'importtime').stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, module = line.split('|')
+            rows.append((int(cumulative), module.strip()))
+    print("\nSlowest imports under `import main` (cumulative):")
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seeds', type=int, default=500)
+    parser.add_argument('--profile', action='store_true')
+    args = parser.parse_args()
+    env = environment(write_seeds(args.seeds))
+
+    for name, code in SCENARIOS.items():
+        print(f"{name:>16}: {measure(code, env, args.rounds) * 1000:8.1f} ms")
+    if args.profile:
+        profile(env)
+
+
+if __name__ == "__main__":
+    main()
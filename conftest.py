@@ -0,0 +1,4 @@
+import os
+
+# Encrypted columns need a key; models read SALT at import time
+os.environ.setdefault('SALT', 'testsalt')
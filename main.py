@@ -1,44 +1,138 @@
 import logging
 import os
 import sys
+import threading
 import traceback
 from dotenv import load_dotenv
-from bots.quilibrium import QuilibriumBot
 from registry import Registry
-from services.task.task_manager import TaskManager
-from services.task.task_scheduler import TaskScheduler
-from services.db.db_service import DBService
-from services.node_service import NodeService
-from services.task_service import TaskService
 
 load_dotenv()
 DB_PATH = os.getenv("DB_PATH")
 BLOCKCHAIN = 'quilibrium'
-DB_EXPANDED_PATH = os.path.expanduser(DB_PATH)
+DB_EXPANDED_PATH = os.path.expanduser(DB_PATH) if DB_PATH else None
+BALANCE_COMPACTION_INTERVAL = int(os.getenv("BALANCE_COMPACTION_INTERVAL", 3600))
+TASK_PURGE_INTERVAL = int(os.getenv("TASK_PURGE_INTERVAL", 86400))
+# Services built in the background once the bot is up; anything else is built on first use
+WARM_UP = ('task_manager', 'metrics_server', 'task_scheduler', 'liveness_prober')
 __version__ = "0.1.0"
 
+# Factories import their modules themselves, so paramiko, SQLAlchemy and APScheduler
+# are only loaded when the first service needing them is built.
 
-def run_task_manager():
-    try:
-        db_service = DBService(DB_EXPANDED_PATH)
-        Registry.register('db_service', db_service)
+def build_tracer():
+    from services.tracing import Tracer
+    return Tracer.shared()
+
+def build_metrics_server():
+    from services.metrics import Metrics, MetricsServer
+    tracer = Registry.get('tracer')
+    metrics_server = MetricsServer(Metrics.shared())
+    # The metrics port is usually reachable from outside; traces describe what ran where, so they stay local
+    metrics_server.add_route('/traces', 'application/json', tracer.export_json, local_only=True)
+    metrics_server.add_route('/traces/chrome', 'application/json', tracer.export_chrome, local_only=True)
+    metrics_server.start()
+    return metrics_server
+
+def build_db_service():
+    from services.db.db_service import DBService
+    return DBService(DB_EXPANDED_PATH)
+
+def build_ssh_pool():
+    from services.ssh_pool import SSHPool
+    ssh_pool = SSHPool()
+    ssh_pool.start_reaper()
+    return ssh_pool
+
+def build_admission_controller():
+    from services.admission_controller import AdmissionController
+    return AdmissionController()
+
+def build_circuit_breakers():
+    from services.circuit_breaker import CircuitBreakers
+    return CircuitBreakers()
+
+def build_node_service():
+    from services.node_service import NodeService
+    return NodeService()
+
+def build_relay_service():
+    from services.relay.relay_service import RelayService
+    return RelayService()
+
+def build_task_store():
+    from services.db.persistent_task_store import PersistentTaskStore
+    return PersistentTaskStore(Registry.get('db_service'))
 
-        node_service = NodeService()
-        Registry.register('node_service', node_service)
+def build_task_service():
+    from services.task_service import TaskService
+    return TaskService()
 
-        task_service = TaskService()
-        Registry.register('task_service', task_service)
+def build_notification_queue():
+    from services.notification_queue import NotificationQueue
+    return NotificationQueue(bot=Registry.get('quililibrium_bot'))
 
-        task_manager = TaskManager(blockchain=BLOCKCHAIN)
-        Registry.register('task_manager', task_manager)
+def build_task_manager():
+    from services.task.task_manager import TaskManager
+    return TaskManager(blockchain=BLOCKCHAIN)
 
-        task_scheduler = TaskScheduler()
-        Registry.register('task_scheduler', task_scheduler)
-        task_scheduler.start()
+def build_liveness_prober():
+    from services.liveness_prober import LivenessProber
+    liveness_prober = LivenessProber(Registry.get('node_service'), Registry.get('circuit_breakers'))
+    liveness_prober.start()
+    return liveness_prober
+
+def build_balance_series():
+    from services.db.balance_series import BalanceSeries
+    return BalanceSeries(Registry.get('db_service'))
+
+def build_task_scheduler():
+    from services.task.task_scheduler import TaskScheduler
+    task_scheduler = TaskScheduler()
+    task_scheduler.start()
+    task_scheduler.add_recurring_task(Registry.get('balance_series').compact, BALANCE_COMPACTION_INTERVAL)
+    task_scheduler.add_recurring_task(Registry.get('task_store').purge, TASK_PURGE_INTERVAL)
+    return task_scheduler
+
+FACTORIES = {
+    'tracer': build_tracer,
+    'metrics_server': build_metrics_server,
+    'db_service': build_db_service,
+    'ssh_pool': build_ssh_pool,
+    'admission_controller': build_admission_controller,
+    'circuit_breakers': build_circuit_breakers,
+    'node_service': build_node_service,
+    'relay_service': build_relay_service,
+    'task_store': build_task_store,
+    'task_service': build_task_service,
+    'notification_queue': build_notification_queue,
+    'task_manager': build_task_manager,
+    'liveness_prober': build_liveness_prober,
+    'balance_series': build_balance_series,
+    'task_scheduler': build_task_scheduler,
+}
+
+
+def register_services():
+    """Registers every service lazily; each pulls its dependencies through `Registry.get`, so order does not matter."""
+    for key, factory in FACTORIES.items():
+        Registry.register_factory(key, factory)
+
+def warm_up():
+    for key in WARM_UP:
+        try:
+            Registry.get(key)
+        except Exception:
+            logging.error(f"Failed to start {key}: {traceback.format_exc()}")
+
+def run_task_manager():
+    try:
+        register_services()
 
+        from bots.quilibrium import QuilibriumBot
         quililibrium_bot = QuilibriumBot()
         Registry.register('quililibrium_bot', quililibrium_bot)
 
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
         quililibrium_bot.run()
 
     except KeyboardInterrupt:
@@ -50,4 +144,4 @@ def run_task_manager():
         sys.exit(1)
 
 if __name__ == "__main__":
-    run_task_manager()
\ No newline at end of file
+    run_task_manager()
@@ -1,6 +1,17 @@
+import threading
+
+
 class Registry:
     _instance = None
     _registry = {}
+    # key -> callable building the instance on the first `get`
+    _factories = {}
+    # One lock per key being built, so a slow factory only holds up callers of that key
+    _key_locks = {}
+    # Keys this thread is building, to catch factories that depend on themselves
+    _building = threading.local()
+    # Guards the dicts above; never held while a factory runs
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -11,14 +22,51 @@ class Registry:
     def register(cls, key, instance):
         cls._registry[key] = instance
 
+    @classmethod
+    def register_factory(cls, key, factory):
+        """Defers building `key` until something first asks for it; an eager `register` wins."""
+        with cls._lock:
+            cls._factories[key] = factory
+
     @classmethod
     def get(cls, key):
-        return cls._registry.get(key)
+        instance = cls._registry.get(key)
+        if instance is not None or key not in cls._factories:
+            return instance
+        building = cls._building.__dict__.setdefault('keys', set())
+        if key in building:
+            raise RuntimeError(f"Circular dependency while building {key}")
+        with cls._lock:
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key in cls._registry:
+                return cls._registry[key]
+            factory = cls._factories.get(key)
+            if factory is None:
+                return None
+            building.add(key)
+            try:
+                instance = factory()
+            finally:
+                building.discard(key)
+            # The factory is dropped only once built, so concurrent callers wait on the key lock instead of seeing None
+            with cls._lock:
+                cls._registry[key] = instance
+                cls._factories.pop(key, None)
+                cls._key_locks.pop(key, None)
+            return instance
 
     @classmethod
     def remove(cls, key):
-        del cls._registry[key]
+        with cls._lock:
+            cls._key_locks.pop(key, None)
+            if cls._factories.pop(key, None) is None or key in cls._registry:
+                del cls._registry[key]
+
+    @classmethod
+    def is_built(cls, key):
+        return key in cls._registry
 
     @classmethod
     def list_instances(cls):
-        return list(cls._registry.keys())
\ No newline at end of file
+        return list(cls._registry.keys()) + [key for key in cls._factories if key not in cls._registry]
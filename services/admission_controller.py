@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from typing import Dict, Hashable, Optional
+
+
+class AIMDLimit:
+    """
+    Concurrency limit for one host or provider. Every success adds
+    `increase / limit`, about +increase per window of requests; a connection
+    error or a latency spike multiplies it by `decrease`, at most once per
+    `cooldown` seconds so a burst of failures from one window only counts
+    once.
+    """
+    def __init__(self, initial: float, minimum: float, maximum: float, increase: float, decrease: float, latency_spike: float, cooldown: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_spike = latency_spike
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.last_decrease = float('-inf')
+        self.successes = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def on_success(self, latency: float = None):
+        self.successes += 1
+        if latency is not None:
+            spike = self.latency is not None and latency > self.latency * self.latency_spike
+            # Slow EWMA so a single spike doesn't become the new baseline
+            self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+            if spike:
+                self.back_off()
+                return
+        self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def on_failure(self):
+        self.failures += 1
+        self.back_off()
+
+    def back_off(self):
+        now = time.monotonic()
+        if now - self.last_decrease >= self.cooldown:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self.last_decrease = now
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'latency': self.latency,
+            'successes': self.successes,
+            'failures': self.failures,
+        }
+
+
+class AdmissionController:
+    """
+    Admits work for a host only while both the host and its provider are
+    under their adaptive limits. Hosts behind a shared NAT or flaky link
+    back off together through their provider limit, while healthy hosts
+    grow towards their maximum.
+    """
+    DEFAULT_HOST_LIMIT = 4
+    DEFAULT_HOST_MAX = 32
+    DEFAULT_PROVIDER_LIMIT = 32
+    DEFAULT_PROVIDER_MAX = 256
+    DEFAULT_DECREASE = 0.5
+    DEFAULT_LATENCY_SPIKE = 3.0
+    DEFAULT_COOLDOWN = 1.0
+
+    def __init__(self):
+        self.host_limit = float(os.getenv('ADMISSION_HOST_LIMIT', self.DEFAULT_HOST_LIMIT))
+        self.host_max = float(os.getenv('ADMISSION_HOST_MAX', self.DEFAULT_HOST_MAX))
+        self.provider_limit = float(os.getenv('ADMISSION_PROVIDER_LIMIT', self.DEFAULT_PROVIDER_LIMIT))
+        self.provider_max = float(os.getenv('ADMISSION_PROVIDER_MAX', self.DEFAULT_PROVIDER_MAX))
+        self.decrease = float(os.getenv('ADMISSION_DECREASE', self.DEFAULT_DECREASE))
+        self.latency_spike = float(os.getenv('ADMISSION_LATENCY_SPIKE', self.DEFAULT_LATENCY_SPIKE))
+        self.cooldown = float(os.getenv('ADMISSION_COOLDOWN', self.DEFAULT_COOLDOWN))
+        self.hosts: Dict[Hashable, AIMDLimit] = {}
+        self.providers: Dict[Hashable, AIMDLimit] = {}
+        self.condition = threading.Condition()
+
+    def try_acquire(self, host: Hashable, provider: Hashable = None) -> bool:
+        with self.condition:
+            return self._try_acquire(host, provider)
+
+    def acquire(self, host: Hashable, provider: Hashable = None, timeout: float = None) -> bool:
+        with self.condition:
+            return self.condition.wait_for(lambda: self._try_acquire(host, provider), timeout)
+
+    def provider_available(self, provider: Hashable) -> bool:
+        with self.condition:
+            limit = self.providers.get(provider)
+            return limit is None or limit.available
+
+    def release(self, host: Hashable, provider: Hashable = None, success: bool = True, latency: float = None):
+        with self.condition:
+            for limit in self._limits(host, provider):
+                limit.in_flight -= 1
+                if success:
+                    limit.on_success(latency)
+                else:
+                    limit.on_failure()
+            self.condition.notify_all()
+
+    def get_limits(self) -> Dict[str, Dict]:
+        with self.condition:
+            return {
+                'hosts': {str(host): limit.to_dict() for host, limit in self.hosts.items()},
+                'providers': {str(provider): limit.to_dict() for provider, limit in self.providers.items()},
+            }
+
+    def _try_acquire(self, host: Hashable, provider: Hashable) -> bool:
+        limits = self._limits(host, provider)
+        if not all(limit.available for limit in limits):
+            return False
+        for limit in limits:
+            limit.in_flight += 1
+        return True
+
+    def _limits(self, host: Hashable, provider: Hashable):
+        limits = [self._limit(self.hosts, host, self.host_limit, self.host_max)]
+        if provider is not None:
+            limits.append(self._limit(self.providers, provider, self.provider_limit, self.provider_max))
+        return limits
+
+    def _limit(self, limits: Dict[Hashable, AIMDLimit], key: Hashable, initial: float, maximum: float) -> AIMDLimit:
+        limit = limits.get(key)
+        if limit is None:
+            limit = limits[key] = AIMDLimit(initial, 1, maximum, 1, self.decrease, self.latency_spike, self.cooldown)
+        return limit
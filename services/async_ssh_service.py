@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, Tuple
+import asyncssh
+from services.output_buffer import CommandOutput, NodeOutput
+
+
+class AsyncSSHService:
+    """
+    Runs SSH sessions for every caller on one background event loop. Each
+    host keeps a single connection and commands to it run as separate
+    channels, so thousands of sessions can be in flight without holding an
+    OS thread each.
+    """
+    DEFAULT_MAX_SESSIONS = 1000
+    DEFAULT_TIMEOUT = 10
+    DEFAULT_COMMAND_TIMEOUT = 300
+    CHUNK_SIZE = 32768
+
+    def __init__(self, max_sessions: int = None, timeout: float = None):
+        self.max_sessions = int(max_sessions or os.getenv('ASYNC_SSH_MAX_SESSIONS', self.DEFAULT_MAX_SESSIONS))
+        self.timeout = float(timeout or os.getenv('SSH_TIMEOUT', self.DEFAULT_TIMEOUT))
+        self.command_timeout = float(os.getenv('NODE_TIMEOUT', self.DEFAULT_COMMAND_TIMEOUT))
+        self.logger = logging.getLogger(__name__)
+        self.connections: Dict[Tuple, asyncssh.SSHClientConnection] = {}
+        self.connection_locks: Dict[Tuple, asyncio.Lock] = {}
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = None
+        self.thread = threading.Thread(target=self._run_loop, name='async-ssh', daemon=True)
+        self.thread.start()
+
+    def submit(self, command: str, hostname: str, username: str, password: str = None, port: int = 22, output: CommandOutput = None, timeout: float = None) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.run(command, hostname, username, password, port, output, timeout), self.loop)
+
+    def execute_command(self, command: str, hostname: str, username: str, password: str = None, port: int = 22, output: CommandOutput = None, timeout: float = None) -> Tuple[str, str]:
+        return self.submit(command, hostname, username, password, port, output, timeout).result()
+
+    async def run(self, command: str, hostname: str, username: str, password: str = None, port: int = 22, output: CommandOutput = None, timeout: float = None) -> Tuple[str, str]:
+        # Commands past `timeout` raise and their channel is closed, so they never pin a session slot
+        timeout = timeout or self.command_timeout
+        async with self.semaphore:
+            connection = await self.connect(hostname, username, password, port)
+            try:
+                if output is not None:
+                    return await self.stream(connection, command, output, timeout)
+                # Leaving the block closes the channel, which run() does not do on timeout
+                async with connection.create_process(command) as process:
+                    result = await process.wait(check=False, timeout=timeout)
+            except (asyncssh.ChannelOpenError, asyncssh.ConnectionLost, ConnectionError):
+                await self.disconnect(hostname, username, port)
+                raise
+            self.logger.info(f"Command executed with exit status: {result.exit_status}")
+            return NodeOutput(result.stdout or '', result.stderr or '', result.exit_status)
+
+    async def stream(self, connection: asyncssh.SSHClientConnection, command: str, output: CommandOutput, timeout: float):
+        async def pump(reader: asyncssh.SSHReader, stream: str):
+            while chunk := await reader.read(self.CHUNK_SIZE):
+                output.write(stream, chunk)
+
+        async def drain(process: asyncssh.SSHClientProcess):
+            await asyncio.gather(pump(process.stdout, 'stdout'), pump(process.stderr, 'stderr'))
+            return await process.wait(check=False)
+
+        async with connection.create_process(command, encoding=None) as process:
+            result = await asyncio.wait_for(drain(process), timeout)
+        output.close(result.exit_status)
+        self.logger.info(f"Command executed with exit status: {result.exit_status}")
+        return NodeOutput(output.stdout, output.stderr, result.exit_status)
+
+    async def connect(self, hostname: str, username: str, password: str = None, port: int = 22) -> asyncssh.SSHClientConnection:
+        key = (hostname, username, port)
+        lock = self.connection_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            connection = self.connections.get(key)
+            if connection is not None and not connection.is_closed():
+                return connection
+
+            self.logger.info(f"Attempting to connect to {hostname} as {username}")
+            connection = await asyncio.wait_for(
+                asyncssh.connect(
+                    hostname,
+                    port=port,
+                    username=username,
+                    password=password,
+                    known_hosts=None,
+                    client_keys=None,
+                ),
+                timeout=self.timeout
+            )
+            self.connections[key] = connection
+            return connection
+
+    async def disconnect(self, hostname: str, username: str, port: int = 22):
+        connection = self.connections.pop((hostname, username, port), None)
+        if connection is not None:
+            connection.close()
+            await connection.wait_closed()
+
+    def close(self):
+        async def close_all():
+            for hostname, username, port in list(self.connections):
+                await self.disconnect(hostname, username, port)
+
+        asyncio.run_coroutine_threadsafe(close_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.semaphore = asyncio.Semaphore(self.max_sessions)
+        self.loop.run_forever()
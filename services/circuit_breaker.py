@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from enum import Enum
+from typing import Dict, Hashable
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures so callers fail
+    fast instead of waiting on connect timeouts. After `reset_timeout`
+    seconds, or as soon as a liveness probe succeeds, it goes half-open and
+    lets a single trial call through: success closes it, failure opens it
+    again. A successful probe also clears the failures of a closed breaker,
+    so only consecutive failures open it.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> BreakerState:
+        with self.lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        with self.lock:
+            state = self._current_state()
+            if state is BreakerState.CLOSED:
+                return True
+            if state is BreakerState.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self._state = BreakerState.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self._current_state() is BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._state = BreakerState.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Gives back a half-open trial that was granted but never attempted."""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def half_open(self):
+        """Called when a probe reached the node: an open breaker may try again now, a closed one forgets its failures."""
+        with self.lock:
+            if self._state is BreakerState.OPEN:
+                self._state = BreakerState.HALF_OPEN
+            elif self._state is BreakerState.CLOSED:
+                self.failures = 0
+
+    def _current_state(self) -> BreakerState:
+        if self._state is BreakerState.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = BreakerState.HALF_OPEN
+        return self._state
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per node, created on first use."""
+    DEFAULT_FAILURE_THRESHOLD = 3
+    DEFAULT_RESET_TIMEOUT = 60
+
+    def __init__(self, failure_threshold: int = None, reset_timeout: float = None):
+        self.failure_threshold = int(failure_threshold or os.getenv('BREAKER_FAILURE_THRESHOLD', self.DEFAULT_FAILURE_THRESHOLD))
+        self.reset_timeout = float(reset_timeout or os.getenv('BREAKER_RESET_TIMEOUT', self.DEFAULT_RESET_TIMEOUT))
+        self.breakers: Dict[Hashable, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    def get(self, node_id: Hashable) -> CircuitBreaker:
+        breaker = self.breakers.get(node_id)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.setdefault(node_id, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+        return breaker
+
+    def allow(self, node_id: Hashable) -> bool:
+        return self.get(node_id).allow()
+
+    def get_states(self) -> Dict[str, str]:
+        return {str(node_id): breaker.state.value for node_id, breaker in list(self.breakers.items())}
@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class CredentialCache:
+    """
+    Bounded, TTL'd cache of decrypted secrets. Secrets are held in bytearrays
+    that are overwritten with zeros when evicted, expired or invalidated.
+    Strings handed out by `get` are ordinary Python strings and are not
+    covered by the zeroization.
+    """
+    DEFAULT_MAX_ENTRIES = 4096
+    DEFAULT_TTL = 300
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = int(max_entries or os.getenv('CREDENTIAL_CACHE_SIZE', self.DEFAULT_MAX_ENTRIES))
+        self.ttl = float(ttl or os.getenv('CREDENTIAL_CACHE_TTL', self.DEFAULT_TTL))
+        self.entries: OrderedDict[Hashable, Tuple[bytearray, float]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._evict(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].decode()
+
+    def put(self, key: Hashable, secret: Optional[str]):
+        if secret is None:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._evict(key)
+            self.entries[key] = (bytearray(secret.encode()), time.monotonic() + self.ttl)
+            while len(self.entries) > self.max_entries:
+                self._evict(next(iter(self.entries)))
+
+    def invalidate(self, key: Hashable):
+        with self.lock:
+            if key in self.entries:
+                self._evict(key)
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self._evict(key)
+
+    def _evict(self, key: Hashable):
+        secret, _ = self.entries.pop(key)
+        secret[:] = bytes(len(secret))
@@ -1,20 +1,82 @@
 import base64
-from hashlib import pbkdf2_hmac
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
+from sqlalchemy_utils.types.encrypted.encrypted_type import AesEngine
+
+
+DERIVED_KEY_CACHE_SIZE = 32
+# Cache entries are keyed by an HMAC under a per-process secret, so the cache never holds a password
+_CACHE_KEY_SECRET = os.urandom(32)
+_derived_keys: OrderedDict = OrderedDict()
+_derived_keys_lock = threading.Lock()
+
+
+def derive_key(password: str, salt: bytes) -> bytes:
+    # 100k PBKDF2 rounds: computed once per (password, salt) per process
+    cache_key = (hmac.new(_CACHE_KEY_SECRET, password.encode(), hashlib.sha256).digest(), salt)
+    with _derived_keys_lock:
+        key = _derived_keys.get(cache_key)
+        if key is not None:
+            _derived_keys.move_to_end(cache_key)
+            return key
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        iterations=100000,
+        salt=salt,
+        length=32,
+        backend=default_backend()
+    )
+    key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    with _derived_keys_lock:
+        _derived_keys[cache_key] = key
+        while len(_derived_keys) > DERIVED_KEY_CACHE_SIZE:
+            _derived_keys.popitem(last=False)
+    return key
+
+def clear_derived_keys():
+    with _derived_keys_lock:
+        _derived_keys.clear()
+
+
+@lru_cache(maxsize=32)
+def hash_engine_key(key: bytes) -> bytes:
+    digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
+    digest.update(key)
+    return digest.finalize()
+
+
+class CachedAesEngine(AesEngine):
+    """
+    AesEngine that only rebuilds its cipher when the column key changes.
+    EncryptedType calls _update_key on every bind and every loaded row, which
+    otherwise re-hashes the key and recreates the cipher per value.
+    """
+    _UNSET = object()
+
+    def _update_key(self, key):
+        if isinstance(key, str):
+            key = key.encode()
+        # A sentinel, not None, so a missing key is reported instead of skipping initialization
+        if getattr(self, 'current_key', self._UNSET) == key:
+            return
+        if key is None:
+            raise ValueError("No encryption key configured; set SALT")
+        self._initialize_engine(hash_engine_key(key))
+        self.current_key = key
+
 
 class Crypto:
+    @staticmethod
     def generate_key(password, salt):
-        kdf = pbkdf2_hmac(
-            algorithm=hashes.SHA256(),
-            iterations=100000,
-            salt=salt,
-            length=32,
-            backend=default_backend()
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        return key
+        return derive_key(password, salt)
 
     def decrypt_data(self, encrypted_data, key):
         cipher = Fernet(key)
@@ -24,4 +86,4 @@ class Crypto:
     def encrypt_data(self, data, key):
         cipher = Fernet(key)
         encrypted_data = cipher.encrypt(data.encode())
-        return encrypted_data
\ No newline at end of file
+        return encrypted_data
@@ -0,0 +1,212 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from services.db.db_service import DBService
+from services.db.models import Balance, BalanceRollup, CompactionHorizon, DataVersion
+
+
+class BalanceSeries:
+    """
+    Time-series view over the balances table. Raw samples are rolled up into
+    hourly and daily buckets, and samples older than the raw retention window
+    are compacted away once their buckets exist. Compaction records how far
+    it got, so samples that arrive later for an already compacted range are
+    merged into its buckets instead of replacing their history.
+    """
+    PERIODS = {
+        'hour': '%Y-%m-%d %H:00:00',
+        'day': '%Y-%m-%d 00:00:00',
+    }
+    DEFAULT_RAW_RETENTION_DAYS = 7
+    DEFAULT_HOURLY_RETENTION_DAYS = 90
+    # Widest range served from each resolution when none is requested
+    RAW_MAX_RANGE = timedelta(days=2)
+    HOURLY_MAX_RANGE = timedelta(days=60)
+    # CompactionHorizon row of this series: raw samples before it are gone
+    HORIZON = 'balance_compaction'
+    AGGREGATES = ('samples', 'free_sum', 'free_min', 'free_max', 'staked_sum', 'staked_min', 'staked_max')
+
+    def __init__(self, db_service: DBService, raw_retention_days: int = None, hourly_retention_days: int = None):
+        self.db_service = db_service
+        self.raw_retention = timedelta(days=int(raw_retention_days or os.getenv('BALANCE_RAW_RETENTION_DAYS', self.DEFAULT_RAW_RETENTION_DAYS)))
+        self.hourly_retention = timedelta(days=int(hourly_retention_days or os.getenv('BALANCE_HOURLY_RETENTION_DAYS', self.DEFAULT_HOURLY_RETENTION_DAYS)))
+
+    @property
+    def session(self):
+        return self.db_service.session
+
+    def get_latest_balances(self, wallet_ids: List[int] = None) -> List[Balance]:
+        """Latest sample per wallet in one query, served by the (wallet_id, date) index."""
+        latest = select(Balance.wallet_id, func.max(Balance.date).label('date')).group_by(Balance.wallet_id)
+        if wallet_ids is not None:
+            latest = latest.where(Balance.wallet_id.in_(wallet_ids))
+        latest = latest.subquery()
+
+        query = select(Balance).join(latest, (Balance.wallet_id == latest.c.wallet_id) & (Balance.date == latest.c.date))
+        return list(self.session.scalars(query.order_by(Balance.wallet_id)))
+
+    def get_balances(self, wallet_id: int, start: datetime, end: datetime) -> List[Balance]:
+        query = (
+            select(Balance)
+            .where(Balance.wallet_id == wallet_id, Balance.date >= start, Balance.date < end)
+            .order_by(Balance.date)
+        )
+        return list(self.session.scalars(query))
+
+    def get_rollups(self, wallet_id: int, period: str, start: datetime, end: datetime) -> List[BalanceRollup]:
+        query = (
+            select(BalanceRollup)
+            .where(
+                BalanceRollup.wallet_id == wallet_id,
+                BalanceRollup.period == period,
+                BalanceRollup.bucket_start >= start,
+                BalanceRollup.bucket_start < end,
+            )
+            .order_by(BalanceRollup.bucket_start)
+        )
+        return list(self.session.scalars(query))
+
+    def get_series(self, wallet_id: int, start: datetime, end: datetime, resolution: Optional[str] = None):
+        """Reads a range at `resolution` ('raw', 'hour' or 'day'), picking one from the range width if omitted."""
+        if resolution is None:
+            span = end - start
+            resolution = 'raw' if span <= self.RAW_MAX_RANGE else 'hour' if span <= self.HOURLY_MAX_RANGE else 'day'
+
+        if resolution == 'raw':
+            return self.get_balances(wallet_id, start, end)
+        return self.get_rollups(wallet_id, resolution, start, end)
+
+    def rollup(self, period: str, start: datetime = None, end: datetime = None) -> int:
+        """
+        Aggregates raw samples in [start, end) into `period` buckets. Only
+        complete buckets are written and existing ones are replaced, so
+        re-running over the same range is idempotent. Buckets before the
+        compaction horizon are left to `compact`, which merges late samples.
+        """
+        horizon = self.get_horizon()
+        if horizon is not None:
+            start = max(start, horizon) if start is not None else horizon
+        rows = self._aggregate(period, start, end or datetime.now())
+        if rows:
+            with self.db_service.session_scope() as session:
+                self._upsert(session, rows)
+        return len(rows)
+
+    def compact(self, now: datetime = None) -> Dict[str, int]:
+        """
+        Rolls up everything older than the raw retention window, then deletes
+        those raw samples and hourly buckets past their own retention. Cutoffs
+        are aligned to whole days so no bucket is left half compacted. Samples
+        that arrived since for already compacted days are added to their
+        buckets. Everything happens in one transaction.
+        """
+        now = now or datetime.now()
+        horizon = self.get_horizon()
+        raw_cutoff = self._bucket_start(now - self.raw_retention, 'day')
+        if horizon is not None:
+            raw_cutoff = max(raw_cutoff, horizon)
+        hourly_cutoff = self._bucket_start(now - self.hourly_retention, 'day')
+
+        rolled_up, merged = {}, 0
+        with self.db_service.session_scope() as session:
+            for period in self.PERIODS:
+                rows = self._aggregate(period, horizon, raw_cutoff)
+                late = self._aggregate(period, None, horizon) if horizon is not None else []
+                if period == 'hour':
+                    late = [row for row in late if row['bucket_start'] >= hourly_cutoff]
+                self._upsert(session, rows)
+                self._upsert(session, late, merge=True)
+                rolled_up[period] = len(rows)
+                merged += len(late)
+
+            raw_deleted = session.execute(delete(Balance).where(Balance.date < raw_cutoff)).rowcount
+            hourly_deleted = session.execute(
+                delete(BalanceRollup).where(BalanceRollup.period == 'hour', BalanceRollup.bucket_start < hourly_cutoff)
+            ).rowcount
+            self._set_horizon(session, raw_cutoff)
+
+        return {
+            "hourly_buckets": rolled_up['hour'],
+            "daily_buckets": rolled_up['day'],
+            "late_buckets_merged": merged,
+            "raw_deleted": raw_deleted,
+            "hourly_deleted": hourly_deleted,
+        }
+
+    def get_horizon(self) -> Optional[datetime]:
+        """Day before which raw samples have been compacted, None before the first compaction."""
+        horizon = self.session.execute(select(CompactionHorizon.horizon).where(CompactionHorizon.name == self.HORIZON)).scalar()
+        if horizon is not None:
+            return horizon
+        # Databases compacted before the horizon had its own table kept it in data_versions as a day ordinal
+        ordinal = self.db_service.get_data_version(self.HORIZON)
+        return datetime.fromordinal(ordinal) if ordinal else None
+
+    def _set_horizon(self, session, horizon: datetime):
+        statement = insert(CompactionHorizon).values(name=self.HORIZON, horizon=horizon)
+        session.execute(statement.on_conflict_do_update(index_elements=['name'], set_={'horizon': statement.excluded.horizon}))
+        session.execute(delete(DataVersion).where(DataVersion.name == self.HORIZON))
+
+    def _aggregate(self, period: str, start: Optional[datetime], end: datetime) -> List[Dict]:
+        bucket_format = self.PERIODS[period]
+        end = self._bucket_start(end, period)
+        bucket = func.strftime(bucket_format, Balance.date).label('bucket')
+
+        query = (
+            select(
+                Balance.wallet_id,
+                Balance.blockchain,
+                bucket,
+                func.count().label('samples'),
+                func.sum(Balance.free).label('free_sum'),
+                func.min(Balance.free).label('free_min'),
+                func.max(Balance.free).label('free_max'),
+                func.sum(Balance.staked).label('staked_sum'),
+                func.min(Balance.staked).label('staked_min'),
+                func.max(Balance.staked).label('staked_max'),
+            )
+            .where(Balance.date < end)
+            .group_by(Balance.wallet_id, Balance.blockchain, bucket)
+        )
+        if start is not None:
+            query = query.where(Balance.date >= self._bucket_start(start, period))
+
+        rows = []
+        for row in self.session.execute(query):
+            values = row._asdict()
+            values['bucket_start'] = datetime.strptime(values.pop('bucket'), '%Y-%m-%d %H:%M:%S')
+            values['period'] = period
+            rows.append(values)
+        return rows
+
+    def _upsert(self, session, rows: List[Dict], merge: bool = False):
+        """Writes buckets, replacing existing ones or, with `merge`, adding to them."""
+        if not rows:
+            return
+        statement = insert(BalanceRollup)
+        new = statement.excluded
+        if merge:
+            current = BalanceRollup.__table__.c
+            values = {
+                'samples': current.samples + new.samples,
+                'free_sum': current.free_sum + new.free_sum,
+                'free_min': func.min(current.free_min, new.free_min),
+                'free_max': func.max(current.free_max, new.free_max),
+                'staked_sum': current.staked_sum + new.staked_sum,
+                'staked_min': func.min(current.staked_min, new.staked_min),
+                'staked_max': func.max(current.staked_max, new.staked_max),
+            }
+        else:
+            values = {column: new[column] for column in self.AGGREGATES}
+        statement = statement.on_conflict_do_update(
+            index_elements=['wallet_id', 'blockchain', 'period', 'bucket_start'],
+            set_=values,
+        )
+        session.execute(statement, rows)
+
+    def _bucket_start(self, moment: datetime, period: str) -> datetime:
+        if period == 'hour':
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
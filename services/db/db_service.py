@@ -1,34 +1,129 @@
+import logging
 import os
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from services.db.models import Base, Server, Wallet, Balance
+from typing import Dict, List
+from sqlalchemy import create_engine, event, insert, select, update
+from sqlalchemy.orm import Session, defer, scoped_session, sessionmaker
+from services.credential_cache import CredentialCache
+from services.metrics import Metrics
+from services.db.models import Base, DataVersion, Server, Wallet, Balance
 
 load_dotenv()
 
 class DBService:
+    SERVER_FIELDS = ('name', 'ip', 'active', 'username', 'password', 'role', 'owner', 'provider', 'os_version', 'blockchains')
+    WALLET_FIELDS = ('address', 'name', 'password', 'mnemonic', 'blockchain')
+    BALANCE_FIELDS = ('wallet_id', 'free', 'staked', 'blockchain', 'date')
+    # Keeps IN (...) lookups below SQLite's bound parameter limit
+    LOOKUP_CHUNK_SIZE = 500
+    DEFAULT_BUSY_TIMEOUT_MS = 5000
+    DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+    COMMIT_SECONDS = Metrics.shared().histogram('db_commit_seconds', 'Session commit time, including the flush')
+
     def __init__(self, database_path, session=None):
+        self.logger = logging.getLogger(__name__)
+        cache_enabled = os.getenv('CREDENTIAL_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        self.credential_cache = CredentialCache() if cache_enabled else None
+
+        # An explicit session (tests, scripts) is used as is and shared by every caller
+        if session:
+            self.engine = session.get_bind()
+            self.Session = None
+            self._session = session
+            self.time_commits(session)
+            return
+
         if not database_path:
             database_path = os.getenv('DB_PATH')
 
         expanded_path = os.path.expanduser(database_path)
         directory = os.path.dirname(expanded_path)
-        if not os.path.exists(directory):
+        if directory and not os.path.exists(directory):
             os.makedirs(directory)
         database_path = f'sqlite:///{expanded_path}'
+        self.logger.info(f"Using database {database_path}")
+
+        self.engine = self.build_engine(database_path)
+        Base.metadata.create_all(self.engine)
+        # create_all skips indexes added to tables that already exist
+        for index in Balance.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        # One session per thread, so APScheduler workers never share an identity map
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.time_commits(self.session_factory)
+        self.Session = scoped_session(self.session_factory)
+        self._session = None
+
+    @classmethod
+    def build_engine(cls, database_url: str):
+        busy_timeout = int(os.getenv('DB_BUSY_TIMEOUT_MS', cls.DEFAULT_BUSY_TIMEOUT_MS))
+        mmap_size = int(os.getenv('DB_MMAP_SIZE', cls.DEFAULT_MMAP_SIZE))
+        engine = create_engine(
+            database_url,
+            echo=os.getenv('DB_ECHO', '').lower() in ('1', 'true', 'yes'),
+            connect_args={'check_same_thread': False, 'timeout': busy_timeout / 1000},
+        )
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # WAL lets readers run while one writer commits; NORMAL only fsyncs at checkpoints
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+            cursor.execute(f"PRAGMA mmap_size={mmap_size}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
 
-        self.engine = create_engine(database_path, echo=True)
+        return engine
 
-        print(database_path)
+    @classmethod
+    def time_commits(cls, target):
+        """Records commit latency for a session or every session of a sessionmaker."""
+        @event.listens_for(target, 'before_commit')
+        def start_commit(session):
+            session.info['commit_started'] = time.perf_counter()
 
-        if not session:
-            engine = create_engine(database_path, echo=True)
-            Base.metadata.create_all(engine)
-            Session = sessionmaker(bind=engine)
-            session = Session()
+        @event.listens_for(target, 'after_commit')
+        def end_commit(session):
+            started = session.info.pop('commit_started', None)
+            if started is not None:
+                cls.COMMIT_SECONDS.observe(time.perf_counter() - started)
 
-        self.session = session
+    @property
+    def session(self) -> Session:
+        if self.Session is None:
+            return self._session
+        return self.Session()
+
+    @contextmanager
+    def session_scope(self):
+        """
+        Unit of work on a session of its own: commits on success, rolls back
+        on error and closes it. The thread's session is left alone, so work
+        the caller has pending there is neither committed nor discarded. An
+        explicit session is shared by every caller and used as is.
+        """
+        if self.Session is None:
+            session, owned = self._session, False
+        else:
+            session, owned = self.session_factory(), True
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            if owned:
+                session.close()
+
+    def remove_session(self):
+        if self.Session is not None:
+            self.Session.remove()
 
     def add_server(self, name, ip, active, username, password, role, os_version, blockchains):
         new_server = Server(
@@ -42,31 +137,77 @@ class DBService:
             blockchains=blockchains
         )
         self.session.add(new_server)
+        self._bump_data_version(Server.__tablename__)
         self.session.commit()
         return new_server
 
     def add_server_list(self, server_list):
-        for server_data in server_list:
-            self.add_server(
-                name=server_data['name'],
-                ip=server_data['ip'],
-                active=server_data['active'],
-                username=server_data['username'],
-                password=server_data['password'],
-                role=server_data['role'],
-                os_version=server_data['os_version'],
-                blockchains=server_data['blockchains']
-            )
+        self.add_servers_bulk(server_list)
         return True
 
+    def add_servers_bulk(self, server_list: List[Dict]) -> int:
+        rows = [self._pick(server_data, self.SERVER_FIELDS) for server_data in server_list]
+        return self._insert_rows(Server, rows, versioned=True)
+
+    def upsert_servers(self, server_list: List[Dict]) -> int:
+        count = self._upsert_rows(Server, 'ip', [self._pick(server_data, self.SERVER_FIELDS) for server_data in server_list], versioned=True)
+        if self.credential_cache is not None:
+            self.credential_cache.clear()
+        return count
+
+    def get_server_credentials(self, server_ids: List[int] = None) -> List[Dict]:
+        """
+        SSH credentials for the given servers (all when omitted). Only
+        passwords missing from the credential cache are loaded, so only
+        those rows pay for decryption.
+        """
+        query = select(Server.id, Server.name, Server.ip, Server.username).order_by(Server.id)
+        if server_ids is not None:
+            query = query.where(Server.id.in_(server_ids))
+        servers = self.session.execute(query).all()
+
+        passwords = {}
+        missing = []
+        for server in servers:
+            password = self.credential_cache.get(('server', server.id)) if self.credential_cache is not None else None
+            if password is None:
+                missing.append(server.id)
+            else:
+                passwords[server.id] = password
+
+        for start in range(0, len(missing), self.LOOKUP_CHUNK_SIZE):
+            chunk = missing[start:start + self.LOOKUP_CHUNK_SIZE]
+            for server_id, password in self.session.execute(select(Server.id, Server.password).where(Server.id.in_(chunk))):
+                passwords[server_id] = password
+                if self.credential_cache is not None:
+                    self.credential_cache.put(('server', server_id), password)
+
+        return [
+            {'id': server.id, 'name': server.name, 'ip': server.ip, 'username': server.username, 'password': passwords.get(server.id)}
+            for server in servers
+        ]
+
+    def get_data_version(self, name: str) -> int:
+        """Write counter of a versioned table (currently servers); 0 until its first write. Only counters live in data_versions."""
+        return self.session.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar() or 0
+
     def get_server_by_name(self, server_name):
         return self.session.query(Server).filter_by(name=server_name).first()
 
     def get_server_by_id(self, server_id):
         return self.session.get(Server, server_id)
 
-    def list_servers(self):
-        return self.session.query(Server).all()
+    def list_servers(self, server_ids: List[int] = None, with_passwords: bool = True):
+        """Servers by id (all when omitted); without passwords, no row is decrypted."""
+        query = self.session.query(Server)
+        if not with_passwords:
+            query = query.options(defer(Server.password))
+        if server_ids is None:
+            return query.all()
+        servers = []
+        for start in range(0, len(server_ids), self.LOOKUP_CHUNK_SIZE):
+            servers.extend(query.filter(Server.id.in_(server_ids[start:start + self.LOOKUP_CHUNK_SIZE])).all())
+        return servers
 
 
     def add_wallet(self, address, name, password, mnemonic, blockchain):
@@ -81,6 +222,9 @@ class DBService:
         self.session.commit()
         return new_wallet
 
+    def upsert_wallets(self, wallet_list: List[Dict]) -> int:
+        return self._upsert_rows(Wallet, 'address', [self._pick(wallet_data, self.WALLET_FIELDS) for wallet_data in wallet_list])
+
     def get_wallet_by_id(self, wallet_id):
         return self.session.get(Wallet, wallet_id)
 
@@ -100,6 +244,15 @@ class DBService:
         self.session.commit()
         return new_balance
 
+    def add_balances_bulk(self, balance_list: List[Dict]) -> int:
+        now = datetime.now()
+        rows = []
+        for balance_data in balance_list:
+            row = self._pick(balance_data, self.BALANCE_FIELDS)
+            row.setdefault('date', now)
+            rows.append(row)
+        return self._insert_rows(Balance, rows)
+
     def get_balance_by_id(self, balance_id):
         return self.session.get(Balance, balance_id)
 
@@ -108,8 +261,62 @@ class DBService:
         if wallet is None:
             return None
 
-        balance = self.session.query(Balance).filter_by(wallet_id=wallet.id).first()
-        return balance
+        return self.session.query(Balance).filter_by(wallet_id=wallet.id).order_by(Balance.date.desc()).first()
 
     def list_balances(self):
-        return self.session.query(Balance).all()
\ No newline at end of file
+        return self.session.query(Balance).all()
+
+    @staticmethod
+    def _pick(data: Dict, fields) -> Dict:
+        return {field: data[field] for field in fields if field in data}
+
+    def _bump_data_version(self, name: str):
+        """Runs inside the caller's transaction, so the counter moves exactly when the write commits."""
+        bumped = self.session.execute(update(DataVersion).where(DataVersion.name == name).values(version=DataVersion.version + 1))
+        if not bumped.rowcount:
+            self.session.execute(insert(DataVersion).values(name=name, version=1))
+
+    def _insert_rows(self, model, rows: List[Dict], versioned: bool = False) -> int:
+        if not rows:
+            return 0
+        try:
+            # One executemany INSERT and one commit for the whole list
+            self.session.execute(insert(model), rows)
+            if versioned:
+                self._bump_data_version(model.__tablename__)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return len(rows)
+
+    def _upsert_rows(self, model, key: str, rows: List[Dict], versioned: bool = False) -> int:
+        if not rows:
+            return 0
+
+        key_column = getattr(model, key)
+        keys = list({row[key] for row in rows})
+        existing = {}
+        for start in range(0, len(keys), self.LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + self.LOOKUP_CHUNK_SIZE]
+            existing.update(self.session.execute(select(key_column, model.id).where(key_column.in_(chunk))).all())
+
+        inserts, updates = {}, []
+        for row in rows:
+            if row[key] in existing:
+                updates.append({**row, 'id': existing[row[key]]})
+            else:
+                inserts[row[key]] = row
+
+        try:
+            if updates:
+                self.session.execute(update(model), updates)
+            if inserts:
+                self.session.execute(insert(model), list(inserts.values()))
+            if versioned:
+                self._bump_data_version(model.__tablename__)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return len(updates) + len(inserts)
@@ -1,10 +1,10 @@
 import os
 from dotenv import load_dotenv
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy_utils import StringEncryptedType
-from sqlalchemy_utils.types.encrypted.encrypted_type import AesEngine
+from services.crypto import CachedAesEngine
 
 load_dotenv()
 secret_key = os.getenv('SALT')
@@ -19,7 +19,7 @@ class Server(Base):
     ip = Column(String, nullable=False)
     active = Column(Boolean, default=True)
     username = Column(String, nullable=False)
-    password = Column(StringEncryptedType(String, secret_key, AesEngine, 'pkcs5'))
+    password = Column(StringEncryptedType(String, secret_key, CachedAesEngine, 'pkcs5'))
     role = Column(String)
     owner = Column(String)
     provider = Column(String)
@@ -29,14 +29,24 @@ class Server(Base):
     def __repr__(self):
         return f"<Server(name='{self.name}', ip='{self.ip}', owner={self.owner}, active={self.active})>"
 
+class DataVersion(Base):
+    """Counter bumped in the same commit as writes to a table, so caches built from it can tell they are stale."""
+    __tablename__ = 'data_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DataVersion(name='{self.name}', version={self.version})>"
+
 class Wallet(Base):
     __tablename__ = 'wallets'
     
     id = Column(Integer, primary_key=True)
     address = Column(String, unique=True, nullable=False)
     name = Column(String, nullable=False)
-    password = Column(StringEncryptedType(String, secret_key, AesEngine, 'pkcs5'))
-    mnemonic = Column(StringEncryptedType(String, secret_key, AesEngine, 'pkcs5'))
+    password = Column(StringEncryptedType(String, secret_key, CachedAesEngine, 'pkcs5'))
+    mnemonic = Column(StringEncryptedType(String, secret_key, CachedAesEngine, 'pkcs5'))
     blockchain = Column(String, nullable=False)
 
     def __repr__(self):
@@ -44,6 +54,10 @@ class Wallet(Base):
 
 class Balance(Base):
     __tablename__ = 'balances'
+    __table_args__ = (
+        Index('ix_balances_wallet_date', 'wallet_id', 'date'),
+        Index('ix_balances_date', 'date'),
+    )
     
     id = Column(Integer, primary_key=True)
     wallet_id = Column(Integer, ForeignKey('wallets.id'), nullable=False)
@@ -57,4 +71,84 @@ class Balance(Base):
     def __repr__(self):
         return f"<Balance(wallet_id={self.wallet_id}, free={self.free}, staked={self.staked}, blockchain='{self.blockchain}, date='{self.date}')>"
 
+class BalanceRollup(Base):
+    __tablename__ = 'balance_rollups'
+    __table_args__ = (
+        UniqueConstraint('wallet_id', 'blockchain', 'period', 'bucket_start', name='uq_balance_rollups_bucket'),
+        Index('ix_balance_rollups_wallet_period_bucket', 'wallet_id', 'period', 'bucket_start'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    wallet_id = Column(Integer, ForeignKey('wallets.id'), nullable=False)
+    blockchain = Column(String, nullable=False)
+    period = Column(String, nullable=False)  # 'hour' or 'day'
+    bucket_start = Column(DateTime, nullable=False)
+    samples = Column(Integer, nullable=False)
+    free_sum = Column(Float, nullable=False)
+    free_min = Column(Float, nullable=False)
+    free_max = Column(Float, nullable=False)
+    staked_sum = Column(Float, nullable=False)
+    staked_min = Column(Float, nullable=False)
+    staked_max = Column(Float, nullable=False)
+
+    @property
+    def free_avg(self):
+        return self.free_sum / self.samples
+
+    @property
+    def staked_avg(self):
+        return self.staked_sum / self.samples
+
+    def __repr__(self):
+        return f"<BalanceRollup(wallet_id={self.wallet_id}, period='{self.period}', bucket_start='{self.bucket_start}', free_avg={self.free_avg}, staked_avg={self.staked_avg}, samples={self.samples})>"
+
+class CompactionHorizon(Base):
+    """How far a compaction job got: the raw rows it covers before `horizon` are rolled up and gone."""
+    __tablename__ = 'compaction_horizons'
+
+    name = Column(String, primary_key=True)
+    horizon = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CompactionHorizon(name='{self.name}', horizon='{self.horizon}')>"
+
+class TaskRecord(Base):
+    __tablename__ = 'tasks'
+    __table_args__ = (
+        Index('ix_tasks_status', 'status'),
+        Index('ix_tasks_type', 'type'),
+        Index('ix_tasks_created_at', 'created_at'),
+    )
+
+    id = Column(String, primary_key=True)
+    type = Column(String, nullable=False)
+    description = Column(String)
+    command = Column(String)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+
+    results = relationship("TaskResult", back_populates="task", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<TaskRecord(id='{self.id}', type='{self.type}', status='{self.status}', created_at='{self.created_at}')>"
+
+class TaskResult(Base):
+    __tablename__ = 'task_results'
+    __table_args__ = (
+        UniqueConstraint('task_id', 'node_id', name='uq_task_results_node'),
+        Index('ix_task_results_node', 'node_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(String, ForeignKey('tasks.id'), nullable=False)
+    node_id = Column(String, nullable=False)
+    stdout = Column(String)
+    stderr = Column(String)
+
+    task = relationship("TaskRecord", back_populates="results")
+
+    def __repr__(self):
+        return f"<TaskResult(task_id='{self.task_id}', node_id='{self.node_id}')>"
+
 Wallet.balances = relationship("Balance", order_by=Balance.id, back_populates="wallet")
@@ -0,0 +1,216 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import selectinload
+from services.db.db_service import DBService
+from services.db.models import TaskRecord, TaskResult
+from services.result_store import ResultStore
+from services.task.task import Task
+from services.task.task_status import TaskStatus
+from services.task.task_store import TaskStore
+
+
+class StoredTask(Task):
+    """Finished task loaded back from the database."""
+
+    def __init__(self, record: TaskRecord):
+        try:
+            task_id = uuid.UUID(record.id)
+        except ValueError:
+            task_id = record.id
+        super().__init__(task_id, record.description, record.command, [])
+        self.status = TaskStatus[record.status]
+        self.created_at = record.created_at
+        self.finished_at = record.finished_at
+        self.stored_type = record.type
+        # Loaded copies are short-lived, so they don't take references in the shared store
+        self._result_store = ResultStore()
+        for result in record.results:
+            self.add_result(result.node_id, result.stdout if result.stderr is None else (result.stdout, result.stderr))
+
+    @property
+    def type_name(self) -> str:
+        return self.stored_type
+
+    def get_additional_info(self) -> List[str]:
+        return [f"Finished: {self.finished_at}"]
+
+
+class PersistentTaskStore(TaskStore):
+    """
+    Task store backed by SQLite. Finished tasks and their per-node results
+    are queued and written behind by a single thread, in batches of up to
+    `batch_size` per transaction, so the executor never waits on the
+    database. Tasks only leave the hot tier once they are written; lookups
+    and queries fall back to the database for evicted ones. A batch that
+    fails to write is queued again after a backoff that doubles up to
+    `MAX_RETRY_DELAY` seconds.
+    """
+    DEFAULT_BATCH_SIZE = 200
+    DEFAULT_FLUSH_INTERVAL = 1.0
+    DEFAULT_RETENTION_DAYS = 30
+    DEFAULT_RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(self, db_service: DBService, retention: int = None, batch_size: int = None, flush_interval: float = None, retention_days: int = None, retry_delay: float = None):
+        super().__init__(retention)
+        self.db_service = db_service
+        self.batch_size = int(batch_size or os.getenv('TASK_STORE_BATCH_SIZE', self.DEFAULT_BATCH_SIZE))
+        self.flush_interval = float(flush_interval or os.getenv('TASK_STORE_FLUSH_INTERVAL', self.DEFAULT_FLUSH_INTERVAL))
+        self.retention_days = int(retention_days or os.getenv('TASK_RETENTION_DAYS', self.DEFAULT_RETENTION_DAYS))
+        self.retry_delay = float(retry_delay or os.getenv('TASK_STORE_RETRY_DELAY', self.DEFAULT_RETRY_DELAY))
+        self.logger = logging.getLogger(__name__)
+        self.queue: queue.Queue = queue.Queue()
+        self.closing = threading.Event()
+        self.written = 0
+        self.failed_writes = 0
+        self.backoff = 0.0
+        self.thread = threading.Thread(target=self.writer, name='task-store-writer', daemon=True)
+        self.thread.start()
+
+    def finish(self, task: Task):
+        self.queue.put(task)
+
+    def get(self, task_id: uuid.UUID) -> Optional[Task]:
+        task = super().get(task_id)
+        if task is not None:
+            return task
+
+        with self.db_service.session_scope() as session:
+            query = select(TaskRecord).options(selectinload(TaskRecord.results)).where(TaskRecord.id == str(task_id))
+            record = session.scalars(query).first()
+            return StoredTask(record) if record else None
+
+    def query(self, status: TaskStatus = None, task_type: str = None, node_id: str = None, since: datetime = None, limit: int = 100) -> List[Task]:
+        """Newest first, merging hot tasks with the ones already written."""
+        tasks = {task.id: task for task in super().query(status, task_type, node_id, since, limit)}
+
+        query = select(TaskRecord).options(selectinload(TaskRecord.results))
+        if status is not None:
+            query = query.where(TaskRecord.status == status.name)
+        if task_type is not None:
+            query = query.where(TaskRecord.type == task_type)
+        if since is not None:
+            query = query.where(TaskRecord.created_at >= since)
+        if node_id is not None:
+            query = query.where(TaskRecord.id.in_(select(TaskResult.task_id).where(TaskResult.node_id == str(node_id))))
+        query = query.order_by(TaskRecord.created_at.desc()).limit(limit)
+
+        with self.db_service.session_scope() as session:
+            for record in session.scalars(query):
+                task = StoredTask(record)
+                tasks.setdefault(task.id, task)
+
+        return sorted(tasks.values(), key=lambda task: task.created_at, reverse=True)[:limit]
+
+    def writer(self):
+        while True:
+            batch = [self.queue.get()]
+            # Gather whatever else finishes within the flush interval into the same transaction
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            tasks = [task for task in batch if task is not None]
+            try:
+                if tasks:
+                    self.write(tasks)
+                    self.written += len(tasks)
+                    self.backoff = 0.0
+            except Exception as e:
+                self.failed_writes += 1
+                if None in batch:
+                    self.logger.error(f"Writing {len(tasks)} tasks failed while closing, they are not persisted: {e}")
+                else:
+                    # Requeued before task_done, so flush() keeps waiting until they are written
+                    self.backoff = min(max(self.backoff * 2, self.retry_delay), self.MAX_RETRY_DELAY)
+                    self.logger.error(f"Writing {len(tasks)} tasks failed, retrying in {self.backoff}s: {e}")
+                    self.closing.wait(self.backoff)
+                    for task in tasks:
+                        self.queue.put(task)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if None in batch:
+                return
+
+    def write(self, tasks: List[Task]):
+        # A task finishing twice in one batch (periodic runs) is written once with its latest state
+        latest = {task.id: task for task in tasks}
+        task_rows, result_rows = [], []
+        for task in latest.values():
+            task_rows.append({
+                'id': str(task.id),
+                'type': task.type_name,
+                'description': task.description,
+                'command': str(task.task_command),
+                'status': task.status.name,
+                'created_at': task.created_at,
+                'finished_at': task.finished_at,
+            })
+            for node_id, result in task.results.items():
+                result_rows.append({'task_id': str(task.id), 'node_id': str(node_id), **self.split_result(result)})
+
+        with self.db_service.session_scope() as session:
+            statement = insert(TaskRecord)
+            session.execute(statement.on_conflict_do_update(
+                index_elements=['id'],
+                set_={column: statement.excluded[column] for column in ('status', 'finished_at')}
+            ), task_rows)
+            if result_rows:
+                statement = insert(TaskResult)
+                session.execute(statement.on_conflict_do_update(
+                    index_elements=['task_id', 'node_id'],
+                    set_={column: statement.excluded[column] for column in ('stdout', 'stderr')}
+                ), result_rows)
+
+        # Only now that the rows are committed may eviction discard the output buffers' spill files
+        for task in latest.values():
+            self.release(task)
+
+    @classmethod
+    def split_result(cls, result) -> Dict[str, Optional[str]]:
+        if isinstance(result, (tuple, list)) and len(result) == 2:
+            return {'stdout': cls.full_text(result[0]), 'stderr': cls.full_text(result[1])}
+        return {'stdout': None if result is None else cls.full_text(result), 'stderr': None}
+
+    @staticmethod
+    def full_text(value) -> str:
+        # str() of an output buffer is only its in-memory tail; the spill file has the rest
+        read_all = getattr(value, 'read_all', None)
+        return read_all() if callable(read_all) else str(value)
+
+    def purge(self, now: datetime = None) -> int:
+        """Deletes finished tasks older than the retention window. Returns how many were deleted."""
+        cutoff = (now or datetime.now()) - timedelta(days=self.retention_days)
+        expired = select(TaskRecord.id).where(TaskRecord.created_at < cutoff, TaskRecord.finished_at.is_not(None))
+        with self.db_service.session_scope() as session:
+            session.execute(delete(TaskResult).where(TaskResult.task_id.in_(expired)))
+            return session.execute(delete(TaskRecord).where(TaskRecord.id.in_(expired))).rowcount
+
+    def flush(self):
+        """Blocks until everything queued so far is written."""
+        self.queue.join()
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'failed_writes': self.failed_writes,
+            'retry_delay': self.backoff,
+        }
+
+    def close(self):
+        self.closing.set()
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from services.db.models import Base, DataVersion
+from services.db.db_service import DBService
+from services.db.balance_series import BalanceSeries
+
+TEST_DATABASE_PATH = "sqlite:///:memory:"
+NOW = datetime(2024, 6, 30, 12, 30)
+
+
+@pytest.fixture(scope="function")
+def db_service():
+    engine = create_engine(TEST_DATABASE_PATH, echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield DBService(database_path=TEST_DATABASE_PATH, session=session)
+    Base.metadata.drop_all(engine)
+    session.close()
+
+@pytest.fixture(scope="function")
+def wallets(db_service: DBService):
+    wallets = [
+        db_service.add_wallet(address=f"0x{i}", name=f"Wallet {i}", password="password", mnemonic="mnemonic", blockchain="quilibrium")
+        for i in range(2)
+    ]
+    # One sample every 30 minutes over the last 10 days
+    db_service.add_balances_bulk([
+        {'wallet_id': wallet.id, 'free': float(step), 'staked': 1.0, 'blockchain': "quilibrium", 'date': NOW - timedelta(minutes=30 * step)}
+        for wallet in wallets
+        for step in range(480)
+    ])
+    return wallets
+
+def test_latest_balance_per_wallet(db_service: DBService, wallets):
+    series = BalanceSeries(db_service)
+    latest = series.get_latest_balances()
+    assert [(balance.wallet_id, balance.date, balance.free) for balance in latest] == [
+        (wallets[0].id, NOW, 0.0),
+        (wallets[1].id, NOW, 0.0),
+    ]
+    assert db_service.get_balance_by_wallet("Wallet 1").date == NOW
+
+def test_range_query(db_service: DBService, wallets):
+    series = BalanceSeries(db_service)
+    balances = series.get_balances(wallets[0].id, NOW - timedelta(hours=2), NOW)
+    assert [balance.free for balance in balances] == [4.0, 3.0, 2.0, 1.0]
+
+def test_rollups_are_idempotent(db_service: DBService, wallets):
+    series = BalanceSeries(db_service)
+    assert series.rollup('hour', start=NOW - timedelta(hours=3), end=NOW) == 6
+    assert series.rollup('hour', start=NOW - timedelta(hours=3), end=NOW) == 6
+
+    buckets = series.get_rollups(wallets[0].id, 'hour', datetime(2024, 6, 30, 9), NOW)
+    assert [bucket.samples for bucket in buckets] == [2, 2, 2]
+    assert buckets[-1].bucket_start == datetime(2024, 6, 30, 11)
+    assert buckets[-1].free_avg == 2.5
+    assert (buckets[-1].free_min, buckets[-1].free_max) == (2.0, 3.0)
+
+def test_compaction_keeps_history_in_rollups(db_service: DBService, wallets):
+    series = BalanceSeries(db_service, raw_retention_days=7, hourly_retention_days=8)
+    result = series.compact(now=NOW)
+    assert result["raw_deleted"] > 0
+
+    cutoff = datetime(2024, 6, 23)
+    assert series.get_balances(wallets[0].id, NOW - timedelta(days=30), cutoff) == []
+    assert series.get_balances(wallets[0].id, cutoff, NOW)[0].date == cutoff
+
+    daily = series.get_series(wallets[0].id, NOW - timedelta(days=30), cutoff, resolution='day')
+    assert sum(bucket.samples for bucket in daily) == 480 - len(series.get_balances(wallets[0].id, cutoff, NOW + timedelta(minutes=1)))
+    assert series.get_rollups(wallets[0].id, 'hour', NOW - timedelta(days=30), datetime(2024, 6, 22)) == []
+    assert len(series.get_rollups(wallets[0].id, 'hour', datetime(2024, 6, 22), cutoff)) == 24
+
+def test_series_picks_resolution_from_range(db_service: DBService, wallets):
+    series = BalanceSeries(db_service)
+    series.rollup('hour', end=NOW)
+    assert len(series.get_series(wallets[0].id, NOW - timedelta(days=1), NOW)) == 48
+    assert len(series.get_series(wallets[0].id, NOW - timedelta(days=5), NOW)) == 5 * 24 - 1
+
+def test_late_samples_are_merged_into_compacted_buckets(db_service: DBService, wallets):
+    series = BalanceSeries(db_service, raw_retention_days=7, hourly_retention_days=30)
+    series.compact(now=NOW)
+    day = datetime(2024, 6, 21)
+    before = series.get_rollups(wallets[0].id, 'day', day, day + timedelta(days=1))[0]
+    samples, free_sum = before.samples, before.free_sum
+
+    db_service.add_balances_bulk([
+        {'wallet_id': wallets[0].id, 'free': 1000.0, 'staked': 1.0, 'blockchain': "quilibrium", 'date': day + timedelta(hours=5, minutes=10)},
+    ])
+    # Rollups of the live range leave compacted buckets alone
+    series.rollup('day', end=NOW)
+    result = series.compact(now=NOW + timedelta(hours=1))
+    assert result['late_buckets_merged'] == 2
+    assert series.compact(now=NOW + timedelta(hours=2))['late_buckets_merged'] == 0
+
+    after = series.get_rollups(wallets[0].id, 'day', day, day + timedelta(days=1))[0]
+    assert (after.samples, after.free_sum, after.free_max) == (samples + 1, free_sum + 1000.0, 1000.0)
+    hour = series.get_rollups(wallets[0].id, 'hour', day + timedelta(hours=5), day + timedelta(hours=6))[0]
+    assert hour.samples == 3
+    assert series.get_balances(wallets[0].id, day, day + timedelta(days=1)) == []
+
+def test_horizon_is_kept_out_of_data_versions(db_service: DBService, wallets):
+    series = BalanceSeries(db_service, raw_retention_days=7, hourly_retention_days=8)
+    db_service.session.add(DataVersion(name=BalanceSeries.HORIZON, version=datetime(2024, 6, 20).toordinal()))
+    db_service.session.commit()
+    assert series.get_horizon() == datetime(2024, 6, 20)
+
+    series.compact(now=NOW)
+    assert series.get_horizon() == datetime(2024, 6, 23)
+    assert db_service.get_data_version(BalanceSeries.HORIZON) == 0
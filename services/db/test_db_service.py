@@ -1,7 +1,8 @@
+import threading
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from services.db.models import Base
+from services.db.models import Base, Wallet
 from services.db.db_service import DBService
 
 TEST_DATABASE_PATH = "sqlite:///:memory:"
@@ -198,3 +199,141 @@ def test_add_wallet_duplicate_address(db_service):
             mnemonic="mnemonic two",
             blockchain="Bitcoin"
         )
+
+# Bulk writes
+def make_servers(count, role="slave"):
+    return [
+        {
+            'name': f"Server {i}",
+            'ip': f"10.0.0.{i}",
+            'active': True,
+            'username': "admin",
+            'password': "password",
+            'role': role,
+            'os_version': "Ubuntu 22.04",
+            'blockchains': "quilibrium"
+        }
+        for i in range(count)
+    ]
+
+def test_add_servers_bulk(db_service):
+    assert db_service.add_servers_bulk(make_servers(50)) == 50
+    servers = db_service.list_servers()
+    assert len(servers) == 50
+    assert servers[10].ip == "10.0.0.10"
+    assert servers[10].password == "password"
+
+def test_add_server_list_uses_bulk_insert(db_service):
+    assert db_service.add_server_list(make_servers(3)) is True
+    assert [server.name for server in db_service.list_servers()] == ["Server 0", "Server 1", "Server 2"]
+
+def test_upsert_servers_by_ip(db_service):
+    db_service.add_servers_bulk(make_servers(2))
+    changed = make_servers(3, role="master")
+    changed[0]['name'] = "Renamed"
+    assert db_service.upsert_servers(changed) == 3
+
+    servers = db_service.list_servers()
+    assert len(servers) == 3
+    assert servers[0].name == "Renamed"
+    assert {server.role for server in servers} == {"master"}
+
+def test_upsert_wallets_by_address(db_service):
+    db_service.add_wallet(address="0x123", name="Wallet One", password="password", mnemonic="one", blockchain="Ethereum")
+    assert db_service.upsert_wallets([
+        {'address': "0x123", 'name': "Wallet Renamed"},
+        {'address': "0x456", 'name': "Wallet Two", 'password': "password", 'mnemonic': "two", 'blockchain': "Bitcoin"},
+    ]) == 2
+    wallets = db_service.list_wallets()
+    assert [wallet.name for wallet in wallets] == ["Wallet Renamed", "Wallet Two"]
+    assert wallets[0].mnemonic == "one"
+
+def test_add_balances_bulk(db_service):
+    wallet = db_service.add_wallet(address="0x123", name="Wallet One", password="password", mnemonic="one", blockchain="Ethereum")
+    assert db_service.add_balances_bulk([
+        {'wallet_id': wallet.id, 'free': float(i), 'staked': 0.0, 'blockchain': "Ethereum"}
+        for i in range(20)
+    ]) == 20
+    balances = db_service.list_balances()
+    assert len(balances) == 20
+    assert balances[-1].free == 19.0
+    assert balances[0].date is not None
+
+def test_bulk_insert_is_all_or_nothing(db_service):
+    with pytest.raises(Exception):
+        db_service.upsert_wallets([
+            {'address': "0x1", 'name': "Valid", 'blockchain': "Ethereum"},
+            {'address': "0x2", 'name': "Missing blockchain"},
+        ])
+    assert db_service.list_wallets() == []
+
+# Engine profile and sessions
+def test_file_database_uses_wal_profile(tmp_path):
+    db_service = DBService(database_path=str(tmp_path / "nodes" / "test.db"))
+    with db_service.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == DBService.DEFAULT_BUSY_TIMEOUT_MS
+    assert db_service.engine.echo is False
+
+def test_each_thread_gets_its_own_session(tmp_path):
+    db_service = DBService(database_path=str(tmp_path / "test.db"))
+    session_ids = []
+    lock = threading.Lock()
+    started = threading.Barrier(4)
+
+    def worker(index):
+        session = db_service.session
+        with lock:
+            session_ids.append(id(session))
+        # Every session is alive at once, so their ids cannot be reused
+        started.wait()
+        db_service.add_wallet(address=f"0x{index}", name="Wallet", password="password", mnemonic="mnemonic", blockchain="Ethereum")
+        started.wait()
+        db_service.remove_session()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(session_ids)) == 4
+    assert len(db_service.list_wallets()) == 4
+
+def test_session_scope_leaves_the_callers_session_alone(tmp_path):
+    db_service = DBService(database_path=str(tmp_path / "test.db"))
+    outer = db_service.session
+    outer.add(Wallet(address="0x1", name="Pending", blockchain="Ethereum"))
+
+    with db_service.session_scope() as session:
+        assert session is not outer
+        session.add(Wallet(address="0x2", name="Committed", blockchain="Ethereum"))
+
+    assert db_service.session is outer and outer.new
+    outer.rollback()
+    assert [wallet.name for wallet in db_service.list_wallets()] == ["Committed"]
+
+def test_session_scope_rolls_back_on_error(tmp_path):
+    db_service = DBService(database_path=str(tmp_path / "test.db"))
+    with pytest.raises(ValueError):
+        with db_service.session_scope() as session:
+            session.add(Wallet(address="0x1", name="Wallet", blockchain="Ethereum"))
+            session.flush()
+            raise ValueError("abort")
+    assert db_service.list_wallets() == []
+
+# Credentials
+def test_server_credentials_are_cached(db_service):
+    db_service.add_servers_bulk(make_servers(3))
+    credentials = db_service.get_server_credentials()
+    assert [credential['password'] for credential in credentials] == ["password"] * 3
+    assert db_service.credential_cache.misses == 3
+
+    assert db_service.get_server_credentials([credentials[1]['id']])[0]['ip'] == "10.0.0.1"
+    assert db_service.credential_cache.hits == 1
+
+    changed = make_servers(1)
+    changed[0]['password'] = "rotated"
+    db_service.upsert_servers(changed)
+    assert db_service.get_server_credentials()[0]['password'] == "rotated"
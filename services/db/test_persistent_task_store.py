@@ -0,0 +1,155 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from services.db.db_service import DBService
+from services.db.persistent_task_store import PersistentTaskStore
+from services.output_buffer import CommandOutput
+from services.task.simple_task import SimpleTask
+from services.task.task_status import TaskStatus
+from services.task.task_store import TaskStore
+from services.task_service import TaskService
+
+
+@pytest.fixture(scope="function")
+def store(tmp_path):
+    db_service = DBService(str(tmp_path / "tasks.db"))
+    store = PersistentTaskStore(db_service, retention=2, flush_interval=0.05)
+    yield store
+    store.close()
+    db_service.engine.dispose()
+
+def make_task(description="uptime", results=None):
+    task = SimpleTask(uuid.uuid4(), description, "uptime", [])
+    for node_id, result in (results or {}).items():
+        task.add_result(node_id, result)
+    return task
+
+def finish(store, task, status=TaskStatus.COMPLETED):
+    task.status = status
+    task.finished_at = datetime.now()
+    store.finish(task)
+
+def test_finished_tasks_are_written_behind_and_evicted(store: PersistentTaskStore):
+    tasks = [make_task(results={"node-1": (f"out {i}", ''), "node-2": "transferred"}) for i in range(5)]
+    for task in tasks:
+        store.add(task)
+        finish(store, task)
+    store.flush()
+
+    assert len(store.tasks) == 2
+    assert set(store.tasks) == {tasks[3].id, tasks[4].id}
+    stored = store.get(tasks[0].id)
+    assert stored.id == tasks[0].id
+    assert stored.status is TaskStatus.COMPLETED
+    assert stored.type_name == "SimpleTask"
+    assert stored.results == {"node-1": ("out 0", ''), "node-2": "transferred"}
+
+def test_active_tasks_stay_in_memory(store: PersistentTaskStore):
+    active = [make_task() for _ in range(3)]
+    for task in active:
+        store.add(task)
+    for _ in range(3):
+        task = make_task()
+        store.add(task)
+        finish(store, task)
+    store.flush()
+
+    assert all(task.id in store.tasks for task in active)
+    assert len(store.tasks) == 5
+
+def test_refinished_tasks_update_their_row(store: PersistentTaskStore):
+    task = make_task(results={"node-1": ("first", '')})
+    store.add(task)
+    finish(store, task, TaskStatus.FAILED)
+    store.flush()
+    task.add_result("node-1", ("second", ''))
+    finish(store, task)
+    store.flush()
+    restarted = PersistentTaskStore(store.db_service)
+
+    stored = restarted.get(task.id)
+    assert stored.status is TaskStatus.COMPLETED
+    assert stored.results["node-1"] == ("second", '')
+
+def test_query_merges_hot_and_stored_tasks(store: PersistentTaskStore):
+    failed = make_task("failed", {"node-1": ('', "refused")})
+    done = [make_task("done", {"node-2": ("ok", '')}) for _ in range(3)]
+    running = make_task("running")
+    for task in [failed, *done, running]:
+        store.add(task)
+    finish(store, failed, TaskStatus.FAILED)
+    for task in done:
+        finish(store, task)
+    store.flush()
+
+    assert [task.id for task in store.query(status=TaskStatus.FAILED)] == [failed.id]
+    assert {task.id for task in store.query(node_id="node-2")} == {task.id for task in done}
+    assert len(store.query(task_type="SimpleTask")) == 5
+    assert [task.id for task in store.query(limit=1)] == [running.id]
+    assert store.query(since=datetime.now() + timedelta(minutes=1)) == []
+
+def test_purge_deletes_expired_tasks(store: PersistentTaskStore):
+    old, recent = make_task(results={"node-1": "old"}), make_task()
+    old.created_at = datetime.now() - timedelta(days=60)
+    for task in (old, recent):
+        store.add(task)
+        finish(store, task)
+    store.flush()
+    restarted = PersistentTaskStore(store.db_service)
+
+    assert restarted.purge() == 1
+    assert restarted.get(old.id) is None
+    assert restarted.get(recent.id) is not None
+
+def test_memory_store_bounds_finished_tasks():
+    store = TaskStore(retention=3)
+    service = TaskService(store)
+    tasks = [make_task() for _ in range(10)]
+    for task in tasks:
+        store.add(task)
+        service.update_task_status(task.id, TaskStatus.COMPLETED)
+
+    assert list(store.tasks) == [task.id for task in tasks[-3:]]
+    assert tasks[-1].finished_at is not None
+
+def test_spilled_output_is_written_in_full(store: PersistentTaskStore, tmp_path):
+    output = CommandOutput(max_bytes=4)
+    output.stdout.spill_dir = str(tmp_path)
+    output.write('stdout', b"more than four bytes")
+    output.close(0)
+    spill_path = output.stdout.spill_path
+    tasks = [make_task(results={"node-1": (output.stdout, output.stderr)})] + [make_task() for _ in range(2)]
+    for task in tasks:
+        store.add(task)
+        finish(store, task)
+    store.flush()
+
+    assert tasks[0].id not in store.tasks
+    assert store.get(tasks[0].id).results["node-1"] == ("more than four bytes", '')
+    assert not os.path.exists(spill_path)
+
+def test_failed_writes_are_retried(tmp_path):
+    db_service = DBService(str(tmp_path / "tasks.db"))
+    store = PersistentTaskStore(db_service, retention=1, flush_interval=0.01, retry_delay=0.01)
+    write, failures = store.write, []
+
+    def flaky_write(tasks):
+        if len(failures) < 2:
+            failures.append(len(tasks))
+            raise OSError("database is locked")
+        write(tasks)
+
+    store.write = flaky_write
+    tasks = [make_task(results={"node-1": ("out", '')}) for _ in range(2)]
+    for task in tasks:
+        store.add(task)
+        finish(store, task)
+    store.flush()
+
+    assert failures and store.get_stats()['failed_writes'] == 2
+    assert store.get_stats()['written'] == 2 and store.get_stats()['retry_delay'] == 0
+    assert set(store.tasks) == {tasks[1].id}
+    assert store.get(tasks[0].id).results == {"node-1": ("out", '')}
+    store.close()
+    db_service.engine.dispose()
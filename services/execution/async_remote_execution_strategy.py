@@ -0,0 +1,31 @@
+import threading
+from concurrent.futures import Future
+from registry import Registry
+from services.async_ssh_service import AsyncSSHService
+from services.execution.execution_strategy import ExecutionStrategy
+from services.execution.remote_execution_strategy import RemoteExecutionStrategy
+from services.output_buffer import CommandOutput
+from services.ssh_service import SSHService
+
+_service_lock = threading.Lock()
+
+
+class AsyncRemoteExecutionStrategy(ExecutionStrategy):
+    def __init__(self):
+        with _service_lock:
+            self.ssh_service = Registry.get('async_ssh_service')
+            if self.ssh_service is None:
+                self.ssh_service = AsyncSSHService()
+                Registry.register('async_ssh_service', self.ssh_service)
+
+    def execute_command(self, command: str, ip: str, username: str, password: str, port: int = 22, local_path: str = None, remote_path: str = None, output: CommandOutput = None, timeout: float = None) -> str:
+        if command in SSHService.SFTP_COMMANDS:
+            # File transfers go through paramiko's SFTP client
+            return RemoteExecutionStrategy().execute_command(command, ip, username, password, port, local_path, remote_path, timeout=timeout)
+        try:
+            return self.ssh_service.execute_command(command, ip, username, password, port, output, timeout)
+        except Exception as e:
+            print(f"ASYNC REMOTE execution failed: {str(e)}")
+
+    def submit_command(self, command: str, ip: str, username: str, password: str, port: int = 22, output: CommandOutput = None, timeout: float = None) -> Future:
+        return self.ssh_service.submit(command, ip, username, password, port, output, timeout)
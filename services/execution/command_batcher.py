@@ -0,0 +1,143 @@
+import os
+import shlex
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from services.node.node import Node
+from services.output_buffer import NodeOutput
+from services.tracing import Span, Tracer
+
+
+class CommandResult(NamedTuple):
+    stdout: str
+    stderr: str
+    exit_status: int
+
+
+def batch_script(commands: List[str], token: str) -> str:
+    """
+    Shell script that runs every command concurrently in its own `sh -c`,
+    captures stdout, stderr and exit status per command and prints them
+    framed by `token` so they can be split apart again.
+    """
+    lines = ['d=$(mktemp -d)']
+    for index, command in enumerate(commands):
+        lines.append(f'sh -c {shlex.quote(command)} >"$d/{index}.out" 2>"$d/{index}.err" </dev/null & p{index}=$!')
+    for index in range(len(commands)):
+        lines.append(f'wait $p{index}; r{index}=$?')
+    for index in range(len(commands)):
+        lines.append(
+            f'printf "%s %s %s\\n" {token} {index} "$r{index}"; cat "$d/{index}.out"; '
+            f'printf "\\n%s\\n" {token}; cat "$d/{index}.err"; printf "\\n%s\\n" {token}'
+        )
+    lines.append('rm -rf "$d"')
+    return '\n'.join(lines)
+
+
+def split_batch_output(output: str, token: str, count: int) -> List[CommandResult]:
+    results = []
+    separator = f"\n{token}\n"
+    position = 0
+    for index in range(count):
+        header = f"{token} {index} "
+        start = output.index(header, position) + len(header)
+        end_of_header = output.index("\n", start)
+        exit_status = int(output[start:end_of_header])
+        end_of_stdout = output.index(separator, end_of_header + 1)
+        end_of_stderr = output.index(separator, end_of_stdout + len(separator))
+        stdout = output[end_of_header + 1:end_of_stdout]
+        stderr = output[end_of_stdout + len(separator):end_of_stderr]
+        results.append(CommandResult(stdout, stderr, exit_status))
+        position = end_of_stderr + len(separator)
+    return results
+
+
+class CommandBatcher:
+    """
+    Coalesces commands sent to the same node within `window` seconds into a
+    single remote invocation, so periodic checks from many tasks share one
+    session instead of paying setup per command. `run(node, command)` runs a
+    command on a node and returns (stdout, stderr) or None, like the
+    execution strategies. Each submitted command gets its own future that
+    resolves to its demultiplexed (stdout, stderr), carrying its exit status.
+
+    Off by default: every command then waits up to `window` for company, and
+    a batch resolves only once its slowest command has exited.
+    """
+    DEFAULT_WINDOW = 0
+    DEFAULT_MAX_BATCH = 32
+
+    def __init__(self, run: Callable[[Node, str], Optional[Tuple[str, str]]], submit: Callable = None, window: float = None, max_batch: int = None):
+        self.run = run
+        self.submit_batch = submit or (lambda function, *args: threading.Thread(target=function, args=args, daemon=True).start())
+        self.window = float(window if window is not None else os.getenv('COMMAND_BATCH_WINDOW', self.DEFAULT_WINDOW))
+        self.max_batch = int(max_batch or os.getenv('COMMAND_BATCH_MAX', self.DEFAULT_MAX_BATCH))
+        self.pending: Dict[Tuple, Tuple[Node, List[Tuple[str, Future, Optional[Span]]]]] = {}
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.commands = 0
+
+    def submit(self, node: Node, command: str, span: Span = None) -> Future:
+        future = Future()
+        key = (node.ip, node.username, node.port)
+        with self.lock:
+            node, entries = self.pending.setdefault(key, (node, []))
+            entries.append((command, future, span))
+            full = len(entries) >= self.max_batch
+            first = len(entries) == 1
+            if full:
+                del self.pending[key]
+
+        if full:
+            self.submit_batch(self.run_batch, node, entries)
+        elif first:
+            timer = threading.Timer(self.window, self.flush, args=(key,))
+            timer.daemon = True
+            timer.start()
+        return future
+
+    def flush(self, key: Tuple):
+        with self.lock:
+            batch = self.pending.pop(key, None)
+        if batch:
+            self.submit_batch(self.run_batch, *batch)
+
+    def run_batch(self, node: Node, entries: List[Tuple[str, Future, Optional[Span]]]):
+        # Futures cancelled by a timeout while waiting in the window are dropped
+        entries = [entry for entry in entries if entry[1].set_running_or_notify_cancel()]
+        if not entries:
+            return
+        self.batches += 1
+        self.commands += len(entries)
+
+        # The session's connect, auth and exec spans go under the first command; the others point at it
+        spans = [span for _, _, span in entries if span is not None]
+        for span in spans[1:]:
+            span.set(batched_with=spans[0].span_id)
+        try:
+            with Tracer.shared().activate(spans[0] if spans else None):
+                if len(entries) == 1:
+                    results = [self.run(node, entries[0][0])]
+                else:
+                    token = f"BATCH-{uuid.uuid4().hex}"
+                    output = self.run(node, batch_script([command for command, _, _ in entries], token))
+                    if output is None or token not in output[0]:
+                        # The batch never ran, every command gets the strategy's error
+                        results = [output] * len(entries)
+                    else:
+                        results = [NodeOutput(*result) for result in split_batch_output(output[0], token, len(entries))]
+        except Exception as e:
+            for _, future, _ in entries:
+                future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(entries, results):
+            future.set_result(result)
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'batches': self.batches,
+            'commands': self.commands,
+            'commands_per_batch': self.commands / self.batches if self.batches else 0.0,
+        }
@@ -8,5 +8,6 @@ class ExecutionFactory:
         module = import_module(module_name, package='services.execution')
         print(f"Module loaded from Execution Strategy: {module}")
         
-        strategy_class = getattr(module, f'{execution_mode.capitalize()}ExecutionStrategy')
+        class_prefix = ''.join(part.capitalize() for part in execution_mode.split('_'))
+        strategy_class = getattr(module, f'{class_prefix}ExecutionStrategy')
         return strategy_class()
\ No newline at end of file
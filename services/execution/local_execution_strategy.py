@@ -3,9 +3,9 @@ from services.execution.execution_strategy import ExecutionStrategy
 
 
 class LocalExecutionStrategy(ExecutionStrategy):
-    def execute_command(self, command: str) -> str:
+    def execute_command(self, command: str, *args, timeout: float = None, **kwargs) -> str:
         try:
-            result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+            result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True, timeout=timeout)
             return result.stdout
         except subprocess.CalledProcessError as e:
             raise Exception(f"Error executing local command: {e.stderr}")
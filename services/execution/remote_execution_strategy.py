@@ -1,13 +1,18 @@
+from registry import Registry
+from services.output_buffer import CommandOutput
 from services.ssh_service import SSHService
 from services.execution.execution_strategy import ExecutionStrategy
 
 class RemoteExecutionStrategy(ExecutionStrategy):
-    def execute_command(self, command: str, ip: str, username: str, password: str) -> str:
+    def __init__(self):
+        self.ssh_pool = Registry.get('ssh_pool')
+
+    def execute_command(self, command: str, ip: str, username: str, password: str, port: int = 22, local_path: str = None, remote_path: str = None, output: CommandOutput = None, timeout: float = None) -> str:
         try:
-            client = SSHService(ip, username, password)
-            output = client.execute_command(command)
-            return output
+            if self.ssh_pool:
+                return self.ssh_pool.execute_command(command, ip, username, password, port=port, local_path=local_path, remote_path=remote_path, output=output, timeout=timeout)
+
+            client = SSHService(ip, username, password, port=port)
+            return client.execute_command(command, local_path=local_path, remote_path=remote_path, output=output, timeout=timeout)
         except Exception as e:
             print(f"REMOTE execution failed: {str(e)}")
-        finally:
-            client.close()
@@ -0,0 +1,56 @@
+import time
+import pytest
+from registry import Registry
+from services.execution.execution_factory import ExecutionFactory
+from services.execution.remote_execution_strategy import RemoteExecutionStrategy
+from services.output_buffer import CommandOutput
+from testing.fake_ssh_server import FakeSSHServer
+
+
+@pytest.fixture(scope="module")
+def ssh_server():
+    with FakeSSHServer(latency=0.2) as server:
+        yield server
+
+@pytest.fixture(scope="module")
+def strategy():
+    strategy = ExecutionFactory.get_execution_strategy("async_remote")
+    yield strategy
+    strategy.ssh_service.close()
+    Registry.remove('async_ssh_service')
+
+def test_execute_command(strategy, ssh_server: FakeSSHServer):
+    result = strategy.execute_command("uptime", ssh_server.host, "root", "password", port=ssh_server.port)
+    assert result == ("uptime\n", '')
+    assert result.exit_status == 0
+
+def test_same_result_contract_as_remote_strategy(strategy, ssh_server: FakeSSHServer):
+    remote = RemoteExecutionStrategy().execute_command("whoami", ssh_server.host, "root", "password", port=ssh_server.port)
+    assert strategy.execute_command("whoami", ssh_server.host, "root", "password", port=ssh_server.port) == remote
+    assert remote.exit_status == 0
+
+def test_sessions_run_concurrently_on_one_loop(strategy, ssh_server: FakeSSHServer):
+    start = time.monotonic()
+    futures = [
+        strategy.submit_command(f"echo {i}", ssh_server.host, "root", "password", port=ssh_server.port)
+        for i in range(200)
+    ]
+    results = [future.result() for future in futures]
+    assert time.monotonic() - start < 5
+    assert results[42] == ("echo 42\n", '')
+
+def test_streamed_output_is_bounded(strategy, ssh_server: FakeSSHServer):
+    command = "x" * 100
+    for execution_strategy in (strategy, RemoteExecutionStrategy()):
+        chunks = []
+        output = CommandOutput(max_bytes=32, on_chunk=lambda stream, chunk: chunks.append(chunk))
+        stdout, stderr = execution_strategy.execute_command(command, ssh_server.host, "root", "password", port=ssh_server.port, output=output)
+        assert stdout.total_bytes == 101
+        assert stdout.tail() == f"{command}\n"[-32:]
+        assert stdout.read_all() == f"{command}\n"
+        assert b"".join(chunks) == f"{command}\n".encode()
+        assert output.exit_status == 0
+        stdout.discard()
+
+def test_unreachable_host_returns_none(strategy):
+    assert strategy.execute_command("uptime", "127.0.0.1", "root", "password", port=1) is None
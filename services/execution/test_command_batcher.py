@@ -0,0 +1,122 @@
+import subprocess
+import threading
+import time
+from services.execution.command_batcher import CommandBatcher, batch_script, split_batch_output
+from services.node.node import Node
+from services.task.simple_task import SimpleTask
+from services.task.task_executor import TaskExecutor
+from services.task.test_task_executor import FakeTaskManager, FakeTaskService
+from services.tracing import Tracer
+
+
+def make_node(name, ip="10.0.0.1"):
+    return Node(name, name, ip, "root", "password", "slave", "Ubuntu", "owner")
+
+class ShellRunner:
+    """Runs what the batcher would send to the node in a local shell."""
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, node, command):
+        with self.lock:
+            self.calls.append((node.ip, command))
+        result = subprocess.run(command, shell=True, capture_output=True, text=True)
+        return result.stdout, result.stderr
+
+def test_batch_script_demultiplexes_output_and_exit_status():
+    commands = ["echo one", "printf 'no newline'", "echo oops >&2; exit 3", "echo 'quote \" and $HOME'"]
+    result = subprocess.run(batch_script(commands, "TOKEN"), shell=True, capture_output=True, text=True)
+
+    results = split_batch_output(result.stdout, "TOKEN", len(commands))
+
+    assert results[0] == ("one\n", '', 0)
+    assert results[1] == ("no newline", '', 0)
+    assert results[2] == ('', "oops\n", 3)
+    assert results[3].stdout == "quote \" and $HOME\n"
+
+def test_commands_for_the_same_node_share_one_invocation():
+    runner = ShellRunner()
+    batcher = CommandBatcher(runner, window=0.1)
+    node, other = make_node("a"), make_node("b", ip="10.0.0.2")
+
+    futures = [batcher.submit(node, f"echo {i}") for i in range(5)]
+    other_future = batcher.submit(other, "echo other")
+
+    assert [future.result(5) for future in futures] == [(f"{i}\n", '') for i in range(5)]
+    assert other_future.result(5) == ("other\n", '')
+    assert [future.result().exit_status for future in futures] == [0] * 5
+    assert len(runner.calls) == 2
+    assert batcher.get_stats()['commands_per_batch'] == 3
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    runner = ShellRunner()
+    batcher = CommandBatcher(runner, window=10, max_batch=3)
+
+    start = time.monotonic()
+    futures = [batcher.submit(make_node("a"), f"echo {i}") for i in range(3)]
+
+    assert [future.result(5) for future in futures] == [("0\n", ''), ("1\n", ''), ("2\n", '')]
+    assert time.monotonic() - start < 5
+
+def test_failed_invocation_is_reported_to_every_command():
+    batcher = CommandBatcher(lambda node, command: ('', "Error in execute_command: refused"), window=0.05)
+
+    futures = [batcher.submit(make_node("a"), "uptime") for _ in range(2)]
+
+    assert [future.result(5) for future in futures] == [('', "Error in execute_command: refused")] * 2
+
+def test_executor_coalesces_tasks_on_the_same_node(monkeypatch):
+    executor = TaskExecutor()
+    executor.task_service = FakeTaskService()
+    executor.task_manager = FakeTaskManager()
+    runner = ShellRunner()
+    monkeypatch.setattr(executor.batcher, 'run', runner)
+    executor.batcher.window = 0.2
+    node = make_node("node")
+    tasks = [SimpleTask(f"task-{i}", "check", f"echo {i} $NODE_ID", [node]) for i in range(4)]
+
+    threads = [threading.Thread(target=executor.execute, args=(task,)) for task in tasks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    executor.pool.shutdown(wait=False)
+
+    assert len(runner.calls) == 1
+    assert [task.results["node"] for task in tasks] == [(f"{i} node\n", '') for i in range(4)]
+    assert [task.results["node"].exit_status for task in tasks] == [0] * 4
+
+def test_batching_is_opt_in():
+    executor = TaskExecutor()
+    executor.pool.shutdown(wait=False)
+
+    assert CommandBatcher(ShellRunner()).window == 0
+    assert not executor.batchable(SimpleTask("task", "check", "uptime", []), make_node("a"))
+
+def test_failed_commands_keep_their_exit_status():
+    batcher = CommandBatcher(ShellRunner(), window=0.05)
+
+    ok, failed = batcher.submit(make_node("a"), "true"), batcher.submit(make_node("a"), "echo no >&2; exit 4")
+
+    assert failed.result(5) == ('', "no\n") and failed.result().exit_status == 4
+    assert ok.result(5).exit_status == 0
+
+def test_batched_session_is_traced_under_the_first_command(monkeypatch):
+    tracer = Tracer(sample_rate=1)
+    monkeypatch.setattr(Tracer, '_shared', tracer)
+    root = tracer.start_trace('task')
+    spans = [tracer.start_span('node', parent=root, node=str(i)) for i in range(2)]
+
+    def runner(node, command):
+        with tracer.span('exec'):
+            return ShellRunner()(node, command)
+
+    batcher = CommandBatcher(runner, window=0.05)
+    futures = [batcher.submit(make_node("a"), f"echo {i}", span) for i, span in enumerate(spans)]
+    for future in futures:
+        future.result(5)
+
+    exec_span, = [span for span in root.trace.spans if span.name == 'exec']
+    assert exec_span.parent_id == spans[0].span_id
+    assert spans[1].attrs['batched_with'] == spans[0].span_id
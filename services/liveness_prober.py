@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, List
+from services.circuit_breaker import CircuitBreakers
+from services.node.node import Node
+from services.node_service import NodeService
+
+
+class LivenessProber:
+    """
+    Checks every node in the background with a TCP connect and, when
+    `banner` is on, by reading the SSH identification line. All nodes are
+    probed concurrently on one event loop, at most `concurrency` at a time.
+    Results update the nodes' active flags in NodeService and feed the
+    circuit breakers: failures count towards opening them and a successful
+    probe lets an open breaker try again right away.
+    """
+    DEFAULT_INTERVAL = 30
+    DEFAULT_TIMEOUT = 3
+    DEFAULT_CONCURRENCY = 256
+
+    def __init__(self, node_service: NodeService, breakers: CircuitBreakers = None, interval: float = None, timeout: float = None, concurrency: int = None, banner: bool = True):
+        self.node_service = node_service
+        self.breakers = breakers
+        self.interval = float(interval or os.getenv('LIVENESS_INTERVAL', self.DEFAULT_INTERVAL))
+        self.timeout = float(timeout or os.getenv('LIVENESS_TIMEOUT', self.DEFAULT_TIMEOUT))
+        self.concurrency = int(concurrency or os.getenv('LIVENESS_CONCURRENCY', self.DEFAULT_CONCURRENCY))
+        self.banner = banner
+        self.logger = logging.getLogger(__name__)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='liveness-prober', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def probe_all(self, nodes: List[Node] = None) -> Dict[str, bool]:
+        nodes = self.node_service.list_nodes() if nodes is None else nodes
+        if not nodes:
+            return {}
+        alive = asyncio.run(self._probe_nodes(nodes))
+        for node in nodes:
+            self.record(node, alive[node.id])
+        return alive
+
+    def record(self, node: Node, alive: bool):
+        if alive:
+            self.node_service.activate_node(node.id)
+        else:
+            self.node_service.deactivate_node(node.id)
+
+        if self.breakers is not None:
+            breaker = self.breakers.get(node.id)
+            if alive:
+                breaker.half_open()
+            else:
+                breaker.record_failure()
+
+    async def _probe_nodes(self, nodes: List[Node]) -> Dict[str, bool]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._probe(node, semaphore) for node in nodes))
+        return {node.id: alive for node, alive in zip(nodes, results)}
+
+    async def _probe(self, node: Node, semaphore: asyncio.Semaphore) -> bool:
+        async with semaphore:
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(node.ip, node.port), self.timeout)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            try:
+                if not self.banner:
+                    return True
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                return line.startswith(b'SSH-')
+            except (OSError, asyncio.TimeoutError):
+                return False
+            finally:
+                writer.close()
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                alive = self.probe_all()
+                self.logger.info(f"Liveness: {sum(alive.values())}/{len(alive)} nodes reachable")
+            except Exception as e:
+                self.logger.error(f"Liveness probe failed: {e}")
+            self.stop_event.wait(self.interval)
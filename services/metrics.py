@@ -0,0 +1,246 @@
+import bisect
+import ipaddress
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+
+class Gauge(Counter):
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+
+class LatencyHistogram:
+    # Upper bounds in seconds, roughly logarithmic from 1ms to 5min
+    BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300]
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = buckets or self.BUCKETS
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def percentile(self, percent: float) -> float:
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = self.count * percent / 100
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class Metrics:
+    """
+    Process-wide set of named counters, gauges and histograms, optionally
+    labelled. Call sites look a metric up once and keep the handle, so
+    recording is a lock and an add. `render` produces the Prometheus text
+    exposition format and `summary` a short human readable digest.
+    """
+    TYPES = {Counter: 'counter', Gauge: 'gauge', LatencyHistogram: 'histogram'}
+    _shared: Optional['Metrics'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        # name -> (help, {labels: metric})
+        self.families: Dict[str, Tuple[str, Dict[Tuple, object]]] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'Metrics':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def counter(self, name: str, help: str = '', **labels) -> Counter:
+        return self._get(name, help, labels, Counter)
+
+    def gauge(self, name: str, help: str = '', **labels) -> Gauge:
+        return self._get(name, help, labels, Gauge)
+
+    def histogram(self, name: str, help: str = '', **labels) -> LatencyHistogram:
+        return self._get(name, help, labels, LatencyHistogram)
+
+    def register(self, name: str, metric, help: str = '', **labels):
+        """Exposes a metric owned elsewhere (e.g. a pool's histogram), replacing any previous one."""
+        with self.lock:
+            _, series = self.families.setdefault(name, (help, {}))
+            series[self._key(labels)] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for name, (help, series) in sorted(self._families().items()):
+            kind = self.TYPES[type(next(iter(series.values())))]
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in sorted(series.items()):
+                if isinstance(metric, LatencyHistogram):
+                    lines.extend(self._render_histogram(name, key, metric))
+                else:
+                    lines.append(f"{name}{self._labels(key)} {metric.value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> List[str]:
+        lines = []
+        for name, (_, series) in sorted(self._families().items()):
+            for key, metric in sorted(series.items()):
+                label = f"{name}{self._labels(key)}"
+                if isinstance(metric, LatencyHistogram):
+                    if metric.count:
+                        stats = metric.snapshot()
+                        lines.append(f"{label}: n={stats['count']} p50={stats['p50']:g}s p99={stats['p99']:g}s")
+                else:
+                    lines.append(f"{label}: {metric.value:g}")
+        return lines
+
+    def _families(self) -> Dict[str, Tuple[str, Dict[Tuple, object]]]:
+        with self.lock:
+            return {name: (help, dict(series)) for name, (help, series) in self.families.items() if series}
+
+    def _get(self, name: str, help: str, labels: Dict, kind):
+        key = self._key(labels)
+        with self.lock:
+            _, series = self.families.setdefault(name, (help, {}))
+            metric = series.get(key)
+            if metric is None:
+                metric = series[key] = kind()
+            elif type(metric) is not kind:
+                raise ValueError(f"Metric {name} is a {self.TYPES[type(metric)]}")
+            return metric
+
+    @staticmethod
+    def _key(labels: Dict) -> Tuple:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    @staticmethod
+    def _labels(key: Tuple, extra: str = None) -> str:
+        parts = [f'{name}="{value}"' for name, value in key]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+    def _render_histogram(self, name: str, key: Tuple, histogram: LatencyHistogram) -> List[str]:
+        with histogram.lock:
+            counts, count, total = list(histogram.counts), histogram.count, histogram.total
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(histogram.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{bound:g}"'
+            lines.append(f"{name}_bucket{self._labels(key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{self._labels(key, le)} {count}")
+        lines.append(f"{name}_sum{self._labels(key)} {total:g}")
+        lines.append(f"{name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsServer:
+    """
+    Serves `Metrics.render()` at /metrics over plain HTTP from a daemon
+    thread. Other read-only views can be mounted with `add_route`; routes
+    added with `local_only` answer loopback clients only.
+    """
+    DEFAULT_HOST = '0.0.0.0'
+    DEFAULT_PORT = 5000
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, metrics: Metrics = None, host: str = None, port: int = None):
+        self.metrics = metrics or Metrics.shared()
+        self.host = host or os.getenv('METRICS_HOST', self.DEFAULT_HOST)
+        self.port = int(port if port is not None else os.getenv('METRICS_PORT', self.DEFAULT_PORT))
+        self.logger = logging.getLogger(__name__)
+        self.server = None
+        self.thread = None
+        self.routes: Dict[str, Tuple[str, Callable[[], str], bool]] = {}
+        self.add_route('/metrics', self.CONTENT_TYPE, self.metrics.render)
+        self.add_route('/', self.CONTENT_TYPE, self.metrics.render)
+
+    def add_route(self, path: str, content_type: str, render: Callable[[], str], local_only: bool = False):
+        self.routes[path] = (content_type, render, local_only)
+
+    def start(self):
+        if self.server is not None:
+            return
+        routes = self.routes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                route = routes.get(self.path.split('?')[0])
+                if route is None:
+                    self.send_error(404)
+                    return
+                content_type, render, local_only = route
+                if local_only and not ipaddress.ip_address(self.client_address[0]).is_loopback:
+                    self.send_error(403)
+                    return
+                body = render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True)
+        self.thread.start()
+        self.logger.info(f"Serving metrics on {self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Iterable, List, Optional, Tuple
+from services.node.node import Node
+
+# (mtime_ns, size, sha256) of the seeds file a snapshot was built from
+Fingerprint = Tuple[int, int, bytes]
+
+
+class InventorySnapshot:
+    """
+    The resolved node inventory as a compact binary file, written after a
+    full rebuild and memory-mapped on the next start, so a restart skips
+    JSON parsing, database reads and password hashing. The header records
+    what the snapshot was built from: the seeds file's mtime, size and
+    SHA-256, and the database's servers data version. `load` returns None
+    once any of them moved; the caller then rebuilds and saves again.
+
+    Layout (little endian): header, string offsets, string blob, records.
+    Strings are stored once, so repeated roles, owners and blockchain lists
+    cost one index per node; every record is a fixed-size row of indexes.
+    The string blob holds the login credentials, so it is one Fernet token
+    under a key derived from SALT; without SALT no snapshot is kept.
+    """
+    MAGIC = b'MNINV002'
+    # magic, seeds mtime_ns, seeds size, seeds sha256, db version, string count, encrypted blob size, record count
+    HEADER = struct.Struct('<8sqq32sqIII')
+    FIELDS = ('id', 'name', 'ip', 'username', 'password', 'role', 'os_version', 'owner', 'provider', 'execution_type', 'blockchains')
+    # One string index per field, then the port
+    RECORD = struct.Struct(f'<{len(FIELDS)}II')
+    # String 0 is reserved for None, so records decode with a plain table lookup
+    MISSING = 0
+    BLOCKCHAIN_SEPARATOR = '\x1f'
+    NO_SEEDS: Fingerprint = (0, -1, bytes(32))
+    # A seeds file modified this recently may change again within the same mtime tick, so its mtime is not trusted
+    RACY_WINDOW_NS = 2 * 10**9
+
+    def __init__(self, path: str, secret: str = None):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        secret = secret or os.getenv('SALT')
+        self.key = self.derive_key(secret) if secret else None
+
+    @staticmethod
+    def derive_key(secret: str) -> bytes:
+        # SALT is already a secret, so one hash separates this key from the database's
+        return base64.urlsafe_b64encode(hashlib.sha256(b'inventory-snapshot:' + secret.encode('utf-8')).digest())
+
+    @staticmethod
+    def fingerprint(seeds_path: str) -> Fingerprint:
+        with open(seeds_path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            digest = hashlib.sha256(file.read()).digest()
+        return stat.st_mtime_ns, stat.st_size, digest
+
+    def load(self, seeds_path: str = None, db_version: int = 0) -> Optional[List[Node]]:
+        """The snapshot's nodes, or None when it is missing, unreadable or stale."""
+        if self.key is None:
+            return None
+        from cryptography.fernet import InvalidToken
+        try:
+            with open(self.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                magic, mtime_ns, size, digest, version, string_count, blob_size, record_count = self.HEADER.unpack_from(data)
+                if magic != self.MAGIC or version != db_version or not self._is_fresh(seeds_path, (mtime_ns, size, digest)):
+                    return None
+                return self._read_nodes(data, string_count, blob_size, record_count)
+        except (OSError, ValueError, IndexError, struct.error, InvalidToken) as e:
+            self.logger.info(f"No usable inventory snapshot at {self.path}: {e}")
+            return None
+
+    def save(self, nodes: Iterable[Node], source: Fingerprint = NO_SEEDS, db_version: int = 0) -> bool:
+        """Atomically replaces the snapshot. Failing to write is logged, never raised: the snapshot is only a shortcut."""
+        if self.key is None:
+            self.logger.info("SALT is not set, not writing an inventory snapshot")
+            return False
+        from cryptography.fernet import Fernet
+        strings, indexes, records = [b''], {}, []
+
+        def intern(value: Optional[str]) -> int:
+            if value is None:
+                return self.MISSING
+            index = indexes.get(value)
+            if index is None:
+                index = indexes[value] = len(strings)
+                strings.append(value.encode('utf-8'))
+            return index
+
+        try:
+            for node in nodes:
+                values = (
+                    node.id, node.name, node.ip, node.username, node.password, node.role, node.os_version, node.owner,
+                    node.provider, node.execution_type, self.BLOCKCHAIN_SEPARATOR.join(sorted(node.blockchains)),
+                )
+                records.append(self.RECORD.pack(*(intern(value) for value in values), node.port))
+            offsets = [0]
+            for string in strings:
+                offsets.append(offsets[-1] + len(string))
+            blob = Fernet(self.key).encrypt(b''.join(strings))
+            header = self.HEADER.pack(self.MAGIC, *self._trusted(source), db_version, len(strings), len(blob), len(records))
+
+            temporary = f"{self.path}.tmp"
+            # Node passwords are the hashes used to log in, so the file is private to the owner
+            descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(header)
+                file.write(struct.pack(f'<{len(offsets)}I', *offsets))
+                file.write(blob)
+                file.write(b''.join(records))
+            os.replace(temporary, self.path)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Could not write inventory snapshot {self.path}: {e}")
+            return False
+
+    def _is_fresh(self, seeds_path: Optional[str], recorded: Fingerprint) -> bool:
+        if seeds_path is None:
+            return recorded == self.NO_SEEDS
+        stat = os.stat(seeds_path)
+        if (stat.st_mtime_ns, stat.st_size) == recorded[:2]:
+            return True
+        if stat.st_size != recorded[1]:
+            return False
+        # Same size but touched: only the content decides, and a match refreshes the recorded mtime
+        current = self.fingerprint(seeds_path)
+        if current[2] != recorded[2]:
+            return False
+        self._rewrite_source(current)
+        return True
+
+    def _trusted(self, source: Fingerprint) -> Fingerprint:
+        """Drops a too recent mtime, so the next load compares content instead."""
+        mtime_ns, size, digest = source
+        if mtime_ns and time.time_ns() - mtime_ns < self.RACY_WINDOW_NS:
+            return 0, size, digest
+        return source
+
+    def _rewrite_source(self, source: Fingerprint):
+        try:
+            with open(self.path, 'r+b') as file:
+                file.seek(len(self.MAGIC))
+                file.write(struct.pack('<qq32s', *self._trusted(source)))
+        except OSError as e:
+            self.logger.info(f"Could not refresh inventory snapshot {self.path}: {e}")
+
+    def _read_nodes(self, data: mmap.mmap, string_count: int, blob_size: int, record_count: int) -> List[Node]:
+        offsets_start = self.HEADER.size
+        offsets = struct.unpack_from(f'<{string_count + 1}I', data, offsets_start)
+        blob_start = offsets_start + 4 * (string_count + 1)
+        from cryptography.fernet import Fernet
+        blob = Fernet(self.key).decrypt(data[blob_start:blob_start + blob_size])
+        strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(string_count)]
+        strings[self.MISSING] = None
+        records_start = blob_start + blob_size
+        records = data[records_start:records_start + record_count * self.RECORD.size]
+        if len(records) != record_count * self.RECORD.size:
+            raise ValueError("truncated snapshot")
+
+        nodes = []
+        lookup = strings.__getitem__
+        for *indexes, port in self.RECORD.iter_unpack(records):
+            node_id, name, ip, username, password, role, os_version, owner, provider, execution_type, blockchains = map(lookup, indexes)
+            nodes.append(Node(
+                node_id, name, ip, username, password, role, os_version, owner,
+                blockchains.split(self.BLOCKCHAIN_SEPARATOR) if blockchains else [],
+                execution_type=execution_type, port=port, provider=provider, hashed=True,
+            ))
+        return nodes
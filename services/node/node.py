@@ -1,10 +1,13 @@
 import uuid
-from typing import Dict, List
-from services.db.db_service import DBService
+from typing import TYPE_CHECKING, Dict, List
 from services.node.node_role import NodeRole
 import hashlib
 from getpass import getpass
 
+if TYPE_CHECKING:
+    # Type-only: importing the DB layer pulls in SQLAlchemy, which node lookups do not need
+    from services.db.db_service import DBService
+
 class Node:
     def __init__(
             self,
@@ -20,24 +23,28 @@ class Node:
             active: bool = False,
             execution_type: str = "remote",
             port = 22,
-            db_manager: DBService = None,
+            db_manager: 'DBService' = None,
+            provider: str = None,
+            hashed: bool = False,
     ):
         self.id = id
         self.name = name
         self.ip = ip
         self.username = username
-        self.password = self.hash_password(password)
+        # Inventory snapshots store the hash, so restoring a node skips re-hashing
+        self.password = password if hashed else self.hash_password(password)
         self.role = role
         self.os_version = os_version
         self.blockchains = set(blockchains)
         self.owner = owner
         self.port = port
+        self.provider = provider
         self.execution_type = execution_type
         self.db_manager = db_manager
         self.active = active
 
     def __repr__(self):
-        return f"ID: {self.id}, Name: {self.name}, IP: {self.ip}, User: {self.username}, Role: {self.role}, Os_version: {self.os_version}, Owner: {self.owner}, Execution_mode: {self.execution_type}, Active: {self.active}"
+        return f"ID: {self.id}, Name: {self.name}, IP: {self.ip}, User: {self.username}, Role: {self.role}, Os_version: {self.os_version}, Owner: {self.owner}, Provider: {self.provider}, Execution_mode: {self.execution_type}, Active: {self.active}"
 
     def add_blockchain(self, blockchain: str):
         self.blockchains.add(blockchain)
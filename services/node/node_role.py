@@ -2,4 +2,11 @@ from enum import Enum
 
 class NodeRole(Enum):
     MASTER = "master"
-    SLAVE = "slave"
\ No newline at end of file
+    SLAVE = "slave"
+
+    @staticmethod
+    def value_of(role) -> str:
+        """Role value for a NodeRole or a plain string such as "Master"; seeds and the database store strings."""
+        if isinstance(role, NodeRole):
+            return role.value
+        return str(role).lower()
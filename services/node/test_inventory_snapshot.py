@@ -0,0 +1,140 @@
+import json
+import os
+import pytest
+from registry import Registry
+from services.db.db_service import DBService
+from services.node.inventory_snapshot import InventorySnapshot
+from services.node.node import Node
+from services.node_service import NodeService
+
+SEEDS = [
+    {"name": "master", "ip": "10.0.0.1", "user": "root", "password": "pw", "role": "master", "so": "Ubuntu", "owner": "alice", "blockchains": ["quilibrium"]},
+    {"name": "slave-1", "ip": "10.0.0.2", "user": "root", "password": "pw", "role": "slave", "so": "Ubuntu", "owner": "alice", "blockchains": ["quilibrium", "bittensor"], "port": 2222},
+    {"name": "slave-2", "ip": "10.0.0.3", "user": "admin", "password": "secret", "role": "slave", "so": "Debian", "owner": "bob", "blockchains": [], "provider": "hetzner"},
+]
+
+
+@pytest.fixture(scope="function")
+def seeds_path(tmp_path):
+    path = tmp_path / "seeds.json"
+    path.write_text(json.dumps(SEEDS))
+    return str(path)
+
+def describe(node_service: NodeService):
+    return sorted(
+        (node.id, node.name, node.ip, node.username, node.password, node.role, node.os_version, node.owner, sorted(node.blockchains), node.port, node.provider, node.execution_type)
+        for node in node_service.list_nodes()
+    )
+
+def load(seeds_path: str) -> NodeService:
+    node_service = NodeService()
+    node_service.load_nodes_from_seeds(seeds_path)
+    return node_service
+
+def test_restart_restores_the_inventory_without_hashing(seeds_path: str, monkeypatch):
+    built = load(seeds_path)
+    assert os.path.exists(f"{seeds_path}.inventory")
+    assert oct(os.stat(f"{seeds_path}.inventory").st_mode & 0o777) == '0o600'
+
+    monkeypatch.setattr(Node, 'hash_password', lambda self, password: pytest.fail("password re-hashed"))
+    monkeypatch.setattr(NodeService, 'read_json', lambda self, filename: pytest.fail("seeds re-parsed"))
+    restored = load(seeds_path)
+
+    assert describe(restored) == describe(built)
+    assert [node.name for node in restored.get_nodes_with_blockchain("bittensor")] == ["slave-1"]
+
+def test_changed_seeds_rebuild_the_snapshot(seeds_path: str):
+    load(seeds_path)
+    with open(seeds_path, 'w') as file:
+        json.dump(SEEDS + [{**SEEDS[0], "name": "slave-3", "ip": "10.0.0.4"}], file)
+
+    assert len(load(seeds_path).list_nodes()) == 4
+    assert len(InventorySnapshot(f"{seeds_path}.inventory").load(seeds_path=seeds_path)) == 4
+
+def test_touched_seeds_keep_the_snapshot(seeds_path: str):
+    hour_ago = os.stat(seeds_path).st_mtime_ns - 3600 * 10**9
+    os.utime(seeds_path, ns=(hour_ago, hour_ago))
+    load(seeds_path)
+    snapshot = InventorySnapshot(f"{seeds_path}.inventory")
+    os.utime(seeds_path, ns=(hour_ago, hour_ago + 10**9))
+
+    assert len(snapshot.load(seeds_path=seeds_path)) == 3
+    _, mtime_ns, *_ = snapshot.HEADER.unpack_from(open(snapshot.path, 'rb').read())
+    assert mtime_ns == hour_ago + 10**9
+
+def test_recently_modified_seeds_are_compared_by_content(seeds_path: str):
+    load(seeds_path)
+    snapshot = InventorySnapshot(f"{seeds_path}.inventory")
+    _, mtime_ns, *_ = snapshot.HEADER.unpack_from(open(snapshot.path, 'rb').read())
+    assert mtime_ns == 0
+
+    # Same size and, on a coarse clock, the same mtime: only the content tells them apart
+    with open(seeds_path, 'w') as file:
+        json.dump([{**seed, "password": seed["password"][::-1]} for seed in SEEDS], file)
+    assert snapshot.load(seeds_path=seeds_path) is None
+
+def test_unreadable_snapshot_falls_back_to_the_seeds(seeds_path: str):
+    expected = describe(load(seeds_path))
+    with open(f"{seeds_path}.inventory", 'r+b') as file:
+        file.truncate(InventorySnapshot.HEADER.size + 10)
+
+    assert InventorySnapshot(f"{seeds_path}.inventory").load(seeds_path=seeds_path) is None
+    assert describe(load(seeds_path)) == expected
+
+def test_database_inventory_follows_the_servers_data_version(tmp_path):
+    db_service = DBService(str(tmp_path / "master.db"))
+    Registry.register('db_service', db_service)
+    try:
+        db_service.add_servers_bulk([
+            {'name': "db-1", 'ip': "10.1.0.1", 'username': "root", 'password': "pw", 'role': "slave", 'blockchains': "quilibrium,bittensor"},
+        ])
+        first = db_service.get_data_version('servers')
+        node_service = NodeService()
+        node_service.load_nodes_from_db()
+        assert [sorted(node.blockchains) for node in node_service.list_nodes()] == [["bittensor", "quilibrium"]]
+        snapshot = InventorySnapshot(f"{tmp_path / 'master.db'}.inventory")
+        assert len(snapshot.load(db_version=first)) == 1
+
+        db_service.upsert_servers([{'name': "db-2", 'ip': "10.1.0.2", 'username': "root", 'password': "pw", 'role': "slave"}])
+        assert db_service.get_data_version('servers') == first + 1
+        assert snapshot.load(db_version=first + 1) is None
+
+        node_service = NodeService()
+        node_service.load_nodes_from_db()
+        assert sorted(node.name for node in node_service.list_nodes()) == ["db-1", "db-2"]
+        assert len(snapshot.load(db_version=first + 1)) == 2
+    finally:
+        Registry.remove('db_service')
+        db_service.remove_session()
+
+def test_database_nodes_take_passwords_from_the_credential_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('INVENTORY_SNAPSHOT_ENABLED', 'false')
+    db_service = DBService(str(tmp_path / "master.db"))
+    Registry.register('db_service', db_service)
+    try:
+        db_service.add_servers_bulk([
+            {'name': f"db-{i}", 'ip': f"10.2.0.{i}", 'username': "root", 'password': "pw", 'role': "slave"} for i in range(3)
+        ])
+        node_service = NodeService()
+        node_service.load_nodes_from_db()
+        assert {node.password for node in node_service.list_nodes()} == {Node.hash_password(None, "pw")}
+        assert db_service.credential_cache.misses == 3
+
+        NodeService().load_nodes_from_db([{'id': server.id} for server in db_service.list_servers()[:2]])
+        assert db_service.credential_cache.hits == 2 and db_service.credential_cache.misses == 3
+    finally:
+        Registry.remove('db_service')
+        db_service.remove_session()
+
+def test_credentials_are_encrypted_at_rest(seeds_path: str):
+    hashes = {node.password for node in load(seeds_path).list_nodes()}
+    data = open(f"{seeds_path}.inventory", 'rb').read()
+
+    assert not any(password.encode() in data for password in hashes)
+    assert b"slave-1" not in data
+    assert InventorySnapshot(f"{seeds_path}.inventory", secret="another salt").load(seeds_path=seeds_path) is None
+
+def test_no_snapshot_without_salt(seeds_path: str, monkeypatch):
+    monkeypatch.delenv('SALT')
+    assert len(load(seeds_path).list_nodes()) == 3
+    assert not os.path.exists(f"{seeds_path}.inventory")
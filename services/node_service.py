@@ -1,34 +1,75 @@
 import os
 import json
-from typing import Dict, Optional, List
+import logging
+from typing import Dict, Iterable, Optional, List, Set
 from registry import Registry
+from services.node.inventory_snapshot import InventorySnapshot
 from services.node.node import Node
 from services.node.node_role import NodeRole
 
 
 class NodeService():
     SEEDS_PATH = os.getenv("SEEDS_PATH")
+    # Snapshots are written next to their source, e.g. seeds.json.inventory
+    SNAPSHOT_SUFFIX = '.inventory'
 
     def __init__(self):
-        self.db_manager = Registry.get('db_service')
+        self.logger = logging.getLogger(__name__)
+        self.snapshots_enabled = os.getenv('INVENTORY_SNAPSHOT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
         self.nodes: Dict[str, Node] = {}
+        # Secondary indexes, all mapping to node ids and kept in sync by the mutators below
+        self.ip_index: Dict[str, str] = {}
+        self.name_index: Dict[str, Set[str]] = {}
+        self.blockchain_index: Dict[str, Set[str]] = {}
+        self.role_index: Dict[str, Set[str]] = {}
+        self.owner_index: Dict[str, Set[str]] = {}
+        self.active_ids: Set[str] = set()
+
+    @property
+    def db_manager(self):
+        # Resolved on use, so loading nodes from seeds never opens the database
+        return Registry.get('db_service')
 
     def load_nodes_from_seeds(self, seeds_path=SEEDS_PATH):
-        print("Reading nodes json...")
-        self.node_list = self.read_json(seeds_path)
-        print("\n")
-        print(self.node_list)
-        print("\n")
-        self.create_nodes(self.node_list)
-
-    def load_nodes_from_db(self, server_list):
-        print("\nLoading node list...")
-        if (server_list != None):
-            for server in server_list:
-                node_id = server['id']
-                self.nodes = self.db_manager.get_server_by_id(node_id)
+        snapshot = self.get_snapshot(seeds_path)
+        nodes = snapshot.load(seeds_path=seeds_path) if snapshot else None
+        if nodes is not None:
+            self.logger.info(f"Restored {len(nodes)} seeded nodes from {snapshot.path}")
         else:
-            self.nodes = self.db_manager.get_all_servers()
+            # Fingerprinted before reading, so a concurrent edit leaves the snapshot stale rather than wrong
+            source = InventorySnapshot.fingerprint(seeds_path) if snapshot else None
+            self.node_list = self.read_json(seeds_path)
+            # Seeds carry credentials, so only their size is logged
+            self.logger.info(f"Read {len(self.node_list)} seeds from {seeds_path}")
+            nodes = self.build_nodes(self.node_list)
+            if snapshot:
+                snapshot.save(nodes, source)
+        self.add_new_nodes(nodes)
+
+    def load_nodes_from_db(self, server_list=None):
+        """
+        Adds the given servers, or every server, from the database. The
+        full inventory goes through a snapshot keyed by the servers data
+        version, which skips decrypting and hashing every password.
+        """
+        db_manager = self.db_manager
+        if server_list is not None:
+            self.add_new_nodes(self.build_db_nodes([server['id'] for server in server_list]))
+            return
+
+        version = db_manager.get_data_version('servers')
+        snapshot = self.get_snapshot(db_manager.engine.url.database)
+        nodes = snapshot.load(db_version=version) if snapshot else None
+        if nodes is None:
+            nodes = self.build_db_nodes()
+            if snapshot:
+                snapshot.save(nodes, db_version=version)
+        self.add_new_nodes(nodes)
+
+    def get_snapshot(self, source_path: Optional[str]) -> Optional[InventorySnapshot]:
+        if not self.snapshots_enabled or not source_path or source_path == ':memory:':
+            return None
+        return InventorySnapshot(f"{os.path.expanduser(source_path)}{self.SNAPSHOT_SUFFIX}")
 
     def read_json(self, filename):
         data = None
@@ -36,23 +77,61 @@ class NodeService():
             data = json.load(file)
         return data
 
-    def create_node(self, name: str, ip: str, username: str, password: str, role: str, os: str, owner: str, blockchains: List[str], ) -> Node:
-        node = Node(name, name, ip, username, password, role, os, owner, blockchains, db_manager=self.db_manager)
-        self.nodes[name] = node
+    def create_node(self, name: str, ip: str, username: str, password: str, role: str, os: str, owner: str, blockchains: List[str], provider: str = None, port: int = 22) -> Node:
+        node = Node(name, name, ip, username, password, role, os, owner, blockchains, port=port, provider=provider)
+        self.add_node(node)
         return node
 
     def create_nodes(self, node_list):
-        print("\nLoading node list...")
+        self.add_new_nodes(self.build_nodes(node_list))
+        self.logger.info(f"Loaded {len(self.nodes)} nodes")
 
+    def build_nodes(self, node_list) -> List[Node]:
+        """Resolves seed entries into nodes, keeping the first entry for each IP."""
+        nodes: Dict[str, Node] = {}
         for server in node_list:
-            if (self.get_node_by_ip(server['ip']) is None): 
-                self.create_node(server['name'], server['ip'], server['user'], server['password'], server['role'], server['so'], server['owner'], blockchains=server['blockchains'])
-
-        print("Nodes loaded correctly.")
-        print(f"{self.list_nodes()}")
+            if server['ip'] not in nodes:
+                nodes[server['ip']] = Node(
+                    server['name'], server['name'], server['ip'], server['user'], server['password'], server['role'], server['so'], server['owner'],
+                    server['blockchains'], port=server.get('port', 22), provider=server.get('provider'),
+                )
+        return list(nodes.values())
+
+    def build_db_nodes(self, server_ids: List[int] = None) -> List[Node]:
+        """
+        Nodes for the given servers (all when omitted). Passwords come from
+        `get_server_credentials`, so only those missing from the credential
+        cache are decrypted.
+        """
+        db_manager = self.db_manager
+        servers = db_manager.list_servers(server_ids, with_passwords=False)
+        passwords = {credentials['id']: credentials['password'] for credentials in db_manager.get_server_credentials(server_ids)}
+        return [
+            Node(
+                server.name, server.name, server.ip, server.username, passwords.get(server.id), server.role, server.os_version, server.owner,
+                [blockchain for blockchain in (server.blockchains or '').split(',') if blockchain], provider=server.provider,
+            )
+            for server in servers
+        ]
+
+    def add_new_nodes(self, nodes: Iterable[Node]):
+        """Adds the nodes whose IP is not known yet."""
+        for node in nodes:
+            if self.get_node_by_ip(node.ip) is None:
+                self.add_node(node)
 
     def add_node(self, node: Node):
+        previous = self.nodes.get(node.id)
+        if previous:
+            self._unindex_node(previous)
         self.nodes[node.id] = node
+        self._index_node(node)
+
+    def reindex_node(self, node_id: str):
+        node = self.nodes.get(node_id)
+        if node:
+            self._unindex_node(node)
+            self._index_node(node)
 
     def get_node(self, node_id: str) -> Optional[Node]:
         return self.nodes.get(node_id)
@@ -61,40 +140,106 @@ class NodeService():
         return list(self.nodes.keys())
 
     def get_node_by_ip(self, ip: str) -> Optional[Node]:
-        for node in self.nodes.values():
-            if node.ip == ip:
-                return node
-        return None
+        node_id = self.ip_index.get(ip)
+        return self.nodes.get(node_id) if node_id is not None else None
 
     def get_nodes_by_name(self, names: List[str]) -> List[Node]:
-        return [node for node in self.nodes.values() if node.name in names]
+        return self._get_nodes(set().union(*(self.name_index.get(name, set()) for name in names)))
 
     def list_nodes(self) -> List[Node]:
         return list(self.nodes.values())
 
     def get_nodes_with_blockchain(self, blockchain: str) -> List[Node]:
-        return [node for node in self.nodes.values() if blockchain in node.blockchains]
+        return self._get_nodes(self.blockchain_index.get(blockchain, set()))
 
     def get_nodes_without_blockchain(self, blockchain: str) -> List[Node]:
-        return [node for node in self.nodes.values() if blockchain not in node.blockchains]
+        return self._get_nodes(self.nodes.keys() - self.blockchain_index.get(blockchain, set()))
 
     def update_node_blockchains(self, node_id: str, blockchains: List[str]):
         node = self.nodes.get(node_id)
         if node:
+            self._unindex_node(node)
             node.blockchains = set(blockchains)
+            self._index_node(node)
 
     def get_active_nodes(self) -> List[Node]:
-        return [node for node in self.nodes.values() if node.active]
+        return self._get_nodes(self.active_ids)
 
     def get_nodes_by_role(self, role: NodeRole) -> List[Node]:
-        return [node for node in self.nodes.values() if node.role == role]
+        return self._get_nodes(self.role_index.get(self._role_key(role), set()))
+
+    def get_nodes_by_owner(self, owner: str) -> List[Node]:
+        return self._get_nodes(self.owner_index.get(owner, set()))
+
+    def query_nodes(self, active: bool = None, role: NodeRole = None, blockchain: str = None, owner: str = None) -> List[Node]:
+        """
+        Returns the nodes matching every given filter, e.g.
+        query_nodes(active=True, role=NodeRole.SLAVE, blockchain='quilibrium').
+        """
+        candidates = []
+        if role is not None:
+            candidates.append(self.role_index.get(self._role_key(role), set()))
+        if blockchain is not None:
+            candidates.append(self.blockchain_index.get(blockchain, set()))
+        if owner is not None:
+            candidates.append(self.owner_index.get(owner, set()))
+        if active:
+            candidates.append(self.active_ids)
+
+        if candidates:
+            candidates.sort(key=len)
+            node_ids = candidates[0].intersection(*candidates[1:])
+        else:
+            node_ids = set(self.nodes)
+
+        if active is False:
+            node_ids = node_ids - self.active_ids
+        return self._get_nodes(node_ids)
 
     def activate_node(self, node_id: str):
         node = self.nodes.get(node_id)
         if node:
             node.active = True
+            self.active_ids.add(node.id)
 
     def deactivate_node(self, node_id: str):
         node = self.nodes.get(node_id)
         if node:
             node.active = False
+            self.active_ids.discard(node.id)
+
+    def _get_nodes(self, node_ids: Iterable[str]) -> List[Node]:
+        # Copied first: the liveness prober updates active_ids from its own thread
+        return [self.nodes[node_id] for node_id in list(node_ids) if node_id in self.nodes]
+
+    @staticmethod
+    def _role_key(role) -> str:
+        return NodeRole.value_of(role)
+
+    def _index_node(self, node: Node):
+        self.ip_index[node.ip] = node.id
+        self.name_index.setdefault(node.name, set()).add(node.id)
+        self.role_index.setdefault(self._role_key(node.role), set()).add(node.id)
+        self.owner_index.setdefault(node.owner, set()).add(node.id)
+        for blockchain in node.blockchains:
+            self.blockchain_index.setdefault(blockchain, set()).add(node.id)
+        if node.active:
+            self.active_ids.add(node.id)
+
+    def _unindex_node(self, node: Node):
+        if self.ip_index.get(node.ip) == node.id:
+            del self.ip_index[node.ip]
+        self._discard(self.name_index, node.name, node.id)
+        self._discard(self.role_index, self._role_key(node.role), node.id)
+        self._discard(self.owner_index, node.owner, node.id)
+        for blockchain in node.blockchains:
+            self._discard(self.blockchain_index, blockchain, node.id)
+        self.active_ids.discard(node.id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key, node_id: str):
+        node_ids = index.get(key)
+        if node_ids is not None:
+            node_ids.discard(node_id)
+            if not node_ids:
+                del index[key]
@@ -0,0 +1,202 @@
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+from registry import Registry
+
+
+class TokenBucket:
+    """Allows `burst` sends at once, refilled at `rate` sends per second."""
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds until a token is available, 0 if one is available now."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class NotificationQueue:
+    """
+    Sends task completion notices to Telegram from a background thread so
+    executors only pay for a queue put. Completions landing within `window`
+    seconds of each other go out as one digest per chat, previews of each
+    node's output are cut to `preview_length` characters and, when anything
+    was cut, the full output is attached as a text file. Sends to a chat are
+    paced by a token bucket to stay under Telegram's per-chat rate limit.
+    """
+    DEFAULT_WINDOW = 2.0
+    DEFAULT_MAX_LENGTH = 4000
+    DEFAULT_PREVIEW_LENGTH = 200
+    DEFAULT_RATE = 1.0
+    DEFAULT_BURST = 3
+    DEFAULT_MAX_PENDING = 1000
+
+    def __init__(self, bot=None, chat_id: Hashable = None, task_service=None, window: float = None, max_length: int = None, preview_length: int = None, rate: float = None, burst: int = None, max_pending: int = None):
+        self.bot = bot
+        self.chat_id = chat_id or os.getenv('TELEGRAM_CHAT_ID')
+        self.task_service = task_service
+        self.window = float(window if window is not None else os.getenv('NOTIFY_WINDOW', self.DEFAULT_WINDOW))
+        self.max_length = int(max_length or os.getenv('NOTIFY_MAX_LENGTH', self.DEFAULT_MAX_LENGTH))
+        self.preview_length = int(preview_length or os.getenv('NOTIFY_PREVIEW_LENGTH', self.DEFAULT_PREVIEW_LENGTH))
+        self.rate = float(rate or os.getenv('NOTIFY_RATE', self.DEFAULT_RATE))
+        self.burst = int(burst or os.getenv('NOTIFY_BURST', self.DEFAULT_BURST))
+        self.logger = logging.getLogger(__name__)
+        self.queue = queue.Queue(int(max_pending or os.getenv('NOTIFY_MAX_PENDING', self.DEFAULT_MAX_PENDING)))
+        self.buckets: Dict[Hashable, TokenBucket] = {}
+        self.stats = {'queued': 0, 'dropped': 0, 'messages': 0, 'documents': 0, 'errors': 0}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='notifications', daemon=True)
+            self.thread.start()
+
+    def notify(self, task_id, chat_id: Hashable = None):
+        """Queues a completion notice; drops it rather than block when the queue is full."""
+        self.start()
+        try:
+            self.queue.put_nowait((chat_id or self.chat_id, task_id))
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['dropped'] += 1
+            self.logger.warning(f"Notification queue full, dropping notice for task {task_id}")
+
+    def flush(self):
+        """Blocks until every queued notice has been sent."""
+        self.queue.join()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, pending=self.queue.qsize())
+
+    def build_digest(self, task_ids: List) -> Tuple[str, Optional[str]]:
+        """Digest text for a batch of tasks, plus the full output when the text had to be cut."""
+        task_service = self.task_service or Registry.get('task_service')
+        title = "Task completed" if len(task_ids) == 1 else f"{len(task_ids)} tasks completed"
+        lines, full, truncated = [title], [], False
+
+        for task_id in task_ids:
+            task = task_service.get_task(task_id)
+            if task is None:
+                lines.append(f"Task {task_id}: no longer available")
+                continue
+            results = task.results
+            summary = f"{task.status.name}, {len(results)} nodes{self.format_storage(task.result_stats())}"
+            lines.append(f"Task {task_id} ({task.description}): {summary}")
+            full.append(f"== Task {task_id} ({task.description}): {summary}")
+            for node_id, result in results.items():
+                text = self.format_result(result)
+                full.append(f"-- {node_id}\n{text}")
+                preview = ' '.join(text.split())
+                if len(preview) > self.preview_length:
+                    preview = preview[:self.preview_length] + '…'
+                    truncated = True
+                lines.append(f"  {node_id}: {preview}")
+
+        text = '\n'.join(lines)
+        if len(text) > self.max_length:
+            suffix = "\n… full output attached"
+            text = text[:self.max_length - len(suffix)] + suffix
+            truncated = True
+        return text, '\n'.join(full) if truncated else None
+
+    @staticmethod
+    def format_storage(stats: Dict[str, float]) -> str:
+        """Suffix reporting what deduplication and compression saved, empty when they saved nothing."""
+        if stats['bytes_saved'] <= 0:
+            return ''
+        return f", {stats['raw_bytes']} B output stored in {stats['stored_bytes']} B"
+
+    @staticmethod
+    def format_result(result) -> str:
+        if isinstance(result, tuple) and len(result) == 2:
+            stdout, stderr = result
+            return f"{stdout}\n[stderr] {stderr}" if stderr else str(stdout)
+        return str(result)
+
+    def send(self, chat_id: Hashable, text: str, attachment: Optional[str]):
+        bot = self.bot or Registry.get('quilibrium_bot')
+        if bot is None:
+            self.logger.warning("No bot registered, dropping notification")
+            return
+        self._wait_for_token(chat_id)
+        bot.send_message(chat_id=chat_id, text=text)
+        self.stats['messages'] += 1
+        if attachment is not None:
+            self._wait_for_token(chat_id)
+            filename = f"task_results_{datetime.now():%Y%m%d_%H%M%S}.txt"
+            bot.send_document(chat_id=chat_id, document=io.BytesIO(attachment.encode('utf-8')), filename=filename)
+            self.stats['documents'] += 1
+
+    def _wait_for_token(self, chat_id: Hashable):
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.buckets[chat_id] = TokenBucket(self.rate, self.burst)
+        delay = bucket.delay()
+        while delay > 0:
+            time.sleep(delay)
+            delay = bucket.delay()
+        bucket.take()
+
+    def _collect(self) -> Optional[List[Tuple[Hashable, object]]]:
+        """Waits for a notice, then gathers whatever else arrives within the window."""
+        first = self.queue.get()
+        if first is None:
+            self.queue.task_done()
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.task_done()
+                self.stop_event.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            batch = self._collect()
+            if batch is None:
+                return
+            by_chat: Dict[Hashable, List] = {}
+            for chat_id, task_id in batch:
+                by_chat.setdefault(chat_id, []).append(task_id)
+            try:
+                for chat_id, task_ids in by_chat.items():
+                    try:
+                        self.send(chat_id, *self.build_digest(task_ids))
+                    except Exception as e:
+                        self.stats['errors'] += 1
+                        self.logger.error(f"Failed to send notification for tasks {task_ids}: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
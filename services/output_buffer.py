@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+from typing import Callable, Optional
+
+
+class OutputBuffer:
+    """
+    Keeps the last `max_bytes` of a command's output in memory. Once the
+    output grows past that, the whole stream is also written to a spill file
+    so nothing is lost while memory stays bounded.
+    """
+    DEFAULT_MAX_BYTES = 1024 * 1024
+
+    def __init__(self, max_bytes: int = None, spill_dir: str = None):
+        self.max_bytes = int(max_bytes or os.getenv('OUTPUT_BUFFER_BYTES', self.DEFAULT_MAX_BYTES))
+        self.spill_dir = spill_dir or os.getenv('OUTPUT_SPILL_DIR')
+        self.buffer = bytearray()
+        self.total_bytes = 0
+        self.spill_path = None
+        self.spill_file = None
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return self.tail()
+
+    def __repr__(self):
+        if self.spill_path:
+            return f"OutputBuffer({self.total_bytes} bytes, spilled to {self.spill_path})"
+        return f"OutputBuffer({self.total_bytes} bytes)"
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > self.max_bytes
+
+    def write(self, chunk: bytes):
+        with self.lock:
+            self.total_bytes += len(chunk)
+            if self.spill_file is None and self.spill_path is None and self.total_bytes > self.max_bytes:
+                self.spill_file = tempfile.NamedTemporaryFile(prefix='node-output-', dir=self.spill_dir, delete=False)
+                self.spill_path = self.spill_file.name
+                self.spill_file.write(self.buffer)
+            if self.spill_file is not None:
+                self.spill_file.write(chunk)
+
+            self.buffer += chunk
+            # Trim lazily so the ring costs amortized O(1) per write
+            if len(self.buffer) > 2 * self.max_bytes:
+                del self.buffer[:-self.max_bytes]
+
+    def close(self):
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
+
+    def tail(self) -> str:
+        with self.lock:
+            return bytes(self.buffer[-self.max_bytes:]).decode('utf-8', errors='replace')
+
+    def read_all(self) -> str:
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.flush()
+            if self.spill_path is None:
+                return bytes(self.buffer).decode('utf-8', errors='replace')
+        with open(self.spill_path, 'rb') as file:
+            return file.read().decode('utf-8', errors='replace')
+
+    def discard(self):
+        self.close()
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
+
+
+class NodeOutput(tuple):
+    """(stdout, stderr) as the execution strategies return it, plus the command's exit status."""
+
+    def __new__(cls, stdout, stderr, exit_status: Optional[int]):
+        output = super().__new__(cls, (stdout, stderr))
+        output.exit_status = exit_status
+        return output
+
+
+class CommandOutput:
+    """
+    Sink for a streamed command. Chunks land in bounded stdout/stderr
+    buffers and are passed to `on_chunk(stream, chunk)` as they arrive.
+    """
+    def __init__(self, max_bytes: int = None, on_chunk: Optional[Callable[[str, bytes], None]] = None):
+        self.stdout = OutputBuffer(max_bytes)
+        self.stderr = OutputBuffer(max_bytes)
+        self.on_chunk = on_chunk
+        self.exit_status = None
+
+    def write(self, stream: str, chunk: bytes):
+        buffer = self.stderr if stream == 'stderr' else self.stdout
+        buffer.write(chunk)
+        if self.on_chunk:
+            self.on_chunk(stream, chunk)
+
+    def close(self, exit_status: int = None):
+        self.exit_status = exit_status
+        self.stdout.close()
+        self.stderr.close()
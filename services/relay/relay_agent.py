@@ -0,0 +1,187 @@
+"""
+Relay agent. Runs on every node of a relay tree: it receives an envelope
+describing its own work and its subtree on stdin, forwards the payload and
+the sub-envelopes to its children in parallel, runs its own command and
+prints the aggregated result tree as JSON on stdout.
+
+Only uses the standard library (plus paramiko when it happens to be
+installed) because it is copied to and executed on the nodes themselves.
+
+    python3 relay_agent.py < envelope.json
+"""
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+NODE_MACRO = "$NODE_ID"
+REMOTE_AGENT_DIR = "/tmp"
+
+
+def remote_agent_path() -> str:
+    """A fresh path per hop, so concurrent distributions never overwrite each other's agent."""
+    return f"{REMOTE_AGENT_DIR}/relay_agent_{uuid.uuid4().hex}.py"
+
+
+def run(envelope: dict) -> dict:
+    node = envelope.get('node')
+    children = envelope.get('children', [])
+    transport = TRANSPORTS[envelope.get('transport', 'ssh')](envelope)
+    result = {'node': node['id'] if node else None, 'stdout': '', 'stderr': '', 'exit_status': 0, 'children': []}
+
+    with ThreadPoolExecutor(max_workers=max(len(children), 1)) as pool:
+        # Children start receiving the payload while this node runs its own command
+        futures = [pool.submit(forward, transport, envelope, child) for child in children]
+        if node and envelope.get('command'):
+            result.update(run_command(envelope['command'].replace(NODE_MACRO, node['id']), transport.workdir(node)))
+        for child, future in zip(children, futures):
+            try:
+                result['children'].append(future.result())
+            except Exception as e:
+                result['children'].append(failed_subtree(child, f"Relay to {child['node']['id']} failed: {e}"))
+    return result
+
+
+def forward(transport, envelope: dict, child: dict) -> dict:
+    payload = envelope.get('payload')
+    if payload:
+        transport.send_file(child['node'], payload['source'], payload['target'])
+    child_envelope = {
+        'node': child['node'],
+        'children': child.get('children', []),
+        'command': envelope.get('command'),
+        'transport': envelope.get('transport', 'ssh'),
+        'workdir': envelope.get('workdir'),
+        'payload': {'source': payload['target'], 'target': payload['target']} if payload else None,
+    }
+    return transport.run_agent(child['node'], child_envelope)
+
+
+def failed_subtree(subtree: dict, error: str) -> dict:
+    return {
+        'node': subtree['node']['id'],
+        'stdout': '',
+        'stderr': error,
+        'exit_status': None,
+        'children': [failed_subtree(child, error) for child in subtree.get('children', [])],
+    }
+
+
+def run_command(command: str, cwd: str = None) -> dict:
+    completed = subprocess.run(command, shell=True, cwd=cwd, capture_output=True, text=True)
+    return {'stdout': completed.stdout, 'stderr': completed.stderr, 'exit_status': completed.returncode}
+
+
+class LocalTransport:
+    """Simulates every node as a directory under `workdir` and every hop as a local agent process."""
+
+    def __init__(self, envelope: dict):
+        self.root = envelope['workdir']
+        self.node = envelope.get('node')
+
+    def workdir(self, node: dict) -> str:
+        path = os.path.join(self.root, node['id'])
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def resolve(self, node: dict, path: str) -> str:
+        return os.path.join(self.workdir(node), os.path.basename(path))
+
+    def send_file(self, node: dict, source: str, target: str):
+        # The master sends its own file, relays send their received copy
+        if self.node:
+            source = self.resolve(self.node, source)
+        shutil.copyfile(source, self.resolve(node, target))
+
+    def run_agent(self, node: dict, envelope: dict) -> dict:
+        if node.get('unreachable'):
+            raise ConnectionError(f"{node['id']} is unreachable")
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)],
+            input=json.dumps(envelope), capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip())
+        return json.loads(completed.stdout)
+
+
+class SSHTransport:
+    """
+    Forwards over SSH with paramiko when available, otherwise with the
+    ssh/scp binaries. Only the master holds passwords, for its own hops;
+    every hop forwards the SSH agent so relays authenticate with keys.
+    """
+
+    def __init__(self, envelope: dict):
+        self.passwords = envelope.get('credentials') or {}
+        try:
+            import paramiko
+            import paramiko.agent
+            self.paramiko = paramiko
+        except ImportError:
+            self.paramiko = None
+
+    def workdir(self, node: dict) -> str:
+        return None
+
+    def send_file(self, node: dict, source: str, target: str):
+        if self.paramiko:
+            client = self.connect(node)
+            try:
+                sftp = client.open_sftp()
+                sftp.put(source, target)
+                sftp.close()
+            finally:
+                client.close()
+            return
+        subprocess.run(
+            ['scp', '-q', '-o', 'BatchMode=yes', '-P', str(node.get('port', 22)), source, f"{node['username']}@{node['ip']}:{target}"],
+            check=True, capture_output=True
+        )
+
+    def run_agent(self, node: dict, envelope: dict) -> dict:
+        path = remote_agent_path()
+        self.send_file(node, os.path.abspath(__file__), path)
+        quoted = shlex.quote(path)
+        command = f"python3 {quoted}; status=$?; rm -f {quoted}; exit $status"
+        if self.paramiko:
+            client = self.connect(node)
+            try:
+                channel = client.get_transport().open_session()
+                self.paramiko.agent.AgentRequestHandler(channel)
+                channel.exec_command(command)
+                channel.sendall(json.dumps(envelope).encode('utf-8'))
+                channel.shutdown_write()
+                output = channel.makefile('rb').read().decode('utf-8')
+                error = channel.makefile_stderr('rb').read().decode('utf-8')
+                if channel.recv_exit_status() != 0:
+                    raise RuntimeError(error.strip())
+            finally:
+                client.close()
+        else:
+            completed = subprocess.run(
+                ['ssh', '-A', '-o', 'BatchMode=yes', '-p', str(node.get('port', 22)), f"{node['username']}@{node['ip']}", command],
+                input=json.dumps(envelope), capture_output=True, text=True, check=True
+            )
+            output = completed.stdout
+        return json.loads(output)
+
+    def connect(self, node: dict):
+        client = self.paramiko.SSHClient()
+        client.set_missing_host_key_policy(self.paramiko.AutoAddPolicy())
+        client.connect(node['ip'], port=node.get('port', 22), username=node['username'], password=self.passwords.get(node['id']), timeout=10)
+        return client
+
+
+TRANSPORTS = {
+    'local': LocalTransport,
+    'ssh': SSHTransport,
+}
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(json.load(sys.stdin))))
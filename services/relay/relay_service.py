@@ -0,0 +1,77 @@
+import os
+import tempfile
+from typing import Dict, List, Tuple
+from services.node.node import Node
+from services.node.node_role import NodeRole
+from services.relay import relay_agent
+
+
+class RelayService:
+    """
+    Distributes a payload and/or command through a tree of relays instead of
+    from the master to every node. The master only talks to the first
+    `fanout` nodes; each of them forwards to its own `fanout` children and so
+    on, so the master uploads `fanout` copies of the payload and the tree is
+    log_fanout(N) levels deep. MASTER nodes are placed at the top of the tree
+    so they do the relaying. Every relay aggregates the results of its
+    subtree and passes them back up.
+
+    Passwords never leave the master: only the first-level hops use them,
+    deeper hops authenticate with keys through the forwarded SSH agent.
+    """
+    DEFAULT_FANOUT = 8
+
+    def __init__(self, fanout: int = None, transport: str = None, workdir: str = None):
+        self.fanout = int(fanout or os.getenv('RELAY_FANOUT', self.DEFAULT_FANOUT))
+        self.transport = transport or os.getenv('RELAY_TRANSPORT', 'ssh')
+        self.workdir = workdir
+
+    def plan(self, nodes: List[Node]) -> List[Dict]:
+        """Returns the subtrees the master sends to directly, as nested {'node', 'children'} dicts."""
+        ordered = sorted(nodes, key=lambda node: NodeRole.value_of(node.role) != NodeRole.MASTER.value)
+        subtrees = [{'node': self.describe(node), 'children': []} for node in ordered]
+        # Heap layout: children of position i are at fanout * (i + 1) ... fanout * (i + 1) + fanout - 1
+        for index, subtree in enumerate(subtrees):
+            first = self.fanout * (index + 1)
+            subtree['children'] = subtrees[first:first + self.fanout]
+        return subtrees[:self.fanout]
+
+    def distribute(self, nodes: List[Node], command: str = None, local_path: str = None, remote_path: str = None) -> Dict[str, Tuple[str, str, int]]:
+        """
+        Runs `command` on every node after copying `local_path` to
+        `remote_path`, both optional. Returns (stdout, stderr, exit_status)
+        per node id. Nodes that could not be reached, directly or through
+        their relay, have an exit status of None.
+        """
+        payload = {'source': local_path, 'target': remote_path or os.path.basename(local_path)} if local_path else None
+        children = self.plan(nodes)
+        first_hops = {child['node']['id'] for child in children}
+        envelope = {
+            'node': None,
+            'children': children,
+            # Read by the agent running here only, never put in a child envelope
+            'credentials': {str(node.id): node.get_ssh_login_params()[2] for node in nodes if str(node.id) in first_hops},
+            'command': command,
+            'payload': payload,
+            'transport': self.transport,
+            'workdir': self.workdir or tempfile.gettempdir(),
+        }
+        return self.flatten(relay_agent.run(envelope))
+
+    @staticmethod
+    def describe(node: Node) -> Dict:
+        ip, username, _ = node.get_ssh_login_params()
+        return {'id': str(node.id), 'ip': ip, 'username': username, 'port': node.port}
+
+    @classmethod
+    def flatten(cls, result: Dict) -> Dict[str, Tuple[str, str, int]]:
+        results = {}
+        if result['node'] is not None:
+            results[result['node']] = (result['stdout'], result['stderr'], result['exit_status'])
+        for child in result['children']:
+            results.update(cls.flatten(child))
+        return results
+
+    @staticmethod
+    def depth(subtrees: List[Dict]) -> int:
+        return max((1 + RelayService.depth(subtree['children']) for subtree in subtrees), default=0)
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import pytest
+from registry import Registry
+from services.node.node import Node
+from services.node.node_role import NodeRole
+from services.relay import relay_agent
+from services.relay.relay_service import RelayService
+from services.task.simple_task import SimpleTask
+from services.task.task_executor import TaskExecutor
+from services.task.task_status import TaskStatus
+from services.task.test_task_executor import FakeTaskManager, FakeTaskService
+
+
+def make_nodes(count, masters=0):
+    return [
+        Node(f"node-{i}", f"node-{i}", f"10.0.0.{i}", "root", "password", NodeRole.MASTER if i >= count - masters else NodeRole.SLAVE, "Ubuntu", "owner")
+        for i in range(count)
+    ]
+
+@pytest.fixture(scope="function")
+def relay_service(tmp_path):
+    return RelayService(fanout=3, transport='local', workdir=str(tmp_path))
+
+def walk(subtrees):
+    for subtree in subtrees:
+        yield subtree
+        yield from walk(subtree['children'])
+
+def ids(subtrees):
+    return [subtree['node']['id'] for subtree in subtrees]
+
+def test_plan_is_a_fanout_tree_with_masters_on_top(relay_service: RelayService):
+    plan = relay_service.plan(make_nodes(13, masters=2))
+
+    assert ids(plan) == ["node-11", "node-12", "node-0"]
+    assert ids(plan[0]['children']) == ["node-1", "node-2", "node-3"]
+    assert ids(plan[2]['children'][0]['children']) == []
+    assert RelayService.depth(plan) == 3
+
+def test_plan_puts_masters_with_string_roles_on_top(relay_service: RelayService):
+    nodes = make_nodes(5)
+    for node, role in zip(nodes, ["slave", "slave", "master", "slave", "Master"]):
+        node.role = role
+
+    assert ids(relay_service.plan(nodes)) == ["node-2", "node-4", "node-0"]
+
+def test_distributes_payload_and_aggregates_results(relay_service: RelayService, tmp_path):
+    payload = tmp_path / "payload.bin"
+    payload.write_bytes(os.urandom(4096))
+    nodes = make_nodes(10)
+
+    results = relay_service.distribute(nodes, "wc -c < payload.bin && echo $NODE_ID", str(payload), "payload.bin")
+
+    assert len(results) == 10
+    for node in nodes:
+        assert results[node.id] == (f"4096\n{node.id}\n", '', 0)
+        assert (tmp_path / node.id / "payload.bin").read_bytes() == payload.read_bytes()
+
+def test_unreachable_relay_fails_its_subtree(tmp_path):
+    leaf = {'node': {'id': "leaf"}, 'children': []}
+    relay = {'node': {'id': "relay", 'unreachable': True}, 'children': [leaf]}
+    other = {'node': {'id': "other"}, 'children': []}
+    envelope = {'node': None, 'children': [relay, other], 'command': "exit 3", 'transport': 'local', 'workdir': str(tmp_path)}
+
+    results = RelayService.flatten(relay_agent.run(envelope))
+
+    assert results["relay"][2] is None and results["leaf"][2] is None
+    assert "unreachable" in results["leaf"][1]
+    assert results["other"] == ('', '', 3)
+
+def test_executor_runs_relay_tasks_through_the_tree(relay_service: RelayService):
+    Registry.register('relay_service', relay_service)
+    executor = TaskExecutor()
+    executor.task_service = FakeTaskService()
+    executor.task_manager = FakeTaskManager()
+    nodes = make_nodes(5)
+    task = SimpleTask("task", "echo $NODE_ID", "echo $NODE_ID", nodes, relay=True)
+
+    try:
+        executor.execute(task)
+    finally:
+        Registry.remove('relay_service')
+        executor.pool.shutdown(wait=False)
+
+    assert executor.task_service.statuses[-1] is TaskStatus.COMPLETED
+    assert task.results["node-4"] == ("node-4\n", '')
+
+def test_passwords_stay_on_the_master(relay_service: RelayService, monkeypatch):
+    envelopes = []
+    monkeypatch.setattr(relay_agent, 'run', lambda envelope: envelopes.append(envelope) or {'node': None, 'children': []})
+    nodes = make_nodes(13)
+
+    relay_service.distribute(nodes, "uptime")
+
+    envelope, = envelopes
+    assert sorted(envelope['credentials']) == ["node-0", "node-1", "node-2"]
+    assert all('password' not in subtree['node'] for subtree in walk(envelope['children']))
+
+    class RecordingTransport:
+        def run_agent(self, node, child_envelope):
+            return child_envelope
+
+    forwarded = relay_agent.forward(RecordingTransport(), envelope, envelope['children'][0])
+    assert 'credentials' not in forwarded
+    assert all('password' not in subtree['node'] for subtree in walk([forwarded]))
+
+def test_ssh_hops_use_a_fresh_agent_path_and_forward_the_agent(monkeypatch):
+    commands = []
+    monkeypatch.setattr(relay_agent.subprocess, 'run', lambda args, **kwargs: commands.append(args) or subprocess.CompletedProcess(args, 0, '{}', ''))
+    transport = relay_agent.SSHTransport({'credentials': {"relay": "secret"}})
+    transport.paramiko = None
+    node = {'id': "relay", 'ip': "10.0.0.1", 'username': "root", 'port': 22}
+
+    transport.run_agent(node, {'node': node, 'children': []})
+    transport.run_agent(node, {'node': node, 'children': []})
+
+    scp, ssh, second_scp, _ = commands
+    assert scp[-1] != second_scp[-1] and scp[-1].startswith("root@10.0.0.1:/tmp/relay_agent_")
+    assert '-A' in ssh and f"rm -f {scp[-1].split(':', 1)[1]}" in ssh[-1]
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Tuple
+from services.output_buffer import NodeOutput
+
+
+class BlobRef:
+    """
+    Reference to a stored result: one blob key per string, in the shape of
+    the original value, and the command's exit status when it had one.
+    """
+    __slots__ = ('keys', 'is_tuple', 'exit_status')
+
+    def __init__(self, keys: Tuple[str, ...], is_tuple: bool, exit_status: Optional[int] = None):
+        self.keys = keys
+        self.is_tuple = is_tuple
+        self.exit_status = exit_status
+
+
+class ResultStore:
+    """
+    Content-addressed store for node outputs. Every distinct string is kept
+    once, keyed by its SHA-256, and blobs above `compress_threshold` bytes
+    are zlib-compressed when that makes them smaller. Blobs are reference
+    counted and dropped when no task points at them anymore. Values that are
+    not strings (live output buffers, transfer reports) are kept as they are.
+    """
+    DEFAULT_COMPRESS_THRESHOLD = 1024
+    _shared: Optional['ResultStore'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, compress_threshold: int = None):
+        self.compress_threshold = int(compress_threshold or os.getenv('RESULT_COMPRESS_THRESHOLD', self.DEFAULT_COMPRESS_THRESHOLD))
+        # key -> (stored bytes, compressed, raw size, references)
+        self.blobs: Dict[str, list] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'ResultStore':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def encode(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return BlobRef((self.put(value),), False)
+        if isinstance(value, tuple) and value and all(isinstance(part, str) for part in value):
+            return BlobRef(tuple(self.put(part) for part in value), True, getattr(value, 'exit_status', None))
+        return value
+
+    def decode(self, ref: Any) -> Any:
+        if not isinstance(ref, BlobRef):
+            return ref
+        with self.lock:
+            blobs = [self.blobs[key] for key in ref.keys]
+        return self._assemble(ref, blobs)
+
+    def lookup(self, refs: Dict[Any, Any], node_id: Any) -> Any:
+        """
+        Decodes `refs[node_id]`. The ref is read under the same lock as its
+        blobs, and tasks drop a ref from their results before releasing it,
+        so a concurrent replace or release cannot free the blobs in between.
+        """
+        with self.lock:
+            ref = refs[node_id]
+            if not isinstance(ref, BlobRef):
+                return ref
+            blobs = [self.blobs[key] for key in ref.keys]
+        return self._assemble(ref, blobs)
+
+    @staticmethod
+    def _assemble(ref: BlobRef, blobs: list) -> Any:
+        # Decompressed outside the lock
+        parts = tuple((zlib.decompress(stored) if compressed else stored).decode('utf-8') for stored, compressed, _, _ in blobs)
+        if not ref.is_tuple:
+            return parts[0]
+        return NodeOutput(*parts, ref.exit_status) if ref.exit_status is not None else parts
+
+    def release(self, ref: Any, keep: Any = None):
+        """
+        Drops a reference. Output buffers, which are kept as they are, lose
+        their spill files unless `keep` (the replacing value) still holds them.
+        """
+        if isinstance(ref, BlobRef):
+            with self.lock:
+                for key in ref.keys:
+                    blob = self.blobs.get(key)
+                    if blob is not None:
+                        blob[3] -= 1
+                        if blob[3] <= 0:
+                            del self.blobs[key]
+            return
+
+        kept = {id(part) for part in self._parts(keep)}
+        for part in self._parts(ref):
+            if id(part) not in kept and callable(getattr(part, 'discard', None)):
+                part.discard()
+
+    @staticmethod
+    def _parts(value: Any) -> tuple:
+        return value if isinstance(value, tuple) else (value,)
+
+    def put(self, text: str) -> str:
+        data = text.encode('utf-8')
+        key = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            blob = self.blobs.get(key)
+            if blob is not None:
+                blob[3] += 1
+                return key
+
+        stored, compressed = data, False
+        if len(data) >= self.compress_threshold:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                stored, compressed = packed, True
+        with self.lock:
+            blob = self.blobs.setdefault(key, [stored, compressed, len(data), 0])
+            blob[3] += 1
+        return key
+
+    def get(self, key: str) -> str:
+        # Read under the lock, since a concurrent release may drop the blob; decompressed outside it
+        with self.lock:
+            stored, compressed, _, _ = self.blobs[key]
+        return (zlib.decompress(stored) if compressed else stored).decode('utf-8')
+
+    def sizes(self, key: str) -> Tuple[int, int]:
+        """(raw bytes, stored bytes) of a blob."""
+        with self.lock:
+            stored, _, raw_size, _ = self.blobs[key]
+        return raw_size, len(stored)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'blobs': len(self.blobs),
+                'raw_bytes': sum(blob[2] for blob in self.blobs.values()),
+                'stored_bytes': sum(len(blob[0]) for blob in self.blobs.values()),
+            }
+
+
+class ResultsView(Mapping):
+    """Read-only, non-copying view of a task's results that resolves blobs on access."""
+
+    def __init__(self, refs: Dict[str, Any], store: ResultStore):
+        self._refs = refs
+        self._store = store
+
+    def __getitem__(self, node_id):
+        return self._store.lookup(self._refs, node_id)
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._refs))
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __contains__(self, node_id):
+        return node_id in self._refs
+
+    def __repr__(self):
+        return repr(dict(self.items()))
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import logging
+import os
+import shlex
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import paramiko
+
+
+class TransferReport:
+    def __init__(self, direction: str, source: str, target: str, size: int, transferred: int = 0, resumed: int = 0, seconds: float = 0.0, skipped: bool = False):
+        self.direction = direction
+        self.source = source
+        self.target = target
+        self.size = size
+        self.transferred = transferred
+        self.resumed = resumed
+        self.seconds = seconds
+        self.skipped = skipped
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second actually moved in this run."""
+        return self.transferred / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.skipped:
+            return f"Skipped {self.source} -> {self.target}: already up to date ({self.size} bytes)"
+        resumed = f", resumed after {self.resumed} bytes" if self.resumed else ""
+        return (
+            f"Transferred {self.source} -> {self.target}: {self.transferred} bytes in {self.seconds:.2f}s "
+            f"({self.throughput / (1024 * 1024):.2f} MiB/s{resumed})"
+        )
+
+
+class TransferCheckpoint:
+    """Per-chunk progress of a transfer, persisted as JSON so an interrupted run can resume."""
+
+    def __init__(self, path: str, stamp: List):
+        self.path = path
+        self.stamp = stamp
+        self.done: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> bool:
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if data.get('stamp') != self.stamp:
+            return False
+        self.done = data.get('done', {})
+        return True
+
+    def get(self, index: int, default: int) -> int:
+        with self.lock:
+            return self.done.get(str(index), default)
+
+    def update(self, index: int, offset: int):
+        with self.lock:
+            self.done[str(index)] = offset
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w') as file:
+                json.dump({'stamp': self.stamp, 'done': self.done}, file)
+            os.replace(temporary, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class SFTPTransfer:
+    """
+    Moves files over an existing SSH connection. Files above
+    `chunk_threshold` are split into `parallel` ranges that each get their
+    own SFTP channel. Writes are pipelined and reads issue batches of
+    outstanding requests. Progress is checkpointed so an interrupted transfer
+    resumes, and files whose size and SHA-256 already match are skipped.
+    """
+    DEFAULT_PARALLEL = 4
+    DEFAULT_CHUNK_THRESHOLD = 64 * 1024 * 1024
+    BLOCK_SIZE = 256 * 1024
+    READ_BATCH = 64
+    CHECKPOINT_INTERVAL = 16 * 1024 * 1024
+
+    def __init__(self, ssh_client: paramiko.SSHClient, parallel: int = None, chunk_threshold: int = None, checkpoint_dir: str = None):
+        self.ssh_client = ssh_client
+        self.parallel = int(parallel or os.getenv('SFTP_PARALLEL', self.DEFAULT_PARALLEL))
+        self.chunk_threshold = int(chunk_threshold or os.getenv('SFTP_CHUNK_THRESHOLD', self.DEFAULT_CHUNK_THRESHOLD))
+        self.checkpoint_dir = checkpoint_dir or os.getenv('SFTP_CHECKPOINT_DIR', tempfile.gettempdir())
+        self.logger = logging.getLogger(__name__)
+
+    def put(self, local_path: str, remote_path: str) -> TransferReport:
+        size = os.path.getsize(local_path)
+        remote_size = self.remote_size(remote_path)
+        if remote_size == size and self.remote_sha256(remote_path) == self.local_sha256(local_path):
+            return TransferReport('put', local_path, remote_path, size, skipped=True)
+
+        checkpoint = self._checkpoint('put', local_path, remote_path, [size, os.path.getmtime(local_path)])
+        resuming = remote_size is not None and checkpoint.load()
+        sftp = self.ssh_client.open_sftp()
+        try:
+            if not resuming:
+                sftp.open(remote_path, 'wb').close()
+            report = self._run('put', local_path, remote_path, size, checkpoint, self._put_part)
+            if remote_size is not None and remote_size > size:
+                sftp.truncate(remote_path, size)
+        finally:
+            sftp.close()
+        return report
+
+    def get(self, remote_path: str, local_path: str) -> TransferReport:
+        sftp = self.ssh_client.open_sftp()
+        try:
+            attributes = sftp.stat(remote_path)
+        finally:
+            sftp.close()
+        size = attributes.st_size
+
+        local_exists = os.path.exists(local_path)
+        if local_exists and os.path.getsize(local_path) == size and self.remote_sha256(remote_path) == self.local_sha256(local_path):
+            return TransferReport('get', remote_path, local_path, size, skipped=True)
+
+        checkpoint = self._checkpoint('get', local_path, remote_path, [size, attributes.st_mtime])
+        resuming = local_exists and checkpoint.load()
+        if not resuming:
+            open(local_path, 'wb').close()
+        report = self._run('get', remote_path, local_path, size, checkpoint, self._get_part)
+        os.truncate(local_path, size)
+        return report
+
+    def remote_size(self, remote_path: str) -> Optional[int]:
+        sftp = self.ssh_client.open_sftp()
+        try:
+            return sftp.stat(remote_path).st_size
+        except IOError:
+            return None
+        finally:
+            sftp.close()
+
+    def remote_sha256(self, remote_path: str) -> Optional[str]:
+        stdin, stdout, stderr = self.ssh_client.exec_command(f"sha256sum -- {shlex.quote(remote_path)}")
+        if stdout.channel.recv_exit_status() != 0:
+            return None
+        output = stdout.read().decode('utf-8').split()
+        return output[0] if output else None
+
+    @staticmethod
+    def local_sha256(local_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(local_path, 'rb') as file:
+            while block := file.read(1024 * 1024):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def split(self, size: int) -> List[Tuple[int, int]]:
+        if size <= self.chunk_threshold or self.parallel <= 1:
+            return [(0, size)]
+        part = -(-size // self.parallel)
+        return [(start, min(start + part, size)) for start in range(0, size, part)]
+
+    def _run(self, direction: str, source: str, target: str, size: int, checkpoint: TransferCheckpoint, worker) -> TransferReport:
+        parts = self.split(size)
+        local_path, remote_path = (source, target) if direction == 'put' else (target, source)
+        resumed = sum(checkpoint.get(index, start) - start for index, (start, end) in enumerate(parts))
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+            futures = [
+                pool.submit(worker, local_path, remote_path, index, start, end, checkpoint)
+                for index, (start, end) in enumerate(parts)
+            ]
+            for future in futures:
+                future.result()
+        checkpoint.remove()
+
+        report = TransferReport(direction, source, target, size, size - resumed, resumed, time.monotonic() - started_at)
+        self.logger.info(str(report))
+        return report
+
+    def _put_part(self, local_path: str, remote_path: str, index: int, start: int, end: int, checkpoint: TransferCheckpoint):
+        offset = checkpoint.get(index, start)
+        sftp = self.ssh_client.open_sftp()
+        try:
+            with open(local_path, 'rb') as source, sftp.open(remote_path, 'r+b') as target:
+                target.set_pipelined(True)
+                source.seek(offset)
+                target.seek(offset)
+                saved = offset
+                while offset < end:
+                    data = source.read(min(self.BLOCK_SIZE, end - offset))
+                    if not data:
+                        break
+                    target.write(data)
+                    offset += len(data)
+                    if offset - saved >= self.CHECKPOINT_INTERVAL:
+                        # A synchronous request waits for every pipelined write before it to be acknowledged
+                        target.flush()
+                        target.stat()
+                        checkpoint.update(index, offset)
+                        saved = offset
+            checkpoint.update(index, offset)
+        finally:
+            sftp.close()
+
+    def _get_part(self, local_path: str, remote_path: str, index: int, start: int, end: int, checkpoint: TransferCheckpoint):
+        offset = checkpoint.get(index, start)
+        sftp = self.ssh_client.open_sftp()
+        try:
+            with sftp.open(remote_path, 'rb') as source, open(local_path, 'r+b') as target:
+                target.seek(offset)
+                saved = offset
+                while offset < end:
+                    window = min(end, offset + self.BLOCK_SIZE * self.READ_BATCH)
+                    requests = [(position, min(self.BLOCK_SIZE, window - position)) for position in range(offset, window, self.BLOCK_SIZE)]
+                    for data in source.readv(requests):
+                        target.write(data)
+                        offset += len(data)
+                    if offset - saved >= self.CHECKPOINT_INTERVAL:
+                        target.flush()
+                        checkpoint.update(index, offset)
+                        saved = offset
+            checkpoint.update(index, offset)
+        finally:
+            sftp.close()
+
+    def _checkpoint(self, direction: str, local_path: str, remote_path: str, stamp: List) -> TransferCheckpoint:
+        hostname = self.ssh_client.get_transport().getpeername()[0]
+        key = hashlib.sha256(f"{direction}:{hostname}:{os.path.abspath(local_path)}:{remote_path}".encode()).hexdigest()[:24]
+        return TransferCheckpoint(os.path.join(self.checkpoint_dir, f"sftp-{key}.json"), stamp)
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from services.ssh_service import SSHService
+
+
+class SSHPool:
+    """
+    Keeps authenticated SSH transports alive between commands, keyed by
+    (ip, username, port), so repeated commands to a node skip the TCP,
+    key exchange and auth handshake.
+    """
+    DEFAULT_MAX_PER_HOST = 4
+    DEFAULT_IDLE_TIMEOUT = 300
+    DEFAULT_KEEPALIVE = 30
+
+    def __init__(self, max_per_host: int = None, idle_timeout: float = None, keepalive: int = None):
+        self.max_per_host = int(max_per_host or os.getenv('SSH_POOL_MAX_PER_HOST', self.DEFAULT_MAX_PER_HOST))
+        self.idle_timeout = float(idle_timeout or os.getenv('SSH_POOL_IDLE_TIMEOUT', self.DEFAULT_IDLE_TIMEOUT))
+        self.keepalive = int(keepalive or os.getenv('SSH_POOL_KEEPALIVE', self.DEFAULT_KEEPALIVE))
+        self.logger = logging.getLogger(__name__)
+        self.condition = threading.Condition()
+        # Idle connections per host, oldest first. Open counts include idle and checked out ones.
+        self.idle: Dict[Tuple, List[Tuple[SSHService, float]]] = {}
+        self.open: Dict[Tuple, int] = {}
+        self.reaper = None
+        self.closed = False
+
+    @staticmethod
+    def get_key(hostname: str, username: str, port: int = 22) -> Tuple:
+        return (hostname, username, port)
+
+    def acquire(self, hostname: str, username: str, password: str = None, port: int = 22, key_filename: str = None, timeout: Optional[float] = None) -> SSHService:
+        key = self.get_key(hostname, username, port)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        client = None
+
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("SSH pool is closed")
+                idle = self.idle.get(key)
+                if idle:
+                    client, _ = idle.pop()
+                    break
+                if self.open.get(key, 0) < self.max_per_host:
+                    self.open[key] = self.open.get(key, 0) + 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No SSH connection available for {username}@{hostname}:{port}")
+                self.condition.wait(remaining)
+
+        if client is not None and not client.is_alive():
+            self.logger.info(f"Pooled connection to {hostname} is dead, reconnecting")
+            client.close()
+            client = None
+
+        if client is None:
+            client = SSHService(hostname, username, password, key_filename, port=port, keep_open=True, keepalive=self.keepalive)
+            try:
+                client.connect_ssh()
+            except Exception:
+                self._discard(key, client)
+                raise
+
+        return client
+
+    def release(self, client: SSHService, discard: bool = False):
+        key = self.get_key(client.hostname, client.username, client.port)
+        if discard or self.closed or not client.is_alive():
+            self._discard(key, client)
+            return
+
+        with self.condition:
+            self.idle.setdefault(key, []).append((client, time.monotonic()))
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self, hostname: str, username: str, password: str = None, port: int = 22, key_filename: str = None, timeout: Optional[float] = None):
+        client = self.acquire(hostname, username, password, port, key_filename, timeout)
+        try:
+            yield client
+        except Exception:
+            self.release(client, discard=True)
+            raise
+        else:
+            self.release(client)
+
+    def execute_command(self, command: str, hostname: str, username: str, password: str = None, port: int = 22, **kwargs):
+        with self.connection(hostname, username, password, port) as client:
+            return client.execute_command(command, **kwargs)
+
+    def evict_idle(self) -> int:
+        expired = []
+        now = time.monotonic()
+        with self.condition:
+            for key, idle in self.idle.items():
+                while idle and now - idle[0][1] >= self.idle_timeout:
+                    client, _ = idle.pop(0)
+                    expired.append((key, client))
+
+        for key, client in expired:
+            self._discard(key, client)
+        if expired:
+            self.logger.info(f"Evicted {len(expired)} idle SSH connections")
+        return len(expired)
+
+    def start_reaper(self):
+        if self.reaper is None:
+            self.reaper = threading.Thread(target=self._reap, daemon=True)
+            self.reaper.start()
+
+    def close_all(self):
+        with self.condition:
+            self.closed = True
+            idle = [(key, client) for key, entries in self.idle.items() for client, _ in entries]
+            self.idle.clear()
+            self.condition.notify_all()
+
+        for key, client in idle:
+            self._discard(key, client)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        with self.condition:
+            return {
+                f"{username}@{hostname}:{port}": {
+                    "open": count,
+                    "idle": len(self.idle.get((hostname, username, port), [])),
+                }
+                for (hostname, username, port), count in self.open.items()
+            }
+
+    def _discard(self, key: Tuple, client: SSHService):
+        client.close()
+        with self.condition:
+            self.open[key] = self.open.get(key, 1) - 1
+            if self.open[key] <= 0:
+                del self.open[key]
+            self.condition.notify()
+
+    def _reap(self):
+        while not self.closed:
+            time.sleep(max(self.idle_timeout / 2, 1))
+            self.evict_idle()
@@ -1,6 +1,13 @@
 import logging
+import os
 import paramiko
+import select
 import socket
+import time
+from services.metrics import Metrics
+from services.output_buffer import CommandOutput, NodeOutput
+from services.sftp_transfer import SFTPTransfer
+from services.tracing import Tracer
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -8,55 +15,145 @@ logging.basicConfig(
 )
 
 class SSHService:
-    SFTP_COMMANDS = ["push-path", "get"]
+    SFTP_COMMANDS = ["push-path", "put", "get"]
+    ERROR_PREFIX = "Error in execute_command"
+    COMMAND_ERROR_PREFIX = "Command failed"
+    # Only these mean the node or its connection is unhealthy; anything else is a problem with the command itself
+    CONNECTION_ERRORS = (ConnectionError, paramiko.SSHException, socket.timeout, EOFError)
+    DEFAULT_TIMEOUT = 10
+    DEFAULT_COMMAND_TIMEOUT = 300
+    CHUNK_SIZE = 32768
+    CONNECT_SECONDS = Metrics.shared().histogram('ssh_connect_seconds', 'TCP connect, key exchange and authentication time')
+    CONNECT_ERRORS = Metrics.shared().counter('ssh_connect_errors_total', 'SSH connections that failed to open')
+    COMMAND_SECONDS = Metrics.shared().histogram('ssh_command_seconds', 'Remote command runtime, excluding connect')
+    COMMAND_ERRORS = Metrics.shared().counter('ssh_command_errors_total', 'Commands that ended in an SSH error')
 
-    def __init__(self, hostname, username, password=None, key_filename=None):
+    def __init__(self, hostname, username, password=None, key_filename=None, port=22, keep_open=False, keepalive=0, timeout=None):
         self.hostname = hostname
         self.username = username
         self.password = password
         self.key_filename = key_filename
+        self.port = port
+        self.keep_open = keep_open
+        self.keepalive = keepalive
+        self.timeout = float(timeout or os.getenv('SSH_TIMEOUT', self.DEFAULT_TIMEOUT))
+        self.command_timeout = float(os.getenv('NODE_TIMEOUT', self.DEFAULT_COMMAND_TIMEOUT))
         self.logger = logging.getLogger(__name__)
         self.ssh_client = None
         self.sftp_client = None
+        self.exit_status = None
 
-    def execute_command(self, command=None, local_path=None, remote_path=None):
+    def execute_command(self, command=None, local_path=None, remote_path=None, output: CommandOutput = None, timeout: float = None):
+        """
+        Runs `command`, or an SFTP transfer, on the host. Commands still
+        running after `timeout` seconds (default `NODE_TIMEOUT`) are abandoned
+        and the connection is closed so the remote side hangs up.
+        """
+        timeout = timeout or self.command_timeout
+        tracer = Tracer.shared()
+        span = None
         try:
             if not command:
                 raise ValueError("Command is required for 'command_execution'")
 
-            self.connect_ssh()
+            try:
+                self.connect_ssh()
+            except Exception as e:
+                raise ConnectionError(str(e)) from e
 
             self.logger.info(f"Executing command: {command}")
+            started = time.perf_counter()
+            span = tracer.start_span('exec', command=command)
+            self.exit_status = None
 
             if command in self.SFTP_COMMANDS:
                 if not local_path or not remote_path:
                     raise ValueError("Both local_path and remote_path are required for file transfer operations")
 
-                self.connect_sftp()
+                transfer = SFTPTransfer(self.ssh_client)
                 sftp_ops = {
-                    "put": self.sftp_client.put,
-                    "get": self.sftp_client.get
+                    "push-path": lambda: transfer.put(local_path, remote_path),
+                    "put": lambda: transfer.put(local_path, remote_path),
+                    "get": lambda: transfer.get(remote_path, local_path)
                 }
-                sftp_ops[command](localpath=local_path, remotepath=remote_path)
+                report = sftp_ops[command]()
 
-                self.logger.info(f"File uploaded successfully from {local_path} to {remote_path}")
-                return f"File uploaded successfully from {local_path} to {remote_path}"
+                self.logger.info(str(report))
+                return str(report)
+
+            elif output is not None:
+                for stream, chunk in self.stream_command(command, timeout):
+                    output.write(stream, chunk)
+                output.close(self.exit_status)
+                self.COMMAND_SECONDS.observe(time.perf_counter() - started)
+                self.logger.info(f"Command executed with exit status: {self.exit_status}")
+                return NodeOutput(output.stdout, output.stderr, self.exit_status)
 
             else:
-                stdin, stdout, stderr = self.ssh_client.exec_command(command)
-                exit_status = stdout.channel.recv_exit_status()
+                deadline = time.monotonic() + timeout
+                stdin, stdout, stderr = self.ssh_client.exec_command(command, timeout=timeout)
                 output = stdout.read().decode('utf-8')
                 error = stderr.read().decode('utf-8')
+                if not stdout.channel.status_event.wait(max(deadline - time.monotonic(), 0)):
+                    raise socket.timeout(f"Command timed out after {timeout}s")
+                exit_status = self.exit_status = stdout.channel.recv_exit_status()
+                self.COMMAND_SECONDS.observe(time.perf_counter() - started)
                 self.logger.info(f"Command executed with exit status: {exit_status}")
-                return output, error
+                return NodeOutput(output, error, exit_status)
+
+        except self.CONNECTION_ERRORS as e:
+            # The transport may be broken or still running the command; never hand it out again
+            self.close()
+            return self.error_result(self.ERROR_PREFIX, e, span)
 
         except Exception as e:
-            error_message = f"Error in execute_command: {str(e)}"
-            self.logger.error(error_message)
-            return '', error_message
+            return self.error_result(self.COMMAND_ERROR_PREFIX, e, span)
 
         finally:
-            self.close()
+            if span is not None:
+                span.set(exit_status=self.exit_status)
+                tracer.finish(span)
+            if not self.keep_open:
+                self.close()
+
+    def error_result(self, prefix: str, error: Exception, span=None):
+        self.COMMAND_ERRORS.inc()
+        error_message = f"{prefix}: {str(error)}"
+        if span is not None:
+            span.set(error=error_message)
+        self.logger.error(error_message)
+        return '', error_message
+
+    def stream_command(self, command, timeout: float = None):
+        """
+        Yields ('stdout' | 'stderr', bytes) chunks while the command runs.
+        `exit_status` is set once the generator is exhausted. Raises
+        socket.timeout once the command has run for `timeout` seconds.
+        """
+        timeout = timeout or self.command_timeout
+        deadline = time.monotonic() + timeout
+        self.connect_ssh()
+        channel = self.ssh_client.get_transport().open_session()
+        try:
+            channel.settimeout(timeout)
+            channel.exec_command(command)
+            while not channel.exit_status_ready() or channel.recv_ready() or channel.recv_stderr_ready():
+                if time.monotonic() >= deadline:
+                    raise socket.timeout(f"Command timed out after {timeout}s")
+                if channel.recv_ready():
+                    yield 'stdout', channel.recv(self.CHUNK_SIZE)
+                elif channel.recv_stderr_ready():
+                    yield 'stderr', channel.recv_stderr(self.CHUNK_SIZE)
+                else:
+                    select.select([channel], [], [], 0.1)
+
+            while chunk := channel.recv(self.CHUNK_SIZE):
+                yield 'stdout', chunk
+            while chunk := channel.recv_stderr(self.CHUNK_SIZE):
+                yield 'stderr', chunk
+            self.exit_status = channel.recv_exit_status()
+        finally:
+            channel.close()
 
     def connect_sftp(self):
         if not self.sftp_client:
@@ -66,33 +163,64 @@ class SSHService:
         if not self.ssh_client:
             self.ssh_client = paramiko.SSHClient()
             self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            tracer = Tracer.shared()
+            started = time.perf_counter()
+            connected = False
             try:
                 self.logger.info(f"Attempting to connect to {self.hostname} as {self.username}")
-                if self.key_filename:
-                    self.ssh_client.connect(
-                        hostname=self.hostname, 
-                        username=self.username, 
-                        key_filename=self.key_filename
-                    )
-                else:
-                    self.ssh_client.connect(
-                        hostname=self.hostname, 
-                        username=self.username, 
-                        password=self.password
-                    )
+                # Opening the socket ourselves separates TCP connect from key exchange and auth in traces
+                with tracer.span('connect', host=self.hostname, port=self.port):
+                    sock = socket.create_connection((self.hostname, self.port), timeout=self.timeout)
+                with tracer.span('auth', username=self.username):
+                    if self.key_filename:
+                        self.ssh_client.connect(
+                            hostname=self.hostname,
+                            port=self.port,
+                            username=self.username,
+                            key_filename=self.key_filename,
+                            timeout=self.timeout,
+                            sock=sock
+                        )
+                    else:
+                        self.ssh_client.connect(
+                            hostname=self.hostname,
+                            port=self.port,
+                            username=self.username,
+                            password=self.password,
+                            timeout=self.timeout,
+                            sock=sock
+                        )
+                if self.keepalive:
+                    self.ssh_client.get_transport().set_keepalive(self.keepalive)
+                self.CONNECT_SECONDS.observe(time.perf_counter() - started)
+                connected = True
                 self.logger.info("Successfully connected")
             except paramiko.AuthenticationException:
+                self.CONNECT_ERRORS.inc()
                 self.logger.error("Authentication failed. Please check your credentials.")
                 raise
             except paramiko.SSHException as ssh_exception:
+                self.CONNECT_ERRORS.inc()
                 self.logger.error(f"SSH exception occurred: {str(ssh_exception)}")
                 raise
             except socket.error as socket_error:
+                self.CONNECT_ERRORS.inc()
                 self.logger.error(f"Socket error occurred: {str(socket_error)}")
                 raise
             except Exception as e:
+                self.CONNECT_ERRORS.inc()
                 self.logger.error(f"An unexpected error occurred: {str(e)}")
                 raise
+            finally:
+                # A failed connect or auth leaves a half-open transport behind; drop it so the next attempt starts clean
+                if not connected:
+                    self.close()
+
+    def is_alive(self):
+        if not self.ssh_client:
+            return False
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active()
 
     def close(self):
         if self.ssh_client:
@@ -1,22 +1,41 @@
-import threading
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Union
 from services.task.task import Task
 
 
 class PeriodicTask(Task):
-    def __init__(self, task_id: str, description: str, command: str, node_ids: List[str], interval: timedelta, start_time: datetime, end_time: Optional[datetime] = None):
-        super().__init__(task_id, description, command, node_ids)
-        self.interval = interval
+    def __init__(self, task_id: str, description: str, command: str, node_ids: List[str], interval: Union[timedelta, float], start_time: datetime, end_time: Optional[datetime] = None, **kwargs):
+        super().__init__(task_id, description, command, node_ids, **kwargs)
+        self.interval = interval if isinstance(interval, timedelta) else timedelta(seconds=interval)
         self.start_time = start_time
         self.end_time = end_time
-        self.thread = threading.Thread(target=self.run)
-        self.running = False
+        self.running = True
         self.last_execution = None
 
+    @property
+    def recurring(self) -> bool:
+        return self.running
+
+    @property
+    def next_execution_time(self) -> Optional[datetime]:
+        """Start of the next cycle, or None once the task is stopped or past its end time."""
+        if not self.running:
+            return None
+        now = datetime.now()
+        next_time = self.start_time
+        if next_time < now:
+            cycles = -(-(now - self.start_time) // self.interval)
+            next_time = self.start_time + cycles * self.interval
+        if self.end_time and next_time > self.end_time:
+            return None
+        return next_time
+
+    def stop(self):
+        self.running = False
+
     def get_additional_info(self) -> List[str]:
         return [
             f"Interval: {self.interval}",
             f"Next Execution: {self.next_execution_time}",
             f"End Time: {self.end_time or 'Not set'}"
-        ]
\ No newline at end of file
+        ]
@@ -3,8 +3,8 @@ from services.task.task import Task
 from datetime import datetime
 
 class ScheduledTask(Task):
-    def __init__(self, task_id: str, description: str, command: str, node_ids: List[str], scheduled_time: datetime):
-        super().__init__(task_id, description, command, node_ids)
+    def __init__(self, task_id: str, description: str, command: str, node_ids: List[str], scheduled_time: datetime, **kwargs):
+        super().__init__(task_id, description, command, node_ids, **kwargs)
         self.scheduled_time = scheduled_time
 
     def get_additional_info(self) -> List[str]:
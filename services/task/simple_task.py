@@ -3,8 +3,8 @@ from typing import List
 from services.task.task import Task
 
 class SimpleTask(Task):
-    def __init__(self, id: uuid.UUID, description: str, task_command: str, nodes: List[str], remote_path: str=None, local_path: str=None):
-        super().__init__(id, description, task_command, nodes, remote_path, local_path)
+    def __init__(self, id: uuid.UUID, description: str, task_command: str, nodes: List[str], remote_path: str=None, local_path: str=None, stream_output: bool=False, relay: bool=False):
+        super().__init__(id, description, task_command, nodes, remote_path, local_path, stream_output, relay)
 
     def get_additional_info(self) -> List[str]:
         return []
\ No newline at end of file
@@ -1,26 +1,43 @@
 import uuid
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Dict, List
+from services.result_store import ResultStore, ResultsView
 from services.task.task_status import TaskStatus
 
 class Task(ABC):
-    def __init__(self, id: uuid.UUID, description: str, task_command: str, nodes: List[object], remote_path: str=None, local_path: str=None):
+    # Recurring tasks stay in memory between runs
+    recurring = False
+
+    def __init__(self, id: uuid.UUID, description: str, task_command: str, nodes: List[object], remote_path: str=None, local_path: str=None, stream_output: bool=False, relay: bool=False):
         self._task_id = id
         self.description = description
         self._task_command = task_command
         self.status = TaskStatus.PENDING
         self._nodes = nodes
-        self._results: Dict[str, str] = {}
+        # Node id -> reference into the shared content-addressed result store
+        self._results: Dict[str, object] = {}
+        self._result_store = ResultStore.shared()
         self.remote_path = remote_path
         self.local_path = local_path
+        self.stream_output = stream_output
+        self.relay = relay
+        self.created_at = datetime.now()
+        self.finished_at = None
+        # Root span of the task's trace when it was sampled
+        self.trace = None
 
     def __repr__(self):
-        return f"Task({self._task_id}, {self._task_command}, '{self.description}', {self.status}, nodes: {self.nodes}, results: {self._results})"
+        return f"Task({self._task_id}, {self._task_command}, '{self.description}', {self.status}, nodes: {self.nodes}, results: {self.results})"
 
     @property
     def id(self):
         return self._task_id
 
+    @property
+    def type_name(self) -> str:
+        return self.__class__.__name__
+
     @property
     def task_command(self):
         return self._task_command
@@ -40,16 +57,44 @@ class Task(ABC):
         self._nodes = value
 
     @property
-    def results(self):
-        return self._results.copy()
+    def results(self) -> ResultsView:
+        return ResultsView(self._results, self._result_store)
 
     def add_result(self, node_id, result):
-        self._results[node_id] = result
+        previous = self._results.get(node_id)
+        self._results[node_id] = self._result_store.encode(result)
+        self._result_store.release(previous, keep=result)
+
+    def release_results(self):
+        # Emptied in place before releasing, so open views never see a released ref
+        refs = list(self._results.values())
+        self._results.clear()
+        for ref in refs:
+            self._result_store.release(ref)
+
+    def result_stats(self) -> Dict[str, float]:
+        """How much deduplication and compression saved for this task's results."""
+        raw_bytes = 0
+        stored = {}
+        for ref in self._results.values():
+            for key in getattr(ref, 'keys', ()):
+                raw_size, stored_size = self._result_store.sizes(key)
+                raw_bytes += raw_size
+                stored[key] = stored_size
+        stored_bytes = sum(stored.values())
+        return {
+            'results': len(self._results),
+            'unique_blobs': len(stored),
+            'raw_bytes': raw_bytes,
+            'stored_bytes': stored_bytes,
+            'bytes_saved': raw_bytes - stored_bytes,
+            'dedupe_ratio': raw_bytes / stored_bytes if stored_bytes else 1.0,
+        }
 
     def to_string(self) -> str:
         task_info = [
             f"ID: {self._task_id}",
-            f"Type: {self.__class__.__name__}",
+            f"Type: {self.type_name}",
             f"Status: {self.status.name}",
             f"Description: {self.description}",
             f"Nodes: {', '.join(str(node) for node in self.nodes)}",
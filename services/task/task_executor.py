@@ -1,37 +1,293 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Dict, List, Optional
 from registry import Registry
+from services.admission_controller import AdmissionController
+from services.circuit_breaker import CircuitBreakers
 from services.task.task import Task
+from services.execution.command_batcher import CommandBatcher
 from services.execution.execution_factory import ExecutionFactory
+from services.metrics import Metrics
 from services.node.node import Node
+from services.output_buffer import CommandOutput, NodeOutput
+from services.relay.relay_service import RelayService
+from services.ssh_service import SSHService
 from services.task.task_status import TaskStatus
+from services.thread_service import ThreadService
+from services.tracing import Span, Tracer
 
 
 class TaskExecutor:
+    DEFAULT_FANOUT_CONCURRENCY = 16
+    DEFAULT_NODE_TIMEOUT = 300
+
     def __init__(self):
         self.task_service = Registry.get('task_service')
         self.node_service = Registry.get('node_service')
         self.task_manager = Registry.get('task_manager')
         self.macro = "$NODE_ID"
+        self.fanout_concurrency = int(os.getenv('FANOUT_CONCURRENCY', self.DEFAULT_FANOUT_CONCURRENCY))
+        self.node_timeout = float(os.getenv('NODE_TIMEOUT', self.DEFAULT_NODE_TIMEOUT))
+        self.pool = Registry.get('thread_service') or ThreadService(self.fanout_concurrency, name='fanout')
+        self.batcher = CommandBatcher(self.run_batch, submit=self.pool.submit)
+        self.admission = Registry.get('admission_controller') or AdmissionController()
+        self.breakers = Registry.get('circuit_breakers') or CircuitBreakers()
+        self.metrics = Metrics.shared()
+        self.tracer = Tracer.shared()
+        self.node_latency = self.metrics.histogram('node_latency_seconds', 'Time from submitting a node to its result')
+        self.outcomes = {
+            outcome: self.metrics.counter('node_results_total', 'Node results by outcome', outcome=outcome)
+            for outcome in ('ok', 'connection_error', 'timeout', 'circuit_open', 'not_admitted')
+        }
 
     def execute(self, task: Task):
         self.task_service.update_task_status(task.id, TaskStatus.RUNNING)
 
-        def execute_task(self, task: Task, node: Node):
-            ip, username, password = node.get_ssh_login_params()
-            strategy = ExecutionFactory.get_execution_strategy(node.execution_type)
-
-            command = task.task_command
-            if self.macro in command:
-                command = command.replace(self.macro, node.id)
-
-            result = strategy.execute_command(command, ip, username, password)
-            self.task_service.update_task_result(task, node.id, result)
-
         try:
-            for node in task.nodes:
-                if node:
-                    execute_task(self, task=task, node=node)
-            self.task_service.update_task_status(task.id, TaskStatus.COMPLETED)
+            nodes = [node for node in task.nodes if node]
+            with self.tracer.span('TaskExecutor.execute', parent=task.trace, nodes=len(nodes)):
+                failed = self.relay(task, nodes) if task.relay else self.fan_out(task, nodes)
+
+            if not failed:
+                self.task_service.update_task_status(task.id, TaskStatus.COMPLETED)
+            elif len(failed) == len(nodes):
+                self.task_service.update_task_status(task.id, TaskStatus.FAILED)
+            else:
+                self.task_service.update_task_status(task.id, TaskStatus.PARTIALLY_FAILED)
             self.task_manager.notify_task_completion(task.id)
         except Exception as e:
             self.task_service.update_task_status(task.id, TaskStatus.FAILED)
             print(f"Task execution failed: {str(e)}")
+        finally:
+            self.tracer.finish(task.trace)
+
+    def execute_wave(self, task: Task, nodes: List[Node]) -> List[str]:
+        """Runs one staggered wave of a periodic task, which stays RUNNING between waves."""
+        if task.status is not TaskStatus.RUNNING:
+            self.task_service.update_task_status(task.id, TaskStatus.RUNNING)
+        root = self.tracer.start_trace('wave', task_id=task.id, nodes=len(nodes))
+        try:
+            with self.tracer.activate(root):
+                return self.fan_out(task, nodes)
+        except Exception as e:
+            print(f"Periodic wave failed: {str(e)}")
+            return [node.id for node in nodes]
+        finally:
+            self.tracer.finish(root)
+
+    def execute_on_node(self, task: Task, node: Node):
+        ip, username, password = node.get_ssh_login_params()
+        strategy = ExecutionFactory.get_execution_strategy(node.execution_type)
+        output = self.open_output(task, node)
+        return strategy.execute_command(
+            self.render_command(task, node), ip, username, password, port=node.port,
+            local_path=task.local_path, remote_path=task.remote_path, output=output, timeout=self.node_timeout,
+        )
+
+    def submit_on_node(self, task: Task, node: Node, span: Span = None) -> Future:
+        if self.batchable(task, node):
+            return self.batcher.submit(node, self.render_command(task, node), span)
+
+        strategy = ExecutionFactory.get_execution_strategy(node.execution_type)
+        if not hasattr(strategy, 'submit_command') or task.task_command in SSHService.SFTP_COMMANDS:
+            return self.pool.submit(self._run_on_node, task, node, span)
+
+        # Event loop based strategies return their own futures and hold no pool thread
+        ip, username, password = node.get_ssh_login_params()
+        output = self.open_output(task, node)
+        return strategy.submit_command(self.render_command(task, node), ip, username, password, port=node.port, output=output, timeout=self.node_timeout)
+
+    def batchable(self, task: Task, node: Node) -> bool:
+        # Streamed output and file transfers need their own session
+        return (
+            self.batcher.window > 0 and node.execution_type == 'remote'
+            and not task.stream_output and task.task_command not in SSHService.SFTP_COMMANDS
+        )
+
+    def run_batch(self, node: Node, command: str):
+        ip, username, password = node.get_ssh_login_params()
+        strategy = ExecutionFactory.get_execution_strategy(node.execution_type)
+        return strategy.execute_command(command, ip, username, password, port=node.port, timeout=self.node_timeout)
+
+    def open_output(self, task: Task, node: Node) -> Optional[CommandOutput]:
+        if not task.stream_output:
+            return None
+
+        # Publish the live buffers right away so partial output is visible while the command runs
+        output = CommandOutput()
+        self.task_service.update_task_result(task, node.id, (output.stdout, output.stderr))
+        return output
+
+    def render_command(self, task: Task, node: Node) -> str:
+        command = task.task_command
+        if self.macro in command:
+            command = command.replace(self.macro, node.id)
+        return command
+
+    def fan_out(self, task: Task, nodes: List[Node]) -> List[str]:
+        """
+        Runs the task on every node with at most `fanout_concurrency` nodes in
+        flight, admitting each node only while its host and provider are
+        under their adaptive limits. Nodes whose circuit breaker is open fail
+        immediately. Results are stored as each node finishes and nodes
+        without a result `node_timeout` after being submitted, queued or
+        running, are recorded as failed without waiting for them; the
+        strategies abandon the remote command at the same timeout so the
+        worker is freed. Returns the ids of the nodes that failed.
+        """
+        started: Dict[str, float] = {}
+        futures: Dict[Future, Node] = {}
+        spans: Dict[str, Span] = {}
+        waiting = []
+        failed = []
+        pending = set()
+
+        for node in nodes:
+            if self.breakers.allow(node.id):
+                waiting.append(node)
+            else:
+                failed.append(node.id)
+                self.outcomes['circuit_open'].inc()
+                self.task_service.update_task_result(task, node.id, ('', f"Circuit open for node {node.id}"))
+
+        while pending or waiting:
+            if waiting:
+                admitted = self._admit(task, waiting, futures, started, spans)
+                pending.update(admitted)
+                if not pending:
+                    # Every waiting host is saturated by other tasks: block on the first one
+                    node = waiting.pop(0)
+                    if self.admission.acquire(node.ip, node.provider, timeout=self.node_timeout):
+                        future = self._submit(task, node, started, spans)
+                        futures[future] = node
+                        pending.add(future)
+                    else:
+                        self.breakers.get(node.id).release_trial()
+                        failed.append(node.id)
+                        self.outcomes['not_admitted'].inc()
+                        self.task_service.update_task_result(task, node.id, ('', f"Not admitted within {self.node_timeout}s"))
+                    continue
+
+            done, pending = wait(pending, timeout=self._next_timeout(pending, futures, started), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                node = futures[future]
+                try:
+                    result = future.result()
+                    error = f"No result from node {node.id}"
+                except Exception as e:
+                    result = None
+                    error = str(e)
+
+                latency = time.monotonic() - started[node.id]
+                connected = not self.is_connection_error(result)
+                self.admission.release(node.ip, node.provider, success=connected, latency=latency)
+                self.record_breaker(node, connected)
+                self.outcomes['ok' if connected else 'connection_error'].inc()
+                self.node_latency.observe(latency)
+                if self.is_failure(result):
+                    failed.append(node.id)
+                if result is None:
+                    result = ('', error)
+                span = spans.pop(node.id, None)
+                with self.tracer.span('result_write', parent=span):
+                    self.task_service.update_task_result(task, node.id, result)
+                self.tracer.finish(span)
+
+            now = time.monotonic()
+            for future in list(pending):
+                node = futures[future]
+                if now - started[node.id] >= self.node_timeout:
+                    # Queued jobs are dropped here; running ones end at the strategy's own timeout
+                    future.cancel()
+                    pending.discard(future)
+                    self.admission.release(node.ip, node.provider, success=False)
+                    self.record_breaker(node, False)
+                    failed.append(node.id)
+                    self.outcomes['timeout'].inc()
+                    self.task_service.update_task_result(task, node.id, ('', f"Timed out after {self.node_timeout}s"))
+                    span = spans.pop(node.id, None)
+                    if span is not None:
+                        span.set(error='timeout')
+                        self.tracer.finish(span)
+
+        return failed
+
+    def _admit(self, task: Task, waiting: List[Node], futures: Dict[Future, Node], started: Dict[str, float], spans: Dict[str, Span]) -> List[Future]:
+        admitted = []
+        remaining = []
+        saturated = set()
+        for node in waiting:
+            # One refusal from a provider means its other hosts would be refused too
+            if node.provider in saturated or not self.admission.try_acquire(node.ip, node.provider):
+                if node.provider is not None and not self.admission.provider_available(node.provider):
+                    saturated.add(node.provider)
+                remaining.append(node)
+                continue
+            future = self._submit(task, node, started, spans)
+            futures[future] = node
+            admitted.append(future)
+        waiting[:] = remaining
+        return admitted
+
+    def record_breaker(self, node: Node, connected: bool):
+        breaker = self.breakers.get(node.id)
+        if connected:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    def _submit(self, task: Task, node: Node, started: Dict[str, float], spans: Dict[str, Span]) -> Future:
+        span = self.tracer.start_span('node', node=node.id, execution_type=node.execution_type)
+        if span is not None:
+            spans[node.id] = span
+        # The deadline runs from submission, so nodes stuck in the pool's queue time out too
+        started[node.id] = time.monotonic()
+        return self.submit_on_node(task, node, span)
+
+    @staticmethod
+    def is_connection_error(result) -> bool:
+        if result is None:
+            return True
+        return isinstance(result, tuple) and len(result) == 2 and str(result[1]).startswith(SSHService.ERROR_PREFIX)
+
+    @staticmethod
+    def is_failure(result) -> bool:
+        """True for connection errors, commands that could not run and commands that exited non-zero."""
+        if TaskExecutor.is_connection_error(result):
+            return True
+        if isinstance(result, tuple) and len(result) == 2 and str(result[1]).startswith(SSHService.COMMAND_ERROR_PREFIX):
+            return True
+        return getattr(result, 'exit_status', None) not in (None, 0)
+
+    def relay(self, task: Task, nodes: List[Node]) -> List[str]:
+        """
+        Runs the task through the relay tree instead of connecting to every
+        node from here. SFTP commands only distribute the payload. Returns
+        the ids of the nodes that could not be reached or exited non-zero.
+        """
+        relay_service = Registry.get('relay_service') or RelayService()
+        command = None if task.task_command in SSHService.SFTP_COMMANDS else task.task_command
+        results = relay_service.distribute(nodes, command, task.local_path, task.remote_path)
+
+        failed = []
+        for node in nodes:
+            stdout, stderr, exit_status = results.get(str(node.id), ('', f"No result from node {node.id}", None))
+            if exit_status != 0:
+                failed.append(node.id)
+            result = (stdout, stderr) if exit_status is None else NodeOutput(stdout, stderr, exit_status)
+            self.task_service.update_task_result(task, node.id, result)
+        return failed
+
+    def _run_on_node(self, task: Task, node: Node, span: Span = None):
+        with self.tracer.activate(span):
+            return self.execute_on_node(task, node)
+
+    def _next_timeout(self, pending, futures: Dict[Future, Node], started: Dict[str, float]) -> float:
+        now = time.monotonic()
+        deadlines = [
+            started[futures[future].id] + self.node_timeout - now
+            for future in pending
+        ]
+        return max(min(deadlines, default=self.node_timeout), 0)
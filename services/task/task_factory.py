@@ -9,15 +9,13 @@ from importlib import import_module
 class TaskFactory:
     @staticmethod
     def create_task(task_id: uuid.UUID, description: str, command: Dict, node_ids: List[str], **kwargs) -> Task:
-            if not kwargs:
-                return SimpleTask(task_id, description, command, node_ids, **kwargs)
-            elif 'scheduled_time' in kwargs and len(kwargs) == 1:
-                scheduled_time = kwargs['scheduled_time']
+            if 'scheduled_time' in kwargs:
+                scheduled_time = kwargs.pop('scheduled_time')
                 return ScheduledTask(task_id, description, command, node_ids, scheduled_time, **kwargs)
             elif 'interval' in kwargs and 'start_time' in kwargs:
-                interval = kwargs['interval']
-                start_time = kwargs['start_time']
-                end_time = kwargs.get('end_time')
+                interval = kwargs.pop('interval')
+                start_time = kwargs.pop('start_time')
+                end_time = kwargs.pop('end_time', None)
                 return PeriodicTask(task_id, description, command, node_ids, interval, start_time, end_time, **kwargs)
             else:
                 return SimpleTask(task_id, description, command, node_ids, **kwargs)
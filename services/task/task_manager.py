@@ -1,15 +1,20 @@
 import os
 import uuid
 from dotenv import load_dotenv
-from typing import Any, Callable, Dict, List
-from munch import Munch
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
 from services.node.node import Node
+from services.metrics import Metrics
 from services.node_service import NodeService
+from services.notification_queue import NotificationQueue
 from services.task.task import Task
-from services.task.task_status import TaskStatus
+from services.task.task_store import TaskStore
 from services.task_service import TaskService
+from services.tracing import Tracer
 from registry import Registry
 
+if TYPE_CHECKING:
+    from munch import Munch
+
 load_dotenv()
 
 class TaskManager:
@@ -18,19 +23,30 @@ class TaskManager:
 
     def __init__(self, blockchain: str=None):
         self.blockchain = blockchain
-        self.task_service = Registry.get('task_service')
         self.node_service = Registry.get('node_service')
         self.node_service.load_nodes_from_seeds()
         self.bot = Registry.get('quilibrium_bot')
+        self.notifications = Registry.get('notification_queue') or NotificationQueue(bot=self.bot, chat_id=self.CHAT_ID)
+
+    @property
+    def task_service(self) -> TaskService:
+        # Resolved on use: node lookups should not wait for the task store's database
+        return Registry.get('task_service')
 
-    def create_task(self, command: Munch, node_names: List[str], **kwargs) -> Dict[Task, Node]:
-        nodes = self.get_nodes_for_task(node_names=node_names)
-        task = self.task_service.create_task(
-            command=command.command,
-            description=command.description,
-            node_ids=nodes,
-            **kwargs
-        )
+    def create_task(self, command: 'Munch', node_names: List[str], **kwargs) -> Dict[Task, Node]:
+        tracer = Tracer.shared()
+        root = tracer.start_trace('task', command=command.command)
+        with tracer.span('TaskManager.create_task', parent=root):
+            nodes = self.get_nodes_for_task(node_names=node_names)
+            task = self.task_service.create_task(
+                command=command.command,
+                description=command.description,
+                node_ids=nodes,
+                **kwargs
+            )
+        if task.recurring:
+            # Periodic waves are traced one by one; this trace only covers creation
+            tracer.finish(root)
         return task
 
     def get_nodes_for_task(self, node_names: List[str], blockchain: str=None) -> List[Node]:
@@ -48,6 +64,23 @@ class TaskManager:
     def show_scheduled_tasks(self) -> List[str]:
         return self.task_service.get_scheduled_tasks_info()
 
+    def get_admission_limits(self) -> Dict[str, Dict]:
+        admission_controller = Registry.get('admission_controller')
+        return admission_controller.get_limits() if admission_controller else {}
+
+    def get_breaker_states(self) -> Dict[str, str]:
+        circuit_breakers = Registry.get('circuit_breakers')
+        return circuit_breakers.get_states() if circuit_breakers else {}
+
+    def get_metrics_summary(self) -> List[str]:
+        return ["Metrics:"] + Metrics.shared().summary()
+
+    def export_task_traces(self, task_id, chrome: bool = False) -> str:
+        """Sampled traces of a task as JSON, or in Chrome trace-event format for flamegraph viewers."""
+        tracer = Tracer.shared()
+        traces = tracer.find(task_id=task_id)
+        return tracer.export_chrome(traces) if chrome else tracer.export_json(traces)
+
     def get_task_status(self, task_id: uuid.UUID) -> str:
         return self.task_service.get_task_status(task_id)
 
@@ -56,11 +89,19 @@ class TaskManager:
         if task is None:
             raise ValueError(f"Task with ID {task_id} not found")
         
-        if task.status != TaskStatus.COMPLETED:
-            raise ValueError(f"Task with ID {task_id} is not completed. Current status: {task.status.name}")
+        # Failed nodes carry their error as the result, so partial and failed runs are readable too
+        if task.status not in TaskStore.FINISHED_STATUSES:
+            raise ValueError(f"Task with ID {task_id} is not finished. Current status: {task.status.name}")
         
         return task.results
 
+    def get_task_result_stats(self, task_id: uuid.UUID) -> Dict[str, float]:
+        """How much deduplication and compression saved on one task's results."""
+        stats = self.task_service.get_task_result_stats(task_id)
+        if stats is None:
+            raise ValueError(f"Task with ID {task_id} not found")
+        return stats
+
     def register_callback(self, task_id: uuid.UUID, callback: Callable):
         self.callbacks[task_id] = callback
 
@@ -71,6 +112,4 @@ class TaskManager:
             callback(results)
 
     def notify_task_completion(self, task_id):
-        result = self.task_service.get_task_results(task_id)
-        message = f"Task {task_id} completed. Result: {result}"
-        self.bot.send_message(chat_id=self.CHAT_ID, text=message)
\ No newline at end of file
+        self.notifications.notify(task_id)
\ No newline at end of file
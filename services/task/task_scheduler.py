@@ -1,14 +1,17 @@
+import hashlib
 import os
 import logging
-from typing import List
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 from pytz import utc
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.executors.pool import BasePoolExecutor
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.jobstores.memory import MemoryJobStore
 
 from registry import Registry
@@ -18,12 +21,24 @@ from services.task.periodic_task import PeriodicTask
 from services.task.scheduled_task import ScheduledTask
 from services.task.task_executor import TaskExecutor
 from services.task.task import Task
+from services.node.node import Node
+from services.metrics import LatencyHistogram, Metrics
+from services.thread_service import ThreadService
 
 
 load_dotenv()
 
+class ThreadServiceExecutor(BasePoolExecutor):
+    def __init__(self, pool: ThreadService):
+        super().__init__(pool)
+
+
 class TaskScheduler:
     DEFAULT_MAX_THREADS = 3
+    # Periodic tasks run their nodes in waves at least this many seconds apart
+    DEFAULT_PERIODIC_SPACING = 1.0
+    # How far into its slot a wave may be pushed, as a fraction of the slot
+    DEFAULT_PERIODIC_JITTER = 0.5
 
     def __init__(self):
         pid = os.getpid()
@@ -34,9 +49,21 @@ class TaskScheduler:
         self.task_executor = TaskExecutor()
         self.is_running = False
         self.max_threads = int(os.getenv('MAX_THREADS', self.DEFAULT_MAX_THREADS))
+        # Jobs wait on node fan-out, so they get their own pool instead of the executor's one
+        self.pool = ThreadService(self.max_threads, name='scheduler')
+        self.periodic_spacing = float(os.getenv('PERIODIC_SPACING', self.DEFAULT_PERIODIC_SPACING))
+        self.periodic_jitter = float(os.getenv('PERIODIC_JITTER', self.DEFAULT_PERIODIC_JITTER))
+        self.periodic_jobs: Dict[str, List] = {}
+        self.drift = LatencyHistogram()
+        # Scheduling delay is split into APScheduler lag (due -> submitted) and pool wait (submitted -> running)
+        metrics = Metrics.shared()
+        self.lag = metrics.histogram('scheduler_lag_seconds', 'Delay between a job being due and its submission')
+        metrics.register('scheduler_queue_wait_seconds', self.pool.queue_wait, 'Time submitted jobs waited for a scheduler thread')
+        metrics.register('scheduler_job_seconds', self.pool.latency, 'Scheduler job runtime')
+        metrics.register('periodic_drift_seconds', self.drift, 'Delay between a periodic wave being due and starting')
 
         jobstores = {'default': MemoryJobStore()}
-        executors = { 'default': ThreadPoolExecutor(self.max_threads) }
+        executors = { 'default': ThreadServiceExecutor(self.pool) }
         job_defaults = { 'coalesce': False, 'max_instances': self.max_threads }
 
         self.scheduler = BackgroundScheduler(
@@ -45,6 +72,7 @@ class TaskScheduler:
             job_defaults=job_defaults,
             timezone=utc
         )
+        self.scheduler.add_listener(self.record_lag, EVENT_JOB_SUBMITTED)
 
     def start(self):
         self.scheduler.start()
@@ -59,14 +87,16 @@ class TaskScheduler:
             elif isinstance(task, ScheduledTask) and task.scheduled_time and task.status is TaskStatus.PENDING:
                 self.add_scheduled_task(self.run_task, task.scheduled_time, task)
             elif isinstance(task, PeriodicTask) and task.next_execution_time and task.status is TaskStatus.PENDING:
-                self.add_daily_task(self.run_task, task)
+                self.add_periodic_task(task)
 
     def add_immediate_task(self, func, *args, **kwargs):
         return self.scheduler.add_job(
             func,
             trigger=DateTrigger(run_date=datetime.now()),
             args=args,
-            kwargs=kwargs
+            kwargs=kwargs,
+            # One-shot jobs queued behind busy threads must still run, not be dropped as misfired
+            misfire_grace_time=None
         )
 
     def add_scheduled_task(self, func, run_date, *args, **kwargs):
@@ -74,7 +104,8 @@ class TaskScheduler:
             func,
             trigger=DateTrigger(run_date=run_date),
             args=args,
-            kwargs=kwargs
+            kwargs=kwargs,
+            misfire_grace_time=None
         )
 
     def add_recurring_task(self, func, interval, *args, **kwargs):
@@ -85,8 +116,88 @@ class TaskScheduler:
             kwargs=kwargs
         )
 
-    def add_daily_task(self, func):
-        return self.scheduler.add_job(func, 'cron', hour=12, minute=0)
+    def add_daily_task(self, func, *args, hour: int = 12, minute: int = 0, **kwargs):
+        return self.scheduler.add_job(func, 'cron', hour=hour, minute=minute, args=args, kwargs=kwargs)
+
+    def add_periodic_task(self, task: PeriodicTask):
+        """
+        Schedules one interval job per wave of nodes instead of hitting every
+        node at once, so each cycle is a steady flow of work across the
+        whole interval. Jobs stop at the task's end time, after which the
+        task is completed.
+        """
+        interval = task.interval.total_seconds()
+        jobs = []
+        for offset, nodes in self.plan_waves(task, [node for node in task.nodes if node]):
+            jobs.append(self.scheduler.add_job(
+                self.run_wave,
+                trigger=IntervalTrigger(seconds=interval, start_date=task.start_time + timedelta(seconds=offset), end_date=task.end_time),
+                args=(task, nodes, offset),
+            ))
+        if task.end_time:
+            jobs.append(self.add_scheduled_task(self.finish_periodic_task, task.end_time + task.interval, task))
+        self.periodic_jobs[task.id] = jobs
+        return jobs
+
+    def plan_waves(self, task: PeriodicTask, nodes: List[Node]) -> List[Tuple[float, List[Node]]]:
+        """
+        Splits the nodes into equal waves spread evenly over the interval,
+        as (offset in seconds, nodes) pairs. Nodes are ordered by a hash of
+        the task and node ids and each wave is jittered within its slot by a
+        hash of its index, so the plan is the same on every restart.
+        """
+        interval = task.interval.total_seconds()
+        ordered = sorted(nodes, key=lambda node: self._stable_fraction(task.id, node.id))
+        waves = max(1, min(len(ordered), int(interval / self.periodic_spacing)))
+        slot = interval / waves
+        plan = []
+        for index in range(waves):
+            members = ordered[index * len(ordered) // waves:(index + 1) * len(ordered) // waves]
+            offset = (index + self.periodic_jitter * self._stable_fraction(task.id, index)) * slot
+            plan.append((offset, members))
+        return plan
+
+    def run_wave(self, task: PeriodicTask, nodes: List[Node], offset: float):
+        if not task.running:
+            return
+        now = datetime.now()
+        first_run = task.start_time + timedelta(seconds=offset)
+        expected = first_run + ((now - first_run) // task.interval) * task.interval
+        self.drift.observe(max((now - expected).total_seconds(), 0.0))
+        task.last_execution = now
+        try:
+            self.task_executor.execute_wave(task, nodes)
+        finally:
+            db_service = Registry.get('db_service')
+            if db_service:
+                db_service.remove_session()
+
+    def finish_periodic_task(self, task: PeriodicTask):
+        task.stop()
+        self.periodic_jobs.pop(task.id, None)
+        self.task_executor.task_service.update_task_status(task.id, TaskStatus.COMPLETED)
+        self.task_executor.task_manager.notify_task_completion(task.id)
+
+    def cancel_periodic_task(self, task_id):
+        for job in self.periodic_jobs.pop(task_id, []):
+            try:
+                job.remove()
+            except JobLookupError:
+                pass
+
+    def record_lag(self, event):
+        now = datetime.now(utc)
+        for run_time in event.scheduled_run_times:
+            self.lag.observe(max((now - run_time).total_seconds(), 0.0))
+
+    def get_drift_metrics(self) -> Dict[str, float]:
+        """Delay between when periodic waves were due and when they started."""
+        return self.drift.snapshot()
+
+    @staticmethod
+    def _stable_fraction(*key) -> float:
+        digest = hashlib.sha256(':'.join(str(part) for part in key).encode()).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64
 
     def remove_task(self, job_id):
         self.scheduler.remove_job(job_id)
@@ -94,5 +205,13 @@ class TaskScheduler:
     def get_tasks(self):
         return self.scheduler.get_jobs()
 
+    def get_pool_metrics(self):
+        return [self.pool.get_metrics(), self.task_executor.pool.get_metrics()]
+
     def run_task(self, task: Task):
-        self.task_executor.execute(task)
+        try:
+            self.task_executor.execute(task)
+        finally:
+            db_service = Registry.get('db_service')
+            if db_service:
+                db_service.remove_session()
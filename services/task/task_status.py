@@ -5,4 +5,5 @@ class TaskStatus(Enum):
     RUNNING = 2
     COMPLETED = 3
     FAILED = 4
-    STOPPED = 5
\ No newline at end of file
+    STOPPED = 5
+    PARTIALLY_FAILED = 6
\ No newline at end of file
@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import os
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from services.task.task import Task
+from services.task.task_status import TaskStatus
+
+
+class TaskBucket:
+    """Tasks kept in creation order by sequence number, for O(1) counts and O(log n) cursor seeks."""
+
+    def __init__(self):
+        self.sequences: List[int] = []
+        self.tasks: Dict[int, Task] = {}
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def add(self, sequence: int, task: Task):
+        if not self.sequences or sequence > self.sequences[-1]:
+            self.sequences.append(sequence)
+        else:
+            insort(self.sequences, sequence)
+        self.tasks[sequence] = task
+
+    def remove(self, sequence: int):
+        if self.tasks.pop(sequence, None) is not None:
+            del self.sequences[bisect_left(self.sequences, sequence)]
+
+    def after(self, cursor: int) -> Iterator[Tuple[int, Task]]:
+        for index in range(bisect_right(self.sequences, cursor), len(self.sequences)):
+            sequence = self.sequences[index]
+            yield sequence, self.tasks[sequence]
+
+
+class TaskStore:
+    """
+    In-memory task store. Active tasks live in `tasks` until they finish;
+    at most `retention` finished tasks are kept afterwards, oldest evicted
+    first, so memory stays bounded. Tasks are also bucketed by status and by
+    type, kept in sync on every status change, so listings and counts never
+    scan the whole store. Persistent stores extend it and only evict what
+    they have written.
+    """
+    FINISHED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.PARTIALLY_FAILED, TaskStatus.STOPPED)
+    DEFAULT_RETENTION = 1000
+
+    def __init__(self, retention: int = None):
+        self.retention = int(retention if retention is not None else os.getenv('TASK_HOT_RETENTION', self.DEFAULT_RETENTION))
+        self.tasks: Dict[uuid.UUID, Task] = {}
+        self.sequences: Dict[uuid.UUID, int] = {}
+        self.by_status: Dict[TaskStatus, TaskBucket] = {status: TaskBucket() for status in TaskStatus}
+        self.by_type: Dict[str, TaskBucket] = {}
+        self.finished: OrderedDict[uuid.UUID, None] = OrderedDict()
+        self.counter = itertools.count(1)
+        self.lock = threading.RLock()
+
+    def add(self, task: Task):
+        with self.lock:
+            if task.id in self.tasks:
+                self._unindex(task)
+            sequence = next(self.counter)
+            self.tasks[task.id] = task
+            self.sequences[task.id] = sequence
+            self.by_status[task.status].add(sequence, task)
+            self.by_type.setdefault(task.type_name, TaskBucket()).add(sequence, task)
+
+    def get(self, task_id: uuid.UUID) -> Optional[Task]:
+        return self.tasks.get(task_id)
+
+    def values(self) -> List[Task]:
+        with self.lock:
+            return list(self.tasks.values())
+
+    def set_status(self, task_id: uuid.UUID, status: TaskStatus) -> Optional[Task]:
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            sequence = self.sequences[task_id]
+            self.by_status[task.status].remove(sequence)
+            task.status = status
+            self.by_status[status].add(sequence, task)
+            return task
+
+    def count(self, status: TaskStatus = None, task_type: str = None) -> int:
+        if status is None and task_type is None:
+            return len(self.tasks)
+        if task_type is None:
+            return len(self.by_status[status])
+        if status is None:
+            return len(self.by_type.get(task_type, ()))
+        bucket = self.by_type.get(task_type, TaskBucket())
+        return sum(1 for _, task in bucket.after(0) if task.status is status)
+
+    def page(self, statuses: Iterable[TaskStatus] = None, task_types: Iterable[str] = None, cursor: int = 0, limit: int = 20) -> Tuple[List[Task], Optional[int]]:
+        """
+        Up to `limit` tasks created after `cursor`, oldest first, from the
+        union of the given status or type buckets. Returns the page and the
+        cursor of the next one, or None on the last page.
+        """
+        with self.lock:
+            if task_types is not None:
+                buckets = [self.by_type[task_type] for task_type in task_types if task_type in self.by_type]
+            elif statuses is not None:
+                buckets = [self.by_status[status] for status in statuses]
+            else:
+                buckets = list(self.by_type.values())
+
+            entries = list(itertools.islice(self._iterate(buckets, cursor or 0), limit + 1))
+        tasks = [task for _, task in entries[:limit]]
+        next_cursor = entries[limit - 1][0] if len(entries) > limit else None
+        return tasks, next_cursor
+
+    def finish(self, task: Task):
+        """Called when a task reaches a finished status."""
+        self.release(task)
+
+    def release(self, task: Task):
+        if task.recurring:
+            return
+        with self.lock:
+            if task.id not in self.tasks:
+                return
+            self.finished[task.id] = None
+            self.finished.move_to_end(task.id)
+            while len(self.finished) > self.retention:
+                task_id, _ = self.finished.popitem(last=False)
+                evicted = self.tasks.get(task_id)
+                if evicted is not None:
+                    self._unindex(evicted)
+                    evicted.release_results()
+
+    def query(self, status: TaskStatus = None, task_type: str = None, node_id: str = None, since: datetime = None, limit: int = 100) -> List[Task]:
+        everything = max(len(self.tasks), 1)
+        if status is not None:
+            candidates = self.page(statuses=[status], limit=everything)[0]
+        elif task_type is not None:
+            candidates = self.page(task_types=[task_type], limit=everything)[0]
+        else:
+            candidates = self.values()
+        tasks = [
+            task for task in candidates
+            if (status is None or task.status is status)
+            and (task_type is None or task.type_name == task_type)
+            and (node_id is None or node_id in task.results)
+            and (since is None or task.created_at >= since)
+        ]
+        tasks.sort(key=lambda task: task.created_at, reverse=True)
+        return tasks[:limit]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _iterate(buckets: List[TaskBucket], cursor: int) -> Iterator[Tuple[int, Task]]:
+        return heapq.merge(*(bucket.after(cursor) for bucket in buckets), key=lambda entry: entry[0])
+
+    def _unindex(self, task: Task):
+        sequence = self.sequences.pop(task.id)
+        self.tasks.pop(task.id, None)
+        self.by_status[task.status].remove(sequence)
+        self.by_type[task.type_name].remove(sequence)
@@ -0,0 +1,129 @@
+import time
+import pytest
+from services.node.node import Node
+from services.ssh_service import SSHService
+from services.task.simple_task import SimpleTask
+from services.task.task_executor import TaskExecutor
+from services.task.task_status import TaskStatus
+from services.thread_service import ThreadService
+from testing.fake_ssh_server import FakeSSHServer
+
+
+class FakeTaskService:
+    def __init__(self):
+        self.statuses = []
+        self.results = []
+
+    def update_task_status(self, task_id, status):
+        self.statuses.append(status)
+
+    def update_task_result(self, task, node_id, result):
+        self.results.append(node_id)
+        task.add_result(node_id, result)
+
+
+class FakeTaskManager:
+    def notify_task_completion(self, task_id):
+        pass
+
+
+def make_node(name):
+    return Node(name, name, f"10.0.0.{len(name)}", "root", "password", "slave", "Ubuntu", "owner")
+
+@pytest.fixture(scope="function")
+def executor():
+    executor = TaskExecutor()
+    executor.task_service = FakeTaskService()
+    executor.task_manager = FakeTaskManager()
+    executor.node_timeout = 0.5
+    executor.batcher.window = 0
+    yield executor
+    executor.pool.shutdown(wait=False)
+
+def test_fan_out_runs_nodes_concurrently(executor: TaskExecutor, monkeypatch):
+    monkeypatch.setattr(executor, 'execute_on_node', lambda task, node: time.sleep(0.2) or (node.id, ''))
+    nodes = [make_node(f"node-{i}") for i in range(8)]
+    task = SimpleTask("task", "uptime", "uptime", nodes)
+
+    start = time.monotonic()
+    executor.execute(task)
+    assert time.monotonic() - start < 1
+    assert executor.task_service.statuses[-1] is TaskStatus.COMPLETED
+    assert task.results["node-3"] == ("node-3", '')
+
+def test_slow_and_failing_nodes_are_partial_failures(executor: TaskExecutor, monkeypatch):
+    def execute_on_node(task, node):
+        if node.id == "slow":
+            time.sleep(2)
+        if node.id == "broken":
+            raise ConnectionError("unreachable")
+        return "ok", ''
+
+    monkeypatch.setattr(executor, 'execute_on_node', execute_on_node)
+    task = SimpleTask("task", "uptime", "uptime", [make_node("slow"), make_node("broken"), make_node("fine")])
+
+    executor.execute(task)
+    assert executor.task_service.statuses[-1] is TaskStatus.PARTIALLY_FAILED
+    assert executor.task_service.results[-1] == "slow"
+    assert task.results["broken"] == ('', "unreachable")
+    assert task.results["slow"][1].startswith("Timed out")
+
+def test_fan_out_transfers_files_to_every_node(executor: TaskExecutor, tmp_path):
+    payload = tmp_path / "payload.txt"
+    payload.write_text("payload")
+    with FakeSSHServer(sftp=True) as server:
+        nodes = [
+            Node(f"node-{i}", f"node-{i}", server.host, "root", "password", "slave", "Ubuntu", "owner", port=server.port)
+            for i in range(3)
+        ]
+        task = SimpleTask("task", "put", "put", nodes, remote_path=str(tmp_path / "remote.txt"), local_path=str(payload))
+        executor.node_timeout = 10
+        executor.execute(task)
+
+    assert executor.task_service.statuses[-1] is TaskStatus.COMPLETED
+    assert (tmp_path / "remote.txt").read_text() == "payload"
+    assert not any(TaskExecutor.is_connection_error(result) for result in task.results.values())
+
+def test_non_zero_exit_fails_the_node_without_tripping_its_breaker(executor: TaskExecutor):
+    with FakeSSHServer(handler=lambda command: ('', "boom\n", 2)) as server:
+        node = Node("node", "node", server.host, "root", "password", "slave", "Ubuntu", "owner", port=server.port)
+        task = SimpleTask("task", "false", "false", [node])
+        executor.node_timeout = 10
+        executor.execute(task)
+
+    assert executor.task_service.statuses[-1] is TaskStatus.FAILED
+    assert task.results["node"].exit_status == 2
+    assert executor.breakers.get("node").failures == 0
+
+def test_transfer_errors_are_not_connection_errors(executor: TaskExecutor, tmp_path):
+    with FakeSSHServer(sftp=True) as server:
+        node = Node("node", "node", server.host, "root", "password", "slave", "Ubuntu", "owner", port=server.port)
+        task = SimpleTask("task", "put", "put", [node], remote_path=str(tmp_path / "remote.txt"), local_path=str(tmp_path / "missing.txt"))
+        executor.node_timeout = 10
+        executor.execute(task)
+
+    assert executor.task_service.statuses[-1] is TaskStatus.FAILED
+    assert task.results["node"][1].startswith(SSHService.COMMAND_ERROR_PREFIX)
+    assert not TaskExecutor.is_connection_error(task.results["node"])
+    assert executor.breakers.get("node").failures == 0
+
+def test_queued_nodes_time_out_from_submission(executor: TaskExecutor, monkeypatch):
+    executor.pool.shutdown(wait=False)
+    executor.pool = ThreadService(1, name='fanout')
+    monkeypatch.setattr(executor, 'execute_on_node', lambda task, node: time.sleep(0.2) or ("ok", ''))
+    task = SimpleTask("task", "uptime", "uptime", [make_node("first"), make_node("second"), make_node("third")])
+
+    # The third node only starts 0.4s after submission and cannot finish within the 0.5s timeout
+    executor.execute(task)
+    assert task.results["first"] == ("ok", '')
+    assert task.results["third"][1].startswith("Timed out")
+
+def test_hung_commands_free_their_worker(executor: TaskExecutor):
+    with FakeSSHServer(latency=5) as server:
+        service = SSHService(server.host, "root", "password", port=server.port)
+        start = time.monotonic()
+        result = service.execute_command("hang", timeout=0.3)
+
+    assert time.monotonic() - start < 3
+    assert TaskExecutor.is_connection_error(result)
+    assert service.ssh_client is None
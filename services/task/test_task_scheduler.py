@@ -0,0 +1,97 @@
+import time
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from services.node.node import Node
+from services.task.periodic_task import PeriodicTask
+from services.task.scheduled_task import ScheduledTask
+from services.task.task_factory import TaskFactory
+from services.task.task_scheduler import TaskScheduler
+from services.task.task_status import TaskStatus
+from services.task.test_task_executor import FakeTaskManager, FakeTaskService
+
+
+def make_nodes(count):
+    return [Node(f"node-{i}", f"node-{i}", f"10.0.{i // 250}.{i % 250}", "root", "password", "slave", "Ubuntu", "owner") for i in range(count)]
+
+@pytest.fixture(scope="function")
+def scheduler():
+    scheduler = TaskScheduler()
+    scheduler.task_executor.task_service = FakeTaskService()
+    scheduler.task_executor.task_manager = FakeTaskManager()
+    yield scheduler
+    if scheduler.scheduler.running:
+        scheduler.scheduler.shutdown(wait=False)
+    scheduler.pool.shutdown(wait=False)
+    scheduler.task_executor.pool.shutdown(wait=False)
+
+def test_waves_spread_a_large_fleet_evenly(scheduler: TaskScheduler):
+    task = PeriodicTask(uuid.uuid4(), "check", "uptime", [], timedelta(minutes=5), datetime.now())
+    nodes = make_nodes(2000)
+
+    plan = scheduler.plan_waves(task, nodes)
+
+    assert len(plan) == 300
+    assert {len(members) for _, members in plan} == {6, 7}
+    assert sorted(node.id for _, members in plan for node in members) == sorted(node.id for node in nodes)
+    slot = 300 / len(plan)
+    for index, (offset, _) in enumerate(plan):
+        assert index * slot <= offset < (index + scheduler.periodic_jitter) * slot
+    offsets = [offset for offset, _ in plan]
+    assert len(set(round(offset, 6) for offset in offsets)) == len(offsets)
+
+def test_wave_plan_is_deterministic(scheduler: TaskScheduler):
+    task = PeriodicTask("task", "check", "uptime", [], timedelta(minutes=5), datetime.now())
+    nodes = make_nodes(50)
+
+    first = [(offset, [node.id for node in members]) for offset, members in scheduler.plan_waves(task, nodes)]
+    second = [(offset, [node.id for node in members]) for offset, members in TaskScheduler().plan_waves(task, list(reversed(nodes)))]
+
+    assert first == second
+    assert len(first) == 50
+
+def test_periodic_task_runs_staggered_until_end_time(scheduler: TaskScheduler, monkeypatch):
+    runs = []
+    monkeypatch.setattr(scheduler.task_executor, 'execute_wave', lambda task, nodes: runs.append((time.monotonic(), [node.id for node in nodes])))
+    scheduler.periodic_spacing = 0.2
+    start = datetime.now() + timedelta(seconds=0.2)
+    task = PeriodicTask("task", "check", "uptime", make_nodes(4), timedelta(seconds=1), start, start + timedelta(seconds=1.95))
+
+    scheduler.start()
+    scheduler.add_task([task])
+    time.sleep(3.5)
+
+    assert sorted(node for _, nodes in runs for node in nodes) == sorted([f"node-{i}" for i in range(4)] * 2)
+    assert len({round(at, 1) for at, _ in runs[:4]}) == 4
+    assert not task.running and task.next_execution_time is None
+    assert scheduler.task_executor.task_service.statuses[-1] is TaskStatus.COMPLETED
+    assert scheduler.get_drift_metrics()['count'] == 8
+    assert scheduler.get_drift_metrics()['p99'] < 1
+
+def test_cancelled_periodic_task_stops_running(scheduler: TaskScheduler, monkeypatch):
+    runs = []
+    monkeypatch.setattr(scheduler.task_executor, 'execute_wave', lambda task, nodes: runs.append(nodes))
+    scheduler.periodic_spacing = 0.1
+    task = PeriodicTask("task", "check", "uptime", make_nodes(2), timedelta(seconds=0.5), datetime.now() + timedelta(seconds=5))
+
+    scheduler.start()
+    scheduler.add_task([task])
+    assert len(scheduler.get_tasks()) == 2
+    scheduler.cancel_periodic_task(task.id)
+
+    assert scheduler.get_tasks() == []
+    assert runs == []
+
+def test_factory_builds_scheduled_and_periodic_tasks():
+    scheduled = TaskFactory.create_task("a", "later", "uptime", [], scheduled_time=datetime(2030, 1, 1))
+    periodic = TaskFactory.create_task("b", "every", "uptime", [], interval=60, start_time=datetime(2030, 1, 1), end_time=datetime(2030, 1, 2), stream_output=True)
+
+    assert isinstance(scheduled, ScheduledTask) and scheduled.scheduled_time == datetime(2030, 1, 1)
+    assert isinstance(periodic, PeriodicTask) and periodic.interval == timedelta(seconds=60)
+    assert periodic.stream_output and periodic.next_execution_time == datetime(2030, 1, 1)
+
+def test_daily_task_takes_arguments(scheduler: TaskScheduler):
+    job = scheduler.add_daily_task(print, "report", hour=6, minute=30)
+
+    assert job.args == ("report",)
+    assert str(job.trigger.fields[5]) == "6"
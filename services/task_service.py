@@ -1,83 +1,124 @@
+import os
 import uuid
-from threading import Lock
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from registry import Registry
 from services.task.task_factory import TaskFactory
 from services.task.task_status import TaskStatus
 from services.task.task import Task
+from services.task.task_store import TaskStore
 from services.task.simple_task import SimpleTask
 from services.task.scheduled_task import ScheduledTask
 from services.task.periodic_task import PeriodicTask
+from services.tracing import Tracer
 
 
 class TaskService:
-    def __init__(self):
-        self.tasks: Dict[uuid.UUID, SimpleTask]= {}
+    DEFAULT_PAGE_SIZE = 20
+
+    def __init__(self, store: TaskStore = None):
+        self.store = store or Registry.get('task_store') or TaskStore()
+        # Hot tier only: finished tasks past the store's retention live in the database
+        self.tasks: Dict[uuid.UUID, SimpleTask] = self.store.tasks
+        self.page_size = int(os.getenv('TASK_PAGE_SIZE', self.DEFAULT_PAGE_SIZE))
         self.task_factory = TaskFactory()
-        self.task_scheduler = Registry.get('task_scheduler')
-        self.lock = Lock()
 
     def create_task(self, description: str, command: str, node_ids: List[str], **kwargs) -> Task:
-        task_id = uuid.uuid4()
-        task = self.task_factory.create_task(task_id, description, command, node_ids, **kwargs)
-        task_scheduler = Registry.get('task_scheduler')
-        task_scheduler.add_task([task])
-        with self.lock:
-            self.tasks[task_id] = task
+        tracer = Tracer.shared()
+        with tracer.span('TaskService.create_task') as span:
+            task_id = uuid.uuid4()
+            task = self.task_factory.create_task(task_id, description, command, node_ids, **kwargs)
+            if span is not None:
+                task.trace = span.trace.root
+                task.trace.set(task_id=task_id, nodes=len(node_ids))
+            self.store.add(task)
+            task_scheduler = Registry.get('task_scheduler')
+            with tracer.span('TaskScheduler.add_task'):
+                task_scheduler.add_task([task])
         return task
 
     def get_task(self, task_id: uuid.UUID):
-        return self.tasks.get(task_id)
+        return self.store.get(task_id)
 
     def get_task_status(self, task_id: uuid.UUID):
-        return self.tasks.get(task_id).status
+        return self.get_task(task_id).status
 
     def get_task_results(self, task_id: uuid.UUID):
-        return self.tasks.get(task_id).results
+        return self.get_task(task_id).results
+
+    def get_task_result_stats(self, task_id: uuid.UUID) -> Optional[Dict[str, float]]:
+        task = self.get_task(task_id)
+        return task.result_stats() if task else None
+
+    def find_tasks(self, status: TaskStatus = None, task_type: str = None, node_id: str = None, since: datetime = None, limit: int = 100) -> List[Task]:
+        return self.store.query(status, task_type, node_id, since, limit)
 
     def list_tasks(self):
-        for task_id, task in self.tasks.items():
-            print(f"Task ID: {task_id}, Description: {task.description}, Status: {task.status}")
+        for task in self.store.values():
+            print(f"Task ID: {task.id}, Description: {task.description}, Status: {task.status}")
 
     def get_simple_tasks(self) -> List[SimpleTask]:
-        return [task for task in self.tasks.values() if isinstance(task, SimpleTask)]
+        return self._all(task_types=[SimpleTask.__name__])
 
     def get_scheduled_tasks(self) -> List[ScheduledTask]:
-        return [task for task in self.tasks.values() if isinstance(task, ScheduledTask)]
+        return self._all(task_types=[ScheduledTask.__name__])
 
     def get_periodic_tasks(self) -> List[PeriodicTask]:
-        return [task for task in self.tasks.values() if isinstance(task, PeriodicTask)]
+        return self._all(task_types=[PeriodicTask.__name__])
 
     def get_pending_tasks(self) -> List[Task]:
-        return [task for task in self.tasks.values() if task.status is TaskStatus.PENDING]
+        return self._all(statuses=[TaskStatus.PENDING])
 
     def get_completed_tasks(self) -> List[Task]:
-        return [task for task in self.tasks.values() if task.status is TaskStatus.COMPLETED]
+        return self._all(statuses=[TaskStatus.COMPLETED])
+
+    def count_tasks(self, status: TaskStatus = None, task_type: str = None) -> int:
+        return self.store.count(status, task_type)
+
+    def page_tasks(self, statuses: List[TaskStatus] = None, task_types: List[str] = None, cursor: int = None, page_size: int = None) -> Tuple[List[Task], Optional[int]]:
+        return self.store.page(statuses, task_types, cursor or 0, page_size or self.page_size)
 
     def stop_task(self, task_id: str):
-        task = self.tasks.get(task_id)
+        task = self.store.get(task_id)
         if task:
-            task.stop()
+            # Only periodic tasks have a run loop to stop
+            if task.recurring:
+                task.stop()
+            task_scheduler = Registry.get('task_scheduler')
+            if task_scheduler:
+                task_scheduler.cancel_periodic_task(task_id)
+            self.update_task_status(task_id, TaskStatus.STOPPED)
 
     def update_task_status(self, task_id: uuid.UUID, status: TaskStatus):
-        with self.lock:
-            task = self.tasks.get(task_id)
-            if task:
-                task.status = status
+        task = self.store.set_status(task_id, status)
+        if task and status in TaskStore.FINISHED_STATUSES:
+            task.finished_at = datetime.now()
+            self.store.finish(task)
 
     def update_task_result(self, task: Task, node_id: str, result: str):
         if task:
             task.add_result(node_id, result)
 
-    def get_pending_tasks_info(self) -> List[str]:
-        pending_tasks = self.get_pending_tasks()
-        return self._format_tasks(pending_tasks, "Pending Tasks")
-
-    def get_scheduled_tasks_info(self) -> List[str]:
-        scheduled_tasks = self.get_scheduled_tasks()
-        periodic_tasks = self.get_periodic_tasks()
-        all_scheduled = scheduled_tasks + periodic_tasks
-        return self._format_tasks(all_scheduled, "Scheduled Tasks")
+    def get_pending_tasks_info(self, cursor: int = None, page_size: int = None) -> List[str]:
+        return self._format_page("Pending Tasks", cursor, page_size, statuses=[TaskStatus.PENDING])
+
+    def get_scheduled_tasks_info(self, cursor: int = None, page_size: int = None) -> List[str]:
+        return self._format_page("Scheduled Tasks", cursor, page_size, task_types=[ScheduledTask.__name__, PeriodicTask.__name__])
+
+    def _all(self, statuses: List[TaskStatus] = None, task_types: List[str] = None) -> List[Task]:
+        return self.store.page(statuses, task_types, 0, max(len(self.store.tasks), 1))[0]
+
+    def _format_page(self, title: str, cursor: int, page_size: int, statuses: List[TaskStatus] = None, task_types: List[str] = None) -> List[str]:
+        # Only the requested page is rendered, however many tasks there are
+        tasks, next_cursor = self.page_tasks(statuses, task_types, cursor, page_size)
+        if task_types is not None:
+            total = sum(self.store.count(task_type=task_type) for task_type in task_types)
+        else:
+            total = sum(self.store.count(status=status) for status in statuses)
+        result = self._format_tasks(tasks, f"{title} ({total})")
+        if next_cursor is not None:
+            result.append(f"Next page cursor: {next_cursor}")
+        return result
 
     def _format_tasks(self, tasks: List[Task], title: str) -> List[str]:
         result = [f"{title}:"]
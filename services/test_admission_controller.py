@@ -0,0 +1,91 @@
+import threading
+import time
+import pytest
+from services.admission_controller import AdmissionController
+from services.node.node import Node
+from services.task.simple_task import SimpleTask
+from services.task.task_executor import TaskExecutor
+from services.task.test_task_executor import FakeTaskManager, FakeTaskService
+
+
+@pytest.fixture(scope="function")
+def admission(monkeypatch):
+    monkeypatch.setenv('ADMISSION_HOST_LIMIT', '4')
+    monkeypatch.setenv('ADMISSION_PROVIDER_LIMIT', '2')
+    monkeypatch.setenv('ADMISSION_COOLDOWN', '0')
+    return AdmissionController()
+
+def host_limit(admission: AdmissionController, host: str) -> float:
+    return admission.get_limits()['hosts'][host]['limit']
+
+def test_limit_grows_additively_per_window(admission: AdmissionController):
+    for _ in range(4):
+        assert admission.try_acquire("10.0.0.1")
+        admission.release("10.0.0.1", latency=0.1)
+
+    assert host_limit(admission, "10.0.0.1") == pytest.approx(4.9, abs=0.05)
+
+def test_connection_errors_back_off_multiplicatively(admission: AdmissionController):
+    admission.try_acquire("10.0.0.1")
+    admission.release("10.0.0.1", success=False)
+    assert host_limit(admission, "10.0.0.1") == 2
+    for _ in range(3):
+        admission.try_acquire("10.0.0.1")
+        admission.release("10.0.0.1", success=False)
+    assert host_limit(admission, "10.0.0.1") == 1
+
+def test_backoff_happens_once_per_cooldown(admission: AdmissionController):
+    admission.cooldown = 60
+    for _ in range(3):
+        admission.try_acquire("10.0.0.1")
+    for _ in range(3):
+        admission.release("10.0.0.1", success=False)
+
+    assert host_limit(admission, "10.0.0.1") == 2
+
+def test_latency_spike_backs_off(admission: AdmissionController):
+    for latency in (0.1, 0.1, 0.1, 1.0):
+        admission.try_acquire("10.0.0.1")
+        admission.release("10.0.0.1", latency=latency)
+
+    assert host_limit(admission, "10.0.0.1") < 4
+
+def test_provider_limit_is_shared_across_hosts(admission: AdmissionController):
+    assert admission.try_acquire("10.0.0.1", "nat")
+    assert admission.try_acquire("10.0.0.2", "nat")
+    assert not admission.try_acquire("10.0.0.3", "nat")
+    assert admission.try_acquire("10.0.0.3", "other")
+
+    released = threading.Timer(0.1, admission.release, args=("10.0.0.1", "nat"))
+    released.start()
+    assert admission.acquire("10.0.0.3", "nat", timeout=2)
+    assert admission.get_limits()['providers']['nat']['in_flight'] == 2
+
+def test_executor_respects_provider_limits(admission: AdmissionController, monkeypatch):
+    executor = TaskExecutor()
+    executor.task_service = FakeTaskService()
+    executor.task_manager = FakeTaskManager()
+    executor.batcher.window = 0
+    executor.admission = admission
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def execute_on_node(task, node):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return None if node.id == "node-5" else ("ok", '')
+
+    monkeypatch.setattr(executor, 'execute_on_node', execute_on_node)
+    nodes = [Node(f"node-{i}", f"node-{i}", f"10.0.0.{i}", "root", "password", "slave", "Ubuntu", "owner", provider="nat") for i in range(6)]
+    task = SimpleTask("task", "uptime", "uptime", nodes)
+
+    executor.execute(task)
+    executor.pool.shutdown(wait=False)
+
+    assert peak[0] == 2
+    assert len(task.results) == 6
+    assert host_limit(admission, "10.0.0.5") == 2
+    assert admission.get_limits()['providers']['nat']['in_flight'] == 0
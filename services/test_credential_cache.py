@@ -0,0 +1,63 @@
+import pytest
+import time
+from services.credential_cache import CredentialCache
+from services import crypto
+from services.crypto import CachedAesEngine, Crypto, clear_derived_keys
+
+
+def test_get_returns_cached_secret():
+    cache = CredentialCache(max_entries=2, ttl=60)
+    cache.put(1, "secret")
+    assert cache.get(1) == "secret"
+    assert cache.get(2) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_evicted_secrets_are_zeroized():
+    cache = CredentialCache(max_entries=2, ttl=60)
+    cache.put(1, "one")
+    held = cache.entries[1][0]
+    cache.put(2, "two")
+    cache.get(1)
+    cache.put(3, "three")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    invalidated = cache.entries[1][0]
+    cache.invalidate(1)
+    assert invalidated == bytearray(3)
+    assert held is invalidated
+
+def test_expired_secrets_are_dropped():
+    cache = CredentialCache(ttl=0.01)
+    cache.put(1, "secret")
+    held = cache.entries[1][0]
+    time.sleep(0.02)
+    assert cache.get(1) is None
+    assert len(cache) == 0
+    assert held == bytearray(6)
+
+def test_key_derivation_runs_once_per_password_and_salt():
+    clear_derived_keys()
+    key = Crypto.generate_key("password", b"salt")
+    assert Crypto.generate_key("password", b"salt") == key
+    assert Crypto.generate_key("other", b"salt") != key
+    assert len(crypto._derived_keys) == 2
+    # Entries are keyed by a digest, never by the password itself
+    assert all("password" not in repr(cache_key) for cache_key in crypto._derived_keys)
+    assert Crypto().decrypt_data(Crypto().encrypt_data("data", key), key) == "data"
+
+def test_cached_aes_engine_round_trip():
+    engine = CachedAesEngine()
+    engine._set_padding_mechanism('pkcs5')
+    engine._update_key("column key")
+    cipher = engine.cipher
+    encrypted = engine.encrypt("password")
+    engine._update_key("column key")
+    assert engine.cipher is cipher
+    assert engine.decrypt(encrypted) == "password"
+
+def test_missing_key_is_reported():
+    engine = CachedAesEngine()
+    engine._set_padding_mechanism('pkcs5')
+    with pytest.raises(ValueError, match="SALT"):
+        engine._update_key(None)
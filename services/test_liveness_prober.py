@@ -0,0 +1,150 @@
+import socket
+import threading
+import time
+import pytest
+from services.circuit_breaker import BreakerState, CircuitBreaker, CircuitBreakers
+from services.liveness_prober import LivenessProber
+from services.node.node import Node
+from services.node_service import NodeService
+from services.task.simple_task import SimpleTask
+from services.task.task_executor import TaskExecutor
+from services.task.test_task_executor import FakeTaskManager, FakeTaskService
+
+
+@pytest.fixture(scope="function")
+def listener():
+    """Local TCP server; `banner` decides what it sends on accept."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    state = {'banner': b"SSH-2.0-OpenSSH_9.6\r\n"}
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            if state['banner']:
+                conn.sendall(state['banner'])
+            conn.close()
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield server.getsockname()[1], state
+    server.close()
+
+def closed_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def make_node(name: str, port: int) -> Node:
+    return Node(name, name, "127.0.0.1", "root", "password", "slave", "Ubuntu", "owner", port=port)
+
+def test_breaker_opens_and_recovers_through_half_open():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.state is BreakerState.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state is BreakerState.OPEN
+
+    breaker.half_open()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state is BreakerState.CLOSED
+
+def test_probe_updates_active_nodes_and_breakers(listener):
+    port, _ = listener
+    node_service = NodeService()
+    alive, dead = make_node("alive", port), make_node("dead", closed_port())
+    node_service.add_node(alive)
+    node_service.add_node(dead)
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    prober = LivenessProber(node_service, breakers, timeout=1)
+
+    assert prober.probe_all() == {"alive": True, "dead": False}
+    assert [node.id for node in node_service.get_active_nodes()] == ["alive"]
+    assert breakers.get_states() == {"alive": "closed", "dead": "open"}
+
+def test_probe_requires_ssh_banner(listener):
+    port, state = listener
+    state['banner'] = b"HTTP/1.1 400 Bad Request\r\n"
+    node_service = NodeService()
+    node_service.add_node(make_node("web", port))
+
+    assert LivenessProber(node_service, timeout=1).probe_all() == {"web": False}
+    assert LivenessProber(node_service, timeout=1, banner=False).probe_all() == {"web": True}
+
+def test_successful_probe_half_opens_breaker(listener):
+    port, _ = listener
+    node_service = NodeService()
+    node_service.add_node(make_node("flaky", port))
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    breakers.get("flaky").record_failure()
+
+    LivenessProber(node_service, breakers, timeout=1).probe_all()
+
+    assert breakers.get("flaky").state is BreakerState.HALF_OPEN
+
+def test_successful_probe_clears_failures_of_a_closed_breaker(listener):
+    port, _ = listener
+    node_service = NodeService()
+    node_service.add_node(make_node("flaky", port))
+    breakers = CircuitBreakers(failure_threshold=2, reset_timeout=60)
+    breakers.get("flaky").record_failure()
+
+    LivenessProber(node_service, breakers, timeout=1).probe_all()
+    breakers.get("flaky").record_failure()
+
+    assert breakers.get("flaky").state is BreakerState.CLOSED
+
+def test_active_nodes_can_be_listed_while_probes_update_them():
+    node_service = NodeService()
+    for i in range(200):
+        node_service.add_node(make_node(f"node-{i}", 22))
+    stop = threading.Event()
+
+    def toggle():
+        while not stop.is_set():
+            for i in range(200):
+                node_service.activate_node(f"node-{i}")
+                node_service.deactivate_node(f"node-{(i * 7) % 200}")
+
+    thread = threading.Thread(target=toggle)
+    thread.start()
+    try:
+        for _ in range(2000):
+            node_service.get_active_nodes()
+            node_service.query_nodes(active=True, owner="owner")
+    finally:
+        stop.set()
+        thread.join()
+
+def test_executor_fails_fast_on_open_breaker(monkeypatch):
+    executor = TaskExecutor()
+    executor.task_service = FakeTaskService()
+    executor.task_manager = FakeTaskManager()
+    executor.batcher.window = 0
+    executor.breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    calls = []
+    monkeypatch.setattr(executor, 'execute_on_node', lambda task, node: calls.append(node.id) or ("ok", ''))
+    nodes = [make_node("up", 22), make_node("down", 22)]
+    executor.breakers.get("down").record_failure()
+    task = SimpleTask("task", "uptime", "uptime", nodes)
+
+    executor.execute(task)
+    executor.pool.shutdown(wait=False)
+
+    assert calls == ["up"]
+    assert task.results["down"] == ('', "Circuit open for node down")
+    assert executor.breakers.get_states() == {"up": "closed", "down": "open"}
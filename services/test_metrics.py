@@ -0,0 +1,73 @@
+import urllib.request
+import pytest
+from services.metrics import LatencyHistogram, Metrics, MetricsServer
+
+
+@pytest.fixture(scope="function")
+def metrics():
+    return Metrics()
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.observe(0.004)
+    histogram.observe(20)
+    assert histogram.percentile(50) == 0.005
+    assert histogram.percentile(100) == 30
+    assert histogram.snapshot()["count"] == 100
+
+def test_metrics_are_shared_by_name_and_labels(metrics: Metrics):
+    metrics.counter('requests_total', outcome='ok').inc()
+    metrics.counter('requests_total', outcome='ok').inc(2)
+    metrics.counter('requests_total', outcome='error').inc()
+
+    assert metrics.counter('requests_total', outcome='ok').value == 3
+    with pytest.raises(ValueError):
+        metrics.gauge('requests_total', outcome='ok')
+
+def test_render_prometheus_text(metrics: Metrics):
+    metrics.counter('requests_total', 'Requests served', outcome='ok').inc(3)
+    metrics.gauge('in_flight').set(2)
+    histogram = metrics.histogram('latency_seconds', 'Request latency')
+    histogram.observe(0.004)
+    histogram.observe(0.2)
+
+    text = metrics.render()
+
+    assert '# HELP requests_total Requests served\n# TYPE requests_total counter\nrequests_total{outcome="ok"} 3\n' in text
+    assert 'in_flight 2\n' in text
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{le="0.005"} 1\n' in text
+    assert 'latency_seconds_bucket{le="0.25"} 2\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2\n' in text
+    assert 'latency_seconds_count 2\n' in text
+
+def test_registered_metrics_are_rendered(metrics: Metrics):
+    pool_wait = LatencyHistogram()
+    metrics.register('queue_wait_seconds', pool_wait, pool='scheduler')
+    pool_wait.observe(0.01)
+
+    assert 'queue_wait_seconds_count{pool="scheduler"} 1' in metrics.render()
+    assert metrics.summary() == ['queue_wait_seconds{pool="scheduler"}: n=1 p50=0.01s p99=0.01s']
+
+def test_http_endpoint_serves_metrics(metrics: Metrics):
+    metrics.counter('requests_total').inc()
+    server = MetricsServer(metrics, host='127.0.0.1', port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=2) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert 'requests_total 1' in response.read().decode('utf-8')
+    finally:
+        server.stop()
+
+def test_local_only_routes_check_the_client(metrics: Metrics):
+    server = MetricsServer(metrics, host='127.0.0.1', port=0)
+    server.add_route('/private', 'text/plain', lambda: "private", local_only=True)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/private", timeout=2) as response:
+            assert response.read() == b"private"
+        assert server.routes['/private'][2] and not server.routes['/metrics'][2]
+    finally:
+        server.stop()
@@ -0,0 +1,55 @@
+import pytest
+from services.node.node import Node
+from services.node.node_role import NodeRole
+from services.node_service import NodeService
+
+
+@pytest.fixture(scope="function")
+def node_service():
+    node_service = NodeService()
+    node_service.create_nodes([
+        {"name": "master", "ip": "10.0.0.1", "user": "root", "password": "pw", "role": "master", "so": "Ubuntu", "owner": "alice", "blockchains": ["quilibrium"]},
+        {"name": "slave-1", "ip": "10.0.0.2", "user": "root", "password": "pw", "role": "slave", "so": "Ubuntu", "owner": "alice", "blockchains": ["quilibrium", "bittensor"]},
+        {"name": "slave-2", "ip": "10.0.0.3", "user": "root", "password": "pw", "role": "slave", "so": "Ubuntu", "owner": "bob", "blockchains": ["bittensor"]},
+        {"name": "duplicate", "ip": "10.0.0.3", "user": "root", "password": "pw", "role": "slave", "so": "Ubuntu", "owner": "bob", "blockchains": []},
+    ])
+    return node_service
+
+def names(nodes):
+    return sorted(node.name for node in nodes)
+
+def test_seed_loading_skips_known_ips(node_service: NodeService):
+    assert names(node_service.list_nodes()) == ["master", "slave-1", "slave-2"]
+    assert node_service.get_node_by_ip("10.0.0.3").name == "slave-2"
+    assert node_service.get_node_by_ip("10.0.0.9") is None
+
+def test_lookups_use_indexes(node_service: NodeService):
+    assert names(node_service.get_nodes_by_name(["slave-1", "master", "missing"])) == ["master", "slave-1"]
+    assert names(node_service.get_nodes_with_blockchain("bittensor")) == ["slave-1", "slave-2"]
+    assert names(node_service.get_nodes_without_blockchain("bittensor")) == ["master"]
+    assert names(node_service.get_nodes_by_role(NodeRole.SLAVE)) == ["slave-1", "slave-2"]
+    assert names(node_service.get_nodes_by_owner("bob")) == ["slave-2"]
+
+def test_indexes_follow_updates(node_service: NodeService):
+    node_service.update_node_blockchains("slave-2", ["quilibrium"])
+    node_service.activate_node("slave-2")
+    node_service.activate_node("master")
+    assert names(node_service.get_nodes_with_blockchain("bittensor")) == ["slave-1"]
+    assert names(node_service.get_active_nodes()) == ["master", "slave-2"]
+
+    node_service.deactivate_node("master")
+    assert names(node_service.get_active_nodes()) == ["slave-2"]
+
+    node_service.add_node(Node("slave-2", "slave-2", "10.0.0.4", "root", "pw", "slave", "Debian", "carol", ["quilibrium"], active=False))
+    assert node_service.get_node_by_ip("10.0.0.3") is None
+    assert node_service.get_node_by_ip("10.0.0.4").owner == "carol"
+    assert node_service.get_nodes_by_owner("bob") == []
+    assert node_service.get_active_nodes() == []
+
+def test_composite_query(node_service: NodeService):
+    node_service.activate_node("slave-1")
+    node_service.activate_node("master")
+    assert names(node_service.query_nodes(active=True, role=NodeRole.SLAVE, blockchain="quilibrium")) == ["slave-1"]
+    assert names(node_service.query_nodes(active=False, blockchain="bittensor")) == ["slave-2"]
+    assert names(node_service.query_nodes(owner="alice")) == ["master", "slave-1"]
+    assert len(node_service.query_nodes()) == 3
@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+from services.notification_queue import NotificationQueue, TokenBucket
+from services.task.simple_task import SimpleTask
+from services.task.task_status import TaskStatus
+
+
+class FakeBot:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.messages = []
+        self.documents = []
+        self.sent_at = []
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.delay)
+        self.sent_at.append(time.monotonic())
+        self.messages.append((chat_id, text))
+
+    def send_document(self, chat_id, document, filename):
+        self.sent_at.append(time.monotonic())
+        self.documents.append((chat_id, filename, document.read().decode('utf-8')))
+
+
+class FakeTaskService:
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, task_id, results):
+        task = SimpleTask(task_id, "uptime", "uptime", [])
+        task.status = TaskStatus.COMPLETED
+        for node_id, result in results.items():
+            task.add_result(node_id, result)
+        self.tasks[task_id] = task
+
+    def get_task(self, task_id):
+        return self.tasks.get(task_id)
+
+
+@pytest.fixture(scope="function")
+def task_service():
+    return FakeTaskService()
+
+@pytest.fixture(scope="function")
+def notifications(task_service):
+    notifications = NotificationQueue(bot=FakeBot(), chat_id="chat", task_service=task_service, window=0.2, rate=100, burst=10)
+    yield notifications
+    notifications.close()
+
+def test_completions_within_window_become_one_digest(notifications: NotificationQueue, task_service: FakeTaskService):
+    for i in range(3):
+        task_service.add(f"task-{i}", {"node-1": ("up 3 days", '')})
+        notifications.notify(f"task-{i}")
+    notifications.flush()
+
+    assert len(notifications.bot.messages) == 1
+    chat_id, text = notifications.bot.messages[0]
+    assert chat_id == "chat"
+    assert text.startswith("3 tasks completed")
+    assert all(f"task-{i}" in text for i in range(3))
+    assert notifications.bot.documents == []
+
+def test_large_results_are_truncated_and_attached(notifications: NotificationQueue, task_service: FakeTaskService):
+    notifications.max_length = 300
+    output = "line\n" * 1000
+    task_service.add("task", {f"node-{i}": (output, '') for i in range(10)})
+
+    notifications.notify("task")
+    notifications.flush()
+
+    _, text = notifications.bot.messages[0]
+    assert len(text) <= 300
+    assert text.endswith("full output attached")
+    _, filename, attachment = notifications.bot.documents[0]
+    assert filename.endswith(".txt")
+    assert attachment.count("line") == 10000
+    # Ten identical outputs are stored once, compressed
+    assert "50000 B output stored in" in text
+
+def test_sends_are_paced_per_chat(task_service: FakeTaskService):
+    notifications = NotificationQueue(bot=FakeBot(), chat_id="chat", task_service=task_service, window=0.01, rate=5, burst=1)
+    task_service.add("task", {"node-1": ("ok", '')})
+    try:
+        for _ in range(3):
+            notifications.notify("task")
+            time.sleep(0.05)
+        notifications.flush()
+    finally:
+        notifications.close()
+
+    sent_at = notifications.bot.sent_at
+    assert len(sent_at) == 3
+    assert all(later - earlier >= 0.15 for earlier, later in zip(sent_at, sent_at[1:]))
+
+def test_notify_never_blocks_on_a_slow_bot(task_service: FakeTaskService):
+    notifications = NotificationQueue(bot=FakeBot(delay=0.5), chat_id="chat", task_service=task_service, window=0.01, max_pending=2)
+    task_service.add("task", {"node-1": ("ok", '')})
+    try:
+        started = time.monotonic()
+        for _ in range(10):
+            notifications.notify("task")
+        assert time.monotonic() - started < 0.1
+        assert notifications.get_stats()['dropped'] > 0
+    finally:
+        notifications.close()
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.take()
+    bucket.take()
+    assert bucket.delay() == pytest.approx(0.1, abs=0.02)
+    time.sleep(0.1)
+    assert bucket.delay() == 0
@@ -0,0 +1,37 @@
+import os
+from services.output_buffer import CommandOutput, OutputBuffer
+
+
+def test_small_output_stays_in_memory():
+    buffer = OutputBuffer(max_bytes=16)
+    buffer.write(b"hello ")
+    buffer.write(b"world")
+    buffer.close()
+    assert str(buffer) == "hello world"
+    assert buffer.spill_path is None
+    assert not buffer.truncated
+
+def test_large_output_keeps_tail_and_spills_to_disk(tmp_path):
+    expected = "".join(f"{i:03d}\n" for i in range(100))
+    buffer = OutputBuffer(max_bytes=10, spill_dir=str(tmp_path))
+    for i in range(100):
+        buffer.write(f"{i:03d}\n".encode())
+    buffer.close()
+
+    assert buffer.truncated
+    assert buffer.total_bytes == 400
+    assert buffer.tail() == expected[-10:]
+    assert len(buffer.buffer) <= 20
+    assert buffer.read_all() == expected
+
+    buffer.discard()
+    assert not os.listdir(tmp_path)
+
+def test_command_output_routes_streams_and_callbacks():
+    chunks = []
+    output = CommandOutput(on_chunk=lambda stream, chunk: chunks.append(stream))
+    output.write('stdout', b"out")
+    output.write('stderr', b"err")
+    output.close(exit_status=0)
+    assert (str(output.stdout), str(output.stderr), output.exit_status) == ("out", "err", 0)
+    assert chunks == ['stdout', 'stderr']
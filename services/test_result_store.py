@@ -0,0 +1,159 @@
+import os
+import threading
+import pytest
+from services.output_buffer import CommandOutput, NodeOutput
+from services.result_store import ResultStore
+from services.task.simple_task import SimpleTask
+from services.task.task_status import TaskStatus
+from services.task.task_store import TaskStore
+from services.task_service import TaskService
+
+
+@pytest.fixture(scope="function")
+def result_store():
+    return ResultStore(compress_threshold=1024)
+
+def make_task(result_store: ResultStore, name="task"):
+    task = SimpleTask(name, "version", "node --version", [])
+    task._result_store = result_store
+    return task
+
+def test_identical_outputs_are_stored_once(result_store: ResultStore):
+    task = make_task(result_store)
+    for i in range(500):
+        task.add_result(f"node-{i}", ("v1.2.3\n", ''))
+
+    assert result_store.get_stats()['blobs'] == 2
+    stats = task.result_stats()
+    assert stats['results'] == 500
+    assert stats['unique_blobs'] == 2
+    assert stats['raw_bytes'] == 500 * len("v1.2.3\n")
+    assert stats['bytes_saved'] == 499 * len("v1.2.3\n")
+    assert stats['dedupe_ratio'] == 500
+
+def test_large_outputs_are_compressed(result_store: ResultStore):
+    task = make_task(result_store)
+    config = "key = value\n" * 10000
+    task.add_result("node-1", config)
+
+    assert task.results["node-1"] == config
+    assert task.result_stats()['stored_bytes'] < len(config) / 10
+
+def test_small_outputs_are_not_compressed(result_store: ResultStore):
+    task = make_task(result_store)
+    output = "a" * 1000
+    task.add_result("node-1", output)
+
+    assert task.results["node-1"] == output
+    assert task.result_stats()['stored_bytes'] == len(output)
+
+def test_results_is_a_read_only_view(result_store: ResultStore):
+    task = make_task(result_store)
+    task.add_result("node-1", ("up", ''))
+    results = task.results
+    task.add_result("node-2", "transferred")
+
+    assert results == {"node-1": ("up", ''), "node-2": "transferred"}
+    assert "node-2" in results and len(results) == 2
+    with pytest.raises(TypeError):
+        results["node-3"] = "nope"
+
+def test_non_text_results_are_kept_as_is(result_store: ResultStore):
+    task = make_task(result_store)
+    buffers = (object(), object())
+    task.add_result("node-1", buffers)
+
+    assert task.results["node-1"] is buffers
+    assert task.result_stats()['results'] == 1
+
+def test_blobs_are_dropped_with_their_last_reference(result_store: ResultStore):
+    first, second = make_task(result_store, "first"), make_task(result_store, "second")
+    first.add_result("node-1", ("shared", ''))
+    second.add_result("node-1", ("shared", ''))
+    second.add_result("node-1", ("replaced", ''))
+
+    assert result_store.get_stats()['blobs'] == 3
+    first.release_results()
+    assert result_store.get_stats()['blobs'] == 2
+
+def test_evicted_tasks_release_their_blobs(result_store: ResultStore):
+    task_service = TaskService(TaskStore(retention=1))
+    tasks = [make_task(result_store, f"task-{i}") for i in range(3)]
+    for i, task in enumerate(tasks):
+        task_service.store.add(task)
+        task.add_result("node-1", (f"output {i}", ''))
+        task_service.update_task_status(task.id, TaskStatus.COMPLETED)
+
+    assert result_store.get_stats()['blobs'] == 2
+
+def spilled_output(tmp_path) -> CommandOutput:
+    output = CommandOutput(max_bytes=4)
+    output.stdout.spill_dir = str(tmp_path)
+    output.write('stdout', b"more than four bytes")
+    output.close(0)
+    return output
+
+def test_released_outputs_remove_their_spill_files(result_store: ResultStore, tmp_path):
+    task = make_task(result_store)
+    output = spilled_output(tmp_path)
+    # A streamed node publishes its live buffers, then stores the same buffers as its result
+    task.add_result("node-1", (output.stdout, output.stderr))
+    task.add_result("node-1", (output.stdout, output.stderr))
+    assert os.listdir(tmp_path)
+
+    task.add_result("node-1", ("replaced", ''))
+    assert not os.listdir(tmp_path)
+
+    task.add_result("node-2", (spilled_output(tmp_path).stdout, ''))
+    task.release_results()
+    assert not os.listdir(tmp_path)
+
+def test_result_stats_are_reported_per_task(result_store: ResultStore):
+    task_service = TaskService(TaskStore(retention=10))
+    first, second = make_task(result_store, "first"), make_task(result_store, "second")
+    for task in (first, second):
+        task_service.store.add(task)
+    first.add_result("node-1", ("x" * 4096, ''))
+    first.add_result("node-2", ("x" * 4096, ''))
+    second.add_result("node-1", ("small", ''))
+
+    stats = task_service.get_task_result_stats("first")
+    assert stats['results'] == 2 and stats['unique_blobs'] == 2
+    assert stats['raw_bytes'] == 8192 and stats['bytes_saved'] > 4096
+    assert task_service.get_task_result_stats("second")['raw_bytes'] == 5
+    assert task_service.get_task_result_stats("missing") is None
+
+def test_exit_status_survives_storage(result_store: ResultStore):
+    task = make_task(result_store)
+    task.add_result("node-1", NodeOutput("out", "err", 3))
+    task.add_result("node-2", ("no status", ''))
+
+    assert task.results["node-1"] == ("out", "err")
+    assert task.results["node-1"].exit_status == 3
+    assert not hasattr(task.results["node-2"], 'exit_status')
+
+def test_views_survive_concurrent_replacement(result_store: ResultStore):
+    task = make_task(result_store)
+    task.add_result("node-1", ("output 0", ''))
+    results = task.results
+    stop = threading.Event()
+
+    def replace():
+        for i in range(1, 5000):
+            task.add_result("node-1", (f"output {i}", ''))
+        stop.set()
+
+    writer = threading.Thread(target=replace)
+    writer.start()
+    while not stop.is_set():
+        assert results["node-1"][0].startswith("output")
+    writer.join()
+
+def test_open_views_are_emptied_on_release(result_store: ResultStore):
+    task = make_task(result_store)
+    task.add_result("node-1", ("output", ''))
+    results = task.results
+    task.release_results()
+
+    assert "node-1" not in results and len(results) == 0
+    assert result_store.get_stats()['blobs'] == 0
@@ -0,0 +1,81 @@
+import os
+import paramiko
+import pytest
+from services.sftp_transfer import SFTPTransfer
+from services.ssh_service import SSHService
+from testing.fake_ssh_server import FakeSSHServer, shell_handler
+
+
+@pytest.fixture(scope="module")
+def ssh_server():
+    with FakeSSHServer(handler=shell_handler, sftp=True) as server:
+        yield server
+
+@pytest.fixture(scope="function")
+def ssh_client(ssh_server: FakeSSHServer):
+    client = SSHService(ssh_server.host, "root", "password", port=ssh_server.port, keep_open=True)
+    client.connect_ssh()
+    yield client.ssh_client
+    client.close()
+
+@pytest.fixture(scope="function")
+def transfer(ssh_client, tmp_path):
+    transfer = SFTPTransfer(ssh_client, parallel=4, chunk_threshold=1024, checkpoint_dir=str(tmp_path))
+    transfer.BLOCK_SIZE = 1000
+    transfer.CHECKPOINT_INTERVAL = 1000
+    return transfer
+
+@pytest.fixture(scope="function")
+def payload(tmp_path):
+    path = tmp_path / "payload.bin"
+    path.write_bytes(os.urandom(50_000))
+    return path
+
+def test_put_splits_large_files_into_parallel_chunks(transfer: SFTPTransfer, payload, tmp_path):
+    remote = tmp_path / "remote.bin"
+    report = transfer.put(str(payload), str(remote))
+    assert remote.read_bytes() == payload.read_bytes()
+    assert report.transferred == 50_000 and report.throughput > 0
+    assert len(transfer.split(50_000)) == 4
+
+def test_matching_files_are_skipped(transfer: SFTPTransfer, payload, tmp_path):
+    remote = tmp_path / "remote.bin"
+    transfer.put(str(payload), str(remote))
+    assert transfer.put(str(payload), str(remote)).skipped
+    assert transfer.get(str(remote), str(payload)).skipped
+
+def test_get_round_trip(transfer: SFTPTransfer, payload, tmp_path):
+    local = tmp_path / "copy.bin"
+    local.write_bytes(b"stale contents that are longer than nothing" * 2000)
+    report = transfer.get(str(payload), str(local))
+    assert not report.skipped
+    assert local.read_bytes() == payload.read_bytes()
+
+def test_interrupted_put_resumes_from_checkpoint(transfer: SFTPTransfer, payload, tmp_path, monkeypatch):
+    remote = tmp_path / "remote.bin"
+    put_part = transfer._put_part
+
+    def failing_put_part(local_path, remote_path, index, start, end, checkpoint):
+        if index == 2:
+            put_part(local_path, remote_path, index, start, start + 5000, checkpoint)
+            raise paramiko.SSHException("connection dropped")
+        put_part(local_path, remote_path, index, start, end, checkpoint)
+
+    monkeypatch.setattr(transfer, '_put_part', failing_put_part)
+    with pytest.raises(paramiko.SSHException):
+        transfer.put(str(payload), str(remote))
+    assert any(name.startswith("sftp-") for name in os.listdir(tmp_path))
+
+    monkeypatch.setattr(transfer, '_put_part', put_part)
+    report = transfer.put(str(payload), str(remote))
+    assert report.resumed >= 3 * 12_500
+    assert report.transferred <= 50_000 - report.resumed
+    assert remote.read_bytes() == payload.read_bytes()
+    assert not any(name.startswith("sftp-") for name in os.listdir(tmp_path))
+
+def test_push_path_command(ssh_server: FakeSSHServer, payload, tmp_path):
+    remote = tmp_path / "pushed.bin"
+    client = SSHService(ssh_server.host, "root", "password", port=ssh_server.port)
+    message = client.execute_command("push-path", local_path=str(payload), remote_path=str(remote))
+    assert message.startswith("Transferred")
+    assert remote.read_bytes() == payload.read_bytes()
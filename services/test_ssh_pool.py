@@ -0,0 +1,73 @@
+import pytest
+import services.ssh_pool as ssh_pool_module
+from services.ssh_pool import SSHPool
+
+
+class FakeSSHService:
+    connections = 0
+
+    def __init__(self, hostname, username, password=None, key_filename=None, port=22, keep_open=False, keepalive=0):
+        self.hostname = hostname
+        self.username = username
+        self.port = port
+        self.alive = False
+
+    def connect_ssh(self):
+        FakeSSHService.connections += 1
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def execute_command(self, command):
+        return command, ''
+
+    def close(self):
+        self.alive = False
+
+
+@pytest.fixture(scope="function")
+def pool(monkeypatch):
+    FakeSSHService.connections = 0
+    monkeypatch.setattr(ssh_pool_module, 'SSHService', FakeSSHService)
+    pool = SSHPool(max_per_host=2, idle_timeout=60, keepalive=10)
+    yield pool
+    pool.close_all()
+
+def test_connection_is_reused(pool: SSHPool):
+    assert pool.execute_command("uptime", "10.0.0.1", "root") == ("uptime", '')
+    assert pool.execute_command("whoami", "10.0.0.1", "root") == ("whoami", '')
+    assert FakeSSHService.connections == 1
+
+def test_connections_are_keyed_by_host_user_and_port(pool: SSHPool):
+    pool.execute_command("uptime", "10.0.0.1", "root")
+    pool.execute_command("uptime", "10.0.0.1", "admin")
+    pool.execute_command("uptime", "10.0.0.1", "root", port=2222)
+    assert FakeSSHService.connections == 3
+
+def test_max_connections_per_host(pool: SSHPool):
+    first = pool.acquire("10.0.0.1", "root")
+    second = pool.acquire("10.0.0.1", "root")
+    with pytest.raises(TimeoutError):
+        pool.acquire("10.0.0.1", "root", timeout=0.05)
+
+    pool.release(first)
+    assert pool.acquire("10.0.0.1", "root", timeout=0.05) is first
+    pool.release(second)
+
+def test_dead_transport_reconnects(pool: SSHPool):
+    client = pool.acquire("10.0.0.1", "root")
+    pool.release(client)
+    client.alive = False
+
+    reconnected = pool.acquire("10.0.0.1", "root")
+    assert reconnected is not client
+    assert reconnected.is_alive()
+    assert FakeSSHService.connections == 2
+    assert pool.get_stats()["root@10.0.0.1:22"]["open"] == 1
+
+def test_idle_connections_are_evicted(pool: SSHPool):
+    pool.execute_command("uptime", "10.0.0.1", "root")
+    pool.idle_timeout = 0
+    assert pool.evict_idle() == 1
+    assert pool.get_stats() == {}
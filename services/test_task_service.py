@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime
+import pytest
+from services.task.periodic_task import PeriodicTask
+from services.task.scheduled_task import ScheduledTask
+from services.task.simple_task import SimpleTask
+from services.task.task_status import TaskStatus
+from services.task.task_store import TaskStore
+from services.task_service import TaskService
+
+
+@pytest.fixture(scope="function")
+def task_service():
+    return TaskService(TaskStore(retention=100000))
+
+def add_simple_tasks(task_service: TaskService, count: int):
+    tasks = [SimpleTask(uuid.uuid4(), f"task {i}", "uptime", []) for i in range(count)]
+    for task in tasks:
+        task_service.store.add(task)
+    return tasks
+
+def test_status_buckets_follow_transitions(task_service: TaskService):
+    tasks = add_simple_tasks(task_service, 5)
+    task_service.update_task_status(tasks[1].id, TaskStatus.RUNNING)
+    task_service.update_task_status(tasks[1].id, TaskStatus.COMPLETED)
+    task_service.update_task_status(tasks[3].id, TaskStatus.FAILED)
+
+    assert task_service.get_pending_tasks() == [tasks[0], tasks[2], tasks[4]]
+    assert task_service.get_completed_tasks() == [tasks[1]]
+    assert task_service.count_tasks(TaskStatus.PENDING) == 3
+    assert task_service.count_tasks(TaskStatus.RUNNING) == 0
+    assert task_service.count_tasks(TaskStatus.FAILED, "SimpleTask") == 1
+    assert task_service.count_tasks() == 5
+
+def test_type_buckets(task_service: TaskService):
+    simple = add_simple_tasks(task_service, 2)
+    scheduled = ScheduledTask(uuid.uuid4(), "later", "uptime", [], datetime(2030, 1, 1))
+    task_service.store.add(scheduled)
+
+    assert task_service.get_simple_tasks() == simple
+    assert task_service.get_scheduled_tasks() == [scheduled]
+    assert task_service.get_periodic_tasks() == []
+    assert task_service.count_tasks(task_type=PeriodicTask.__name__) == 0
+
+def test_cursor_pagination_is_stable_across_transitions(task_service: TaskService):
+    tasks = add_simple_tasks(task_service, 50)
+
+    first, cursor = task_service.page_tasks(statuses=[TaskStatus.PENDING], page_size=20)
+    # Tasks leaving the bucket between pages don't shift the next page
+    for task in tasks[:10]:
+        task_service.update_task_status(task.id, TaskStatus.COMPLETED)
+    second, cursor = task_service.page_tasks(statuses=[TaskStatus.PENDING], cursor=cursor, page_size=20)
+    third, last = task_service.page_tasks(statuses=[TaskStatus.PENDING], cursor=cursor, page_size=20)
+
+    assert first == tasks[:20]
+    assert second == tasks[20:40]
+    assert third == tasks[40:]
+    assert last is None
+
+def test_bot_listing_renders_one_page(task_service: TaskService, monkeypatch):
+    add_simple_tasks(task_service, 100000)
+    rendered = []
+    monkeypatch.setattr(SimpleTask, 'to_string', lambda task: rendered.append(task) or task.description)
+
+    page = task_service.get_pending_tasks_info(page_size=10)
+
+    assert len(rendered) == 10
+    assert page[0] == "Pending Tasks (100000):"
+    assert page[-1].startswith("Next page cursor: ")
+    next_page = task_service.get_pending_tasks_info(cursor=int(page[-1].split(": ")[1]), page_size=10)
+    assert next_page[1] == "task 10"
+
+def test_evicted_tasks_leave_their_buckets():
+    task_service = TaskService(TaskStore(retention=2))
+    tasks = add_simple_tasks(task_service, 4)
+    for task in tasks:
+        task_service.update_task_status(task.id, TaskStatus.COMPLETED)
+
+    assert task_service.get_completed_tasks() == tasks[2:]
+    assert task_service.count_tasks(task_type="SimpleTask") == 2
+
+def test_stop_task_handles_every_task_type(task_service: TaskService):
+    simple, = add_simple_tasks(task_service, 1)
+    scheduled = ScheduledTask(uuid.uuid4(), "later", "uptime", [], datetime(2030, 1, 1))
+    periodic = PeriodicTask(uuid.uuid4(), "every minute", "uptime", [], 60, datetime(2030, 1, 1))
+    for task in (scheduled, periodic):
+        task_service.store.add(task)
+
+    for task in (simple, scheduled, periodic):
+        task_service.stop_task(task.id)
+        assert task.status is TaskStatus.STOPPED
+    assert not periodic.running
@@ -0,0 +1,51 @@
+import threading
+import time
+import pytest
+from services.thread_service import ThreadService
+
+
+@pytest.fixture(scope="function")
+def thread_service():
+    thread_service = ThreadService(max_threads=2, max_queue=2, name='test')
+    yield thread_service
+    thread_service.shutdown(cancel_futures=True)
+
+def test_submit_returns_future(thread_service: ThreadService):
+    futures = [thread_service.submit(pow, i, 2) for i in range(5)]
+    assert sorted(future.result(timeout=1) for future in thread_service.as_completed(futures)) == [0, 1, 4, 9, 16]
+    assert thread_service.get_metrics()["completed"] == 5
+
+def test_exceptions_are_raised_from_result(thread_service: ThreadService):
+    future = thread_service.submit(int, "not a number")
+    with pytest.raises(ValueError):
+        thread_service.get_result(future, timeout=1)
+    assert thread_service.get_metrics()["failed"] == 1
+
+def test_queued_tasks_can_be_cancelled_and_queue_applies_backpressure(thread_service: ThreadService):
+    release = threading.Event()
+    running = [thread_service.submit(release.wait) for _ in range(2)]
+    while thread_service.get_metrics()["active_workers"] < 2:
+        time.sleep(0.01)
+
+    queued = [thread_service.submit(pow, 2, 2) for _ in range(2)]
+    blocked = threading.Thread(target=thread_service.submit, args=(pow, 3, 3))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+    assert thread_service.get_metrics()["queue_depth"] == 2
+
+    assert queued[0].cancel()
+    release.set()
+    blocked.join(1)
+    assert all(future.result(timeout=1) for future in running)
+    assert queued[1].result(timeout=1) == 4
+    thread_service.wait_all()
+    assert thread_service.get_metrics()["cancelled"] == 1
+
+def test_submit_after_shutdown_is_refused(thread_service: ThreadService):
+    assert thread_service.submit(pow, 2, 2).result(timeout=1) == 4
+    thread_service.shutdown()
+
+    with pytest.raises(RuntimeError, match="after shutdown"):
+        thread_service.submit(pow, 2, 2)
+    assert thread_service.workers == []
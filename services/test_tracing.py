@@ -0,0 +1,101 @@
+import json
+import pytest
+from services.node.node import Node
+from services.task.simple_task import SimpleTask
+from services.task.task_executor import TaskExecutor
+from services.task.test_task_executor import FakeTaskManager, FakeTaskService
+from services.tracing import Tracer
+
+
+@pytest.fixture(scope="function")
+def tracer():
+    return Tracer(sample_rate=1, capacity=3)
+
+def names(trace):
+    return [span.name for span in trace.spans]
+
+def test_unsampled_operations_record_nothing():
+    tracer = Tracer(sample_rate=0)
+    root = tracer.start_trace('task')
+    with tracer.span('child', parent=root) as child:
+        assert child is None
+
+    assert root is None
+    assert tracer.get_traces() == []
+
+def test_spans_nest_through_the_current_context(tracer: Tracer):
+    root = tracer.start_trace('task', task_id='t1')
+    with tracer.activate(root):
+        with tracer.span('create') as create:
+            with tracer.span('schedule') as schedule:
+                pass
+    assert tracer.get_traces() == []
+    tracer.finish(root)
+
+    trace, = tracer.find(task_id='t1')
+    assert names(trace) == ['task', 'create', 'schedule']
+    assert create.parent_id == root.span_id
+    assert schedule.parent_id == create.span_id
+    assert all(span.duration is not None for span in trace.spans)
+
+def test_ring_and_span_limits_are_bounded():
+    tracer = Tracer(sample_rate=1, capacity=3, max_spans=4)
+    for i in range(5):
+        root = tracer.start_trace('task', task_id=i)
+        for _ in range(10):
+            with tracer.span('node', parent=root):
+                pass
+        tracer.finish(root)
+
+    traces = tracer.get_traces()
+    assert [trace.root.attrs['task_id'] for trace in traces] == [2, 3, 4]
+    assert all(len(trace.spans) == 4 and trace.dropped == 7 for trace in traces)
+
+def test_executor_traces_each_node(tracer: Tracer, monkeypatch):
+    executor = TaskExecutor()
+    executor.task_service = FakeTaskService()
+    executor.task_manager = FakeTaskManager()
+    executor.batcher.window = 0
+    executor.tracer = tracer
+
+    def execute_on_node(task, node):
+        with tracer.span('exec', command=task.task_command):
+            return (node.id, '')
+
+    monkeypatch.setattr(executor, 'execute_on_node', execute_on_node)
+    nodes = [Node(f"node-{i}", f"node-{i}", f"10.0.0.{i}", "root", "password", "slave", "Ubuntu", "owner") for i in range(3)]
+    task = SimpleTask("task", "uptime", "uptime", nodes)
+    task.trace = tracer.start_trace('task', task_id=task.id)
+
+    executor.execute(task)
+    executor.pool.shutdown(wait=False)
+
+    trace, = tracer.find(task_id="task")
+    spans = {span.span_id: span for span in trace.spans}
+    execute = next(span for span in trace.spans if span.name == 'TaskExecutor.execute')
+    node_spans = [span for span in trace.spans if span.name == 'node']
+    assert execute.parent_id == task.trace.span_id
+    assert sorted(span.attrs['node'] for span in node_spans) == ["node-0", "node-1", "node-2"]
+    assert all(span.parent_id == execute.span_id for span in node_spans)
+    for name in ('exec', 'result_write'):
+        children = [span for span in trace.spans if span.name == name]
+        assert len(children) == 3
+        assert all(spans[span.parent_id].name == 'node' for span in children)
+
+    events = json.loads(tracer.export_chrome())['traceEvents']
+    complete = [event for event in events if event['ph'] == 'X']
+    assert len(complete) == len(trace.spans)
+    assert all(event['dur'] >= 0 and event['ts'] > 0 for event in complete)
+    exported, = json.loads(tracer.export_json(tracer.find(task_id="task")))
+    assert len(exported['spans']) == len(trace.spans)
+
+def test_commands_are_recorded_as_digests(tracer: Tracer):
+    root = tracer.start_trace('task', command="mysql -p hunter2")
+    with tracer.span('exec', parent=root) as span:
+        span.set(command="mysql -p hunter2", exit_status=0)
+    tracer.finish(root)
+
+    exported = tracer.export_json()
+    assert "hunter2" not in exported
+    assert root.attrs['command'] == span.attrs['command'] and root.attrs['command'].startswith('sha256:')
+    assert span.attrs['exit_status'] == 0
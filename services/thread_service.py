@@ -2,74 +2,157 @@ import logging
 import threading
 import queue
 import os
-from typing import Callable, Any
+import time
+from concurrent.futures import Future, as_completed
+from typing import Callable, Any, Dict, Iterable, Iterator, List
+from services.metrics import LatencyHistogram
+
 
 class ThreadService:
+    """
+    Fixed size worker pool handing out concurrent.futures.Future handles.
+    `submit` blocks while the queue is full, so producers slow down instead of
+    queueing without bound. Usable wherever a concurrent.futures executor is
+    expected, including as an APScheduler pool.
+    """
     default_threads = 8
+    default_queue_size = 1000
 
-    def __init__(self):
-        self.max_threads = int(os.environ.get('MAX_THREADS', self.default_threads))
-        self.semaphore = threading.Semaphore(self.max_threads)
-        self.task_queue = queue.Queue()
-        self.results = {}
+    def __init__(self, max_threads: int = None, max_queue: int = None, name: str = 'worker'):
+        self.max_threads = int(max_threads or os.environ.get('MAX_THREADS', self.default_threads))
+        self.max_queue = int(max_queue or os.environ.get('THREAD_QUEUE_SIZE', self.default_queue_size))
+        self.name = name
+        self.task_queue = queue.Queue(maxsize=self.max_queue)
         self.lock = threading.Lock()
+        self.workers: List[threading.Thread] = []
+        self.is_running = False
+        self.is_shutdown = False
+        self.active_workers = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.queue_wait = LatencyHistogram()
+        self.latency = LatencyHistogram()
+
+    def start(self):
+        with self.lock:
+            if self.is_shutdown:
+                raise RuntimeError('cannot start a pool after shutdown')
+            if self.is_running:
+                return
+            self.is_running = True
+            for index in range(self.max_threads):
+                t = threading.Thread(target=self.worker, name=f"{self.name}-{index}", daemon=True)
+                t.start()
+                self.workers.append(t)
+        logging.debug(f"Started {self.max_threads} {self.name} threads")
 
     def worker(self):
         while True:
-            task_id, func, args, kwargs = self.task_queue.get()
-            with self.semaphore:
-                try:
-                    result = func(*args, **kwargs)
-                    with self.lock:
-                        self.results[task_id] = result
-                except Exception as e:
-                    with self.lock:
-                        self.results[task_id] = e
-                finally:
-                    self.task_queue.task_done()
-
-    def run_workers(self):
-        for _ in range(self.max_threads):
-            t = threading.Thread(target=self.worker)
-            t.daemon = True
-            t.start()
-
-    def run_in_background_thread(self):
-        """
-        Starts a worker in a separate background thread.
-        This is useful for non-blocking operations.
-        """
-        if not self.is_running:
-            logging.debug("Starting worker in background thread.")
-            self.should_exit = False
-            self.thread = threading.Thread(target=self.run, daemon=True)
-            self.thread.start()
-            self.is_running = True
-            logging.debug("Started")
+            item = self.task_queue.get()
+            try:
+                if item is None:
+                    return
+                self.run_item(*item)
+            finally:
+                self.task_queue.task_done()
 
-    def submit_task(self, func: Callable[..., Any], *args, **kwargs) -> int:
-        task_id = len(self.results)
-        self.task_queue.put((task_id, func, args, kwargs))
-        return task_id
+    def run_item(self, future: Future, func: Callable[..., Any], args, kwargs, enqueued_at: float):
+        if not future.set_running_or_notify_cancel():
+            with self.lock:
+                self.cancelled += 1
+            return
 
-    def get_result(self, task_id: int) -> Any:
-        while True:
+        started_at = time.monotonic()
+        self.queue_wait.observe(started_at - enqueued_at)
+        with self.lock:
+            self.active_workers += 1
+        try:
+            future.set_result(func(*args, **kwargs))
             with self.lock:
-                if task_id in self.results:
-                    result = self.results[task_id]
-                    del self.results[task_id]
-                    if isinstance(result, Exception):
-                        raise result
-                    return result
-            threading.Event().wait(0.1)  # Small delay to prevent busy waiting
+                self.completed += 1
+        except BaseException as e:
+            future.set_exception(e)
+            with self.lock:
+                self.failed += 1
+        finally:
+            self.latency.observe(time.monotonic() - started_at)
+            with self.lock:
+                self.active_workers -= 1
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        if self.is_shutdown:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        if not self.is_running:
+            self.start()
+
+        future = Future()
+        self.task_queue.put((future, func, args, kwargs, time.monotonic()))
+        with self.lock:
+            self.submitted += 1
+        return future
+
+    def submit_task(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        return self.submit(func, *args, **kwargs)
+
+    def get_result(self, future: Future, timeout: float = None) -> Any:
+        return future.result(timeout)
+
+    def as_completed(self, futures: Iterable[Future], timeout: float = None) -> Iterator[Future]:
+        return as_completed(futures, timeout)
+
+    def map(self, func: Callable[..., Any], *iterables, timeout: float = None) -> Iterator[Any]:
+        futures = [self.submit(func, *args) for args in zip(*iterables)]
+        return (future.result(timeout) for future in futures)
 
     def wait_all(self):
         self.task_queue.join()
 
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        with self.lock:
+            self.is_shutdown = True
+            if not self.is_running:
+                return
+            self.is_running = False
+
+        if cancel_futures:
+            while True:
+                try:
+                    item = self.task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+                    with self.lock:
+                        self.cancelled += 1
+                self.task_queue.task_done()
+
+        for _ in self.workers:
+            self.task_queue.put(None)
+        if wait:
+            for t in self.workers:
+                t.join()
+        self.workers = []
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = {
+                "name": self.name,
+                "max_threads": self.max_threads,
+                "queue_depth": self.task_queue.qsize(),
+                "active_workers": self.active_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+            }
+        metrics["queue_wait"] = self.queue_wait.snapshot()
+        metrics["latency"] = self.latency.snapshot()
+        return metrics
+
 # Usage example
 if __name__ == "__main__":
-    import time
-
     def example_task(x):
         time.sleep(1)  # Simulate some work
         return x * x
@@ -78,15 +161,13 @@ if __name__ == "__main__":
     os.environ['MAX_THREADS'] = '8'
 
     manager = ThreadService()
-    manager.start_workers()
 
     # Submit tasks
-    task_ids = [manager.submit_task(example_task, i) for i in range(10)]
+    futures = [manager.submit(example_task, i) for i in range(10)]
 
-    # Get results
-    for task_id in task_ids:
-        result = manager.get_result(task_id)
-        print(f"Result for task {task_id}: {result}")
+    # Get results as they complete
+    for future in manager.as_completed(futures):
+        print(f"Result: {future.result()}")
 
-    # Wait for all tasks to complete
-    manager.wait_all()
+    print(manager.get_metrics())
+    manager.shutdown()
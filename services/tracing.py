@@ -0,0 +1,201 @@
+import contextvars
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'start', 'end', 'thread', 'attrs')
+    # Commands can carry secrets inline; traces keep a digest that still groups identical commands
+    REDACTED_ATTRS = ('command',)
+
+    def __init__(self, name: str, trace: 'Trace', parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread = threading.get_ident()
+        self.attrs = self.redact(attrs)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(self.redact(attrs))
+
+    @classmethod
+    def redact(cls, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        for name in cls.REDACTED_ATTRS:
+            if attrs.get(name) is not None:
+                attrs[name] = 'sha256:' + hashlib.sha256(str(attrs[name]).encode('utf-8')).hexdigest()[:16]
+        return attrs
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.trace.wall_time(self.start),
+            'duration': self.duration,
+            'thread': self.thread,
+            'attrs': {key: str(value) for key, value in self.attrs.items()},
+        }
+
+
+class Trace:
+    """Spans of one sampled operation, capped at `max_spans` so long fan-outs stay bounded."""
+
+    def __init__(self, max_spans: int):
+        self.trace_id = uuid.uuid4().hex
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+        # Anchors perf_counter readings to wall clock time for export
+        self.wall_offset = time.time() - time.perf_counter()
+
+    def add(self, span: Span) -> bool:
+        with self.lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped += 1
+                return False
+            self.spans.append(span)
+            return True
+
+    def wall_time(self, perf_time: float) -> float:
+        return self.wall_offset + perf_time
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+
+class Tracer:
+    """
+    Head-sampled tracing. `start_trace` decides once per operation whether
+    it is recorded; spans opened under an unsampled or missing parent are
+    no-ops, so untraced work only pays for a context variable lookup. The
+    current span follows the code through a context variable within a
+    thread; work handed to another thread passes its parent explicitly.
+    Finished traces go into a ring of the last `capacity` traces.
+    """
+    DEFAULT_SAMPLE_RATE = 0.1
+    DEFAULT_CAPACITY = 200
+    DEFAULT_MAX_SPANS = 5000
+    _shared: Optional['Tracer'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, sample_rate: float = None, capacity: int = None, max_spans: int = None):
+        self.sample_rate = float(sample_rate if sample_rate is not None else os.getenv('TRACE_SAMPLE_RATE', self.DEFAULT_SAMPLE_RATE))
+        self.capacity = int(capacity or os.getenv('TRACE_CAPACITY', self.DEFAULT_CAPACITY))
+        self.max_spans = int(max_spans or os.getenv('TRACE_MAX_SPANS', self.DEFAULT_MAX_SPANS))
+        self.traces: deque = deque(maxlen=self.capacity)
+        self.current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'Tracer':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def start_trace(self, name: str, **attrs) -> Optional[Span]:
+        """Root span of a new trace, or None when this operation is not sampled."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        trace = Trace(self.max_spans)
+        span = Span(name, trace, None, attrs)
+        trace.add(span)
+        return span
+
+    def start_span(self, name: str, parent: Span = None, **attrs) -> Optional[Span]:
+        parent = parent or self.current_span.get()
+        if parent is None:
+            return None
+        span = Span(name, parent.trace, parent.span_id, attrs)
+        return span if parent.trace.add(span) else None
+
+    def finish(self, span: Optional[Span]):
+        if span is None or span.end is not None:
+            return
+        span.end = time.perf_counter()
+        if span.parent_id is None:
+            with self.lock:
+                self.traces.append(span.trace)
+
+    def current(self) -> Optional[Span]:
+        return self.current_span.get()
+
+    @contextmanager
+    def activate(self, span: Optional[Span]) -> Iterator[Optional[Span]]:
+        """Makes `span` the parent of spans opened in this thread, without finishing it."""
+        token = self.current_span.set(span)
+        try:
+            yield span
+        finally:
+            self.current_span.reset(token)
+
+    @contextmanager
+    def span(self, name: str, parent: Span = None, **attrs) -> Iterator[Optional[Span]]:
+        span = self.start_span(name, parent, **attrs)
+        if span is None:
+            yield None
+            return
+        token = self.current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs['error'] = repr(e)
+            raise
+        finally:
+            self.current_span.reset(token)
+            self.finish(span)
+
+    def find(self, **attrs) -> List[Trace]:
+        """Finished traces whose root has all the given attributes, newest first."""
+        return [trace for trace in reversed(self.get_traces()) if all(str(trace.root.attrs.get(key)) == str(value) for key, value in attrs.items())]
+
+    def get_traces(self) -> List[Trace]:
+        with self.lock:
+            return list(self.traces)
+
+    def export_json(self, traces: List[Trace] = None) -> str:
+        """The given traces, or every finished one, as JSON."""
+        traces = self.get_traces() if traces is None else traces
+        return json.dumps([
+            {'trace_id': trace.trace_id, 'dropped_spans': trace.dropped, 'spans': [span.to_dict() for span in list(trace.spans)]}
+            for trace in traces
+        ])
+
+    def export_chrome(self, traces: List[Trace] = None) -> str:
+        """Chrome trace-event format, loadable in chrome://tracing, Perfetto or speedscope."""
+        traces = self.get_traces() if traces is None else traces
+        events = []
+        for pid, trace in enumerate(traces, start=1):
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f"{trace.root.name} {trace.trace_id[:8]}"}})
+            for span in list(trace.spans):
+                if span.end is None:
+                    continue
+                events.append({
+                    'name': span.name,
+                    'cat': trace.root.name,
+                    'ph': 'X',
+                    'ts': round(trace.wall_time(span.start) * 1e6),
+                    'dur': round(span.duration * 1e6),
+                    'pid': pid,
+                    'tid': span.thread,
+                    'args': {key: str(value) for key, value in span.attrs.items()},
+                })
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
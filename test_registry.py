@@ -0,0 +1,97 @@
+import threading
+import pytest
+from registry import Registry
+
+
+@pytest.fixture(scope="function")
+def keys():
+    keys = []
+    yield keys
+    for key in keys:
+        if key in Registry.list_instances():
+            Registry.remove(key)
+
+def test_factory_runs_once_on_first_get(keys):
+    keys.append('lazy_service')
+    calls = []
+    Registry.register_factory('lazy_service', lambda: calls.append(1) or object())
+
+    assert calls == []
+    assert 'lazy_service' in Registry.list_instances()
+    assert not Registry.is_built('lazy_service')
+    first = Registry.get('lazy_service')
+    assert Registry.get('lazy_service') is first
+    assert calls == [1]
+
+def test_factories_resolve_their_dependencies(keys):
+    keys.extend(['lazy_a', 'lazy_b'])
+    Registry.register_factory('lazy_a', lambda: ('a', Registry.get('lazy_b')))
+    Registry.register_factory('lazy_b', lambda: 'b')
+
+    assert Registry.get('lazy_a') == ('a', 'b')
+    assert Registry.is_built('lazy_b')
+
+def test_concurrent_gets_build_one_instance(keys):
+    keys.append('lazy_slow')
+
+    def factory():
+        threading.Event().wait(0.05)
+        return object()
+
+    Registry.register_factory('lazy_slow', factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(Registry.get('lazy_slow'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 8 and len({id(result) for result in results}) == 1
+
+def test_failed_factory_is_retried(keys):
+    keys.append('lazy_flaky')
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("not yet")
+        return 'ready'
+
+    Registry.register_factory('lazy_flaky', factory)
+    with pytest.raises(RuntimeError):
+        Registry.get('lazy_flaky')
+    assert Registry.get('lazy_flaky') == 'ready'
+
+def test_eager_registration_wins(keys):
+    keys.append('lazy_eager')
+    Registry.register_factory('lazy_eager', lambda: 'lazy')
+    Registry.register('lazy_eager', 'eager')
+
+    assert Registry.get('lazy_eager') == 'eager'
+
+def test_circular_factories_fail_loudly(keys):
+    keys.extend(['lazy_x', 'lazy_y'])
+    Registry.register_factory('lazy_x', lambda: Registry.get('lazy_y'))
+    Registry.register_factory('lazy_y', lambda: Registry.get('lazy_x'))
+
+    with pytest.raises(RuntimeError, match="Circular dependency"):
+        Registry.get('lazy_x')
+
+def test_slow_factories_do_not_block_other_keys(keys):
+    keys.extend(['lazy_blocked', 'lazy_free'])
+    release = threading.Event()
+    Registry.register_factory('lazy_blocked', lambda: release.wait(5) and 'blocked')
+    Registry.register_factory('lazy_free', lambda: 'free')
+
+    builder = threading.Thread(target=Registry.get, args=('lazy_blocked',))
+    builder.start()
+    try:
+        while 'lazy_blocked' not in Registry._key_locks:
+            threading.Event().wait(0.01)
+        assert Registry.get('lazy_free') == 'free'
+        assert not Registry.is_built('lazy_blocked')
+    finally:
+        release.set()
+        builder.join()
+    assert Registry.get('lazy_blocked') == 'blocked'
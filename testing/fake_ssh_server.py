@@ -0,0 +1,102 @@
+import asyncio
+import random
+import subprocess
+import threading
+from typing import Callable, Tuple
+import asyncssh
+
+
+def echo_handler(command: str) -> Tuple[str, str, int]:
+    return f"{command}\n", '', 0
+
+
+def shell_handler(command: str) -> Tuple[str, str, int]:
+    result = subprocess.run(command, shell=True, capture_output=True, text=True)
+    return result.stdout, result.stderr, result.returncode
+
+
+class _AcceptAllServer(asyncssh.SSHServer):
+    def __init__(self, failure_rate: float = 0.0):
+        self.failure_rate = failure_rate
+
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def password_auth_supported(self) -> bool:
+        return True
+
+    def validate_password(self, username: str, password: str) -> bool:
+        return not self.failure_rate or random.random() >= self.failure_rate
+
+
+class FakeSSHServer:
+    """
+    Local stand-in for a fleet node. Accepts any password, waits `latency`
+    seconds plus up to `jitter` more and answers every command with
+    `handler(command)`, which returns (stdout, stderr, exit_status). A
+    `failure_rate` share of logins is rejected and `output_size` pads stdout
+    to at least that many bytes. With `sftp` it also serves the local
+    filesystem over SFTP. Used to test and benchmark the execution strategies
+    offline.
+    """
+    def __init__(self, latency: float = 0.0, handler: Callable[[str], Tuple[str, str, int]] = echo_handler, host: str = '127.0.0.1', port: int = 0, sftp: bool = False, jitter: float = 0.0, failure_rate: float = 0.0, output_size: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.output_size = output_size
+        self.handler = handler
+        self.sftp = sftp
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def start(self) -> 'FakeSSHServer':
+        started = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, args=(started,), name='fake-ssh-server', daemon=True)
+        self.thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    async def handle_process(self, process: asyncssh.SSHServerProcess):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        stdout, stderr, exit_status = self.handler(process.command or '')
+        if len(stdout) < self.output_size:
+            stdout += 'x' * (self.output_size - len(stdout) - 1) + '\n'
+        process.stdout.write(stdout)
+        process.stderr.write(stderr)
+        process.exit(exit_status)
+
+    def _run(self, started: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncssh.create_server(
+            lambda: _AcceptAllServer(self.failure_rate),
+            self.host,
+            self.port,
+            server_host_keys=[asyncssh.generate_private_key('ssh-ed25519')],
+            process_factory=self.handle_process,
+            # Serves the local filesystem, only meant for tests
+            sftp_factory=self.sftp,
+        ))
+        self.port = self.server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()